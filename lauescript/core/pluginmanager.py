@@ -8,10 +8,11 @@ Class implementing the plugin manager.
 import imp
 from sys import argv
 from os import listdir
+from os.path import expanduser
 try:
-    from ConfigParser import ConfigParser
+    from ConfigParser import ConfigParser, NoOptionError, NoSectionError
 except ImportError:
-    from configparser import ConfigParser
+    from configparser import ConfigParser, NoOptionError, NoSectionError
 from lauescript.core.apd_printer import apd_printer
 from sys import exit
 
@@ -181,6 +182,31 @@ class PluginManager(object):
         """
         return self.config.getint('Database', 'Frequency_cutoff')
 
+    def get_worker_count(self):
+        """
+        Returns the number of processes used for the parallel ADP
+        calculation as defined by the 'Workers' entry of the
+        'Database' section of the config file. Returns None if the
+        entry is missing or 0, meaning all CPUs are used.
+        """
+        try:
+            return self.config.getint('Database', 'Workers') or None
+        except (NoOptionError, NoSectionError, ValueError):
+            return None
+
+    def get_name_cache(self):
+        """
+        Returns the path of the invariom name cache file as defined by
+        the 'NameCache' entry of the 'APD' section of the config file.
+        Returns None if the entry is missing or empty, meaning no cache
+        is used.
+        """
+        try:
+            filename = self.config.get('APD', 'NameCache')
+        except (NoOptionError, NoSectionError):
+            return None
+        return expanduser(filename) if filename else None
+
     def register_variable(self, instance, name):
         """
         Registeres a new variable that will be accessible via the
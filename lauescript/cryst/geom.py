@@ -38,6 +38,70 @@ def is_bound(pos1, el1, pos2, el2):
     return False
 
 
+def are_bound(pos1, el1, pos2, el2):
+    """
+    Vectorized version of 'is_bound()' testing many atom pairs at
+    once.
+
+    :param pos1: Array of shape (N, 3) representing the cartesian
+    positions of the first atoms of every pair.
+    :param el1: List of N element symbols of the first atoms.
+    :param pos2: Array of shape (N, 3) representing the cartesian
+    positions of the second atoms of every pair.
+    :param el2: List of N element symbols of the second atoms.
+    :return: Boolean array of length N.
+    """
+    pos1 = np.asarray(pos1, dtype=float).reshape((-1, 3))
+    pos2 = np.asarray(pos2, dtype=float).reshape((-1, 3))
+    n = len(pos1)
+    if not n:
+        return np.zeros(0, dtype=bool)
+    elements, codes = np.unique(list(el1) + list(el2), return_inverse=True)
+    radii = np.array([covalence_radius[element] for element in elements], dtype=float)[codes]
+    hydrogen = (elements == 'H')[codes]
+    threshold = np.where(hydrogen[:n] | hydrogen[n:], 0.2, 0.1)
+    return np.linalg.norm(pos1 - pos2, axis=1) < radii[:n] + radii[n:] + threshold
+
+
+def get_bond_pairs(atoms):
+    """
+    Determines all pairs of bound atoms. Only atoms closer than twice
+    the largest covalence radius are tested with 'are_bound()'.
+
+    :param atoms: List of ATOM instances.
+    :return: Tuple: (first, second) of integer arrays holding the
+    indices of every bound pair of atoms with first < second. The
+    pairs are sorted.
+    """
+    from lauescript.cryst.neighbors import get_neighbors_within, get_neighbor_pairs
+
+    if len(atoms) < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    coords = np.array([atom.get_cart() for atom in atoms], dtype=float).reshape((-1, 3))
+    elements = [atom.get_element() for atom in atoms]
+    radius = 2 * max(covalence_radius[element] for element in set(elements)) + 0.2
+    first, second = get_neighbor_pairs(get_neighbors_within(coords, radius))
+    candidates = first < second
+    first, second = first[candidates], second[candidates]
+    bound = are_bound(coords[first], [elements[i] for i in first],
+                      coords[second], [elements[i] for i in second])
+    pairs = np.unique(first[bound] * len(atoms) + second[bound])
+    return pairs // len(atoms), pairs % len(atoms)
+
+
+def get_bond_partners(atoms):
+    """
+    :param atoms: List of ATOM instances.
+    :return: List of sorted lists. The i-th list holds the indices of
+    all atoms bound to atoms[i].
+    """
+    partners = [[] for _ in atoms]
+    for i, j in zip(*[pairs.tolist() for pairs in get_bond_pairs(atoms)]):
+        partners[i].append(j)
+        partners[j].append(i)
+    return [sorted(partner) for partner in partners]
+
+
 # ===============================================================================
 # cart1=[1.1,1.2,0]
 # cart2=[-1.1,1.2,0]
@@ -1,19 +1,49 @@
 __author__ = 'jens'
 
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle as pickle
-from os.path import join
 from lauescript.cryst.geom import get_framework_neighbors
+from lauescript.laueio.binary_database import BinaryDatabase, find_database
+from lauescript.laueio.compound_store import open_store
 
 
-def database(pluginManager):
+def database(pluginManager, names=None):
+    """
+    Returns an iterable yielding all model compounds. If a compiled
+    database file is available, the model compounds are loaded one at
+    a time from the memory mapped file. Otherwise the model compounds
+    are loaded one at a time from the compound store 'database.bin'.
+
+    Use 'names' to load only the given compounds. The compounds
+    containing an invariom can be looked up with 'database_index'.
+    """
     path = pluginManager.config.get('APD', 'DatabasePath')
-    picklepointer = open(join(path, 'database.pkl'), 'r')
-    data = pickle.load(picklepointer)
-    picklepointer.close()
-    return data.values()
+    filename = find_database(path)
+    if filename:
+        from lauescript.types.data import DATA
+
+        data = DATA()
+        data.attach_database(BinaryDatabase(filename))
+        return _iter_daba_molecules(data, names)
+    return _iter_stored_molecules(open_store(path), names)
+
+
+def _iter_daba_molecules(data, names=None):
+    """
+    Yields the model compounds of the database attached to 'data'
+    with the atom partner lists populated.
+    """
+    for molecule in data.iter_database(names):
+        molecule.get_distances()
+        yield molecule
+
+
+def _iter_stored_molecules(store, names=None):
+    """
+    Yields the model compounds of a compound store with the atom
+    partner lists populated. The normal modes are not loaded.
+    """
+    for molecule in store.iter_compounds(names, modes=False):
+        molecule.get_distances()
+        yield molecule
 
 
 def atoms_of_element(molecule, element='H'):
@@ -0,0 +1,193 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module providing bounded neighbor lists for the atoms of a molecule.
+
+Instead of sorting all N x N interatomic distances only the closest
+atoms of every atom are determined. The resulting PartnerList instances
+behave like the complete, distance sorted lists of all other atoms.
+If atoms beyond the known neighbors are accessed, the list is extended
+on demand.
+"""
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+NEIGHBORS = 16
+
+
+class NeighborSearch(object):
+    """
+    Search tree of the positions of a list of atoms. The tree is built
+    when it is first used and is not pickled.
+    """
+
+    def __init__(self, atoms, coords):
+        """
+        :param atoms: List of ATOM instances.
+        :param coords: List of numpy arrays representing the positions
+        of the atoms.
+        """
+        self.atoms = atoms
+        self.coords = np.array(coords, dtype=float).reshape((-1, 3))
+        self._tree = None
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_tree'] = None
+        return state
+
+    @property
+    def tree(self):
+        """
+        :return: NearestNeighbors instance fitted to the positions.
+        """
+        if self._tree is None:
+            self._tree = NearestNeighbors().fit(self.coords)
+        return self._tree
+
+    def query(self, index, n):
+        """
+        :param index: Integer representing the index of an atom.
+        :param n: Integer representing the number of neighbors.
+        :return: Array of the indices of the 'n' atoms closest to atom
+        'index' sorted by distance. The atom itself is not included.
+        """
+        n = min(n + 1, len(self.coords))
+        indices = self.tree.kneighbors(self.coords[index:index + 1], n, return_distance=False)[0]
+        return self.sort(index, indices)[:n - 1]
+
+    def sort(self, index, indices):
+        """
+        :param index: Integer representing the index of an atom.
+        :param indices: Array of atom indices.
+        :return: Array of 'indices' without 'index' sorted by the
+        distance to atom 'index'. Atoms with equal distance are sorted
+        by index.
+        """
+        indices = indices[indices != index]
+        distances = np.sqrt(((self.coords[indices] - self.coords[index]) ** 2).sum(axis=1))
+        return indices[np.lexsort((indices, distances))]
+
+
+class PartnerList(object):
+    """
+    Sequence of the atoms surrounding an atom sorted by distance.
+    The list supports indexing, slicing, iteration and len(). Its
+    length is the number of all other atoms and is known without
+    extending the list.
+    """
+
+    def __init__(self, search, index, indices):
+        """
+        :param search: NeighborSearch instance.
+        :param index: Integer representing the index of the atom.
+        :param indices: Array of the indices of the closest atoms
+        sorted by distance.
+        """
+        self.search = search
+        self.index = index
+        self.indices = indices
+        self.complete = len(indices) >= len(search) - 1
+
+    def extend(self, n=None):
+        """
+        Determines at least the 'n' closest atoms. If 'n' is None,
+        all atoms are determined.
+        :param n: Integer.
+        :return: None
+        """
+        if self.complete:
+            return
+        total = len(self.search) - 1
+        if n is None:
+            n = total
+        self.indices = self.search.query(self.index, min(total, max(n, 2 * len(self.indices))))
+        self.complete = len(self.indices) >= total
+
+    def _require(self, n):
+        if len(self.indices) < n:
+            self.extend(n)
+
+    def __getitem__(self, key):
+        atoms = self.search.atoms
+        if isinstance(key, slice):
+            if key.stop is None or key.stop < 0 or (key.start is not None and key.start < 0):
+                self.extend()
+            else:
+                self._require(key.stop)
+            return [atoms[i] for i in self.indices[key]]
+        if key < 0:
+            self.extend()
+        else:
+            self._require(key + 1)
+        return atoms[self.indices[key]]
+
+    def __iter__(self):
+        i = 0
+        while True:
+            self._require(i + 1)
+            if i >= len(self.indices):
+                return
+            yield self.search.atoms[self.indices[i]]
+            i += 1
+
+    def __len__(self):
+        return len(self.search) - 1
+
+
+def get_partner_lists(atoms, coords, n=NEIGHBORS):
+    """
+    Determines the 'n' closest atoms of every atom.
+
+    :param atoms: List of ATOM instances.
+    :param coords: List of numpy arrays representing the positions
+    of the atoms.
+    :param n: Integer representing the number of neighbors determined
+    initially.
+    :return: List of PartnerList instances.
+    """
+    search = NeighborSearch(atoms, coords)
+    k = min(n + 1, len(search))
+    result = search.tree.kneighbors(search.coords, k, return_distance=False)
+    return [PartnerList(search, i, search.sort(i, row)[:k - 1]) for i, row in enumerate(result)]
+
+
+def get_neighbors_within(coords, radius):
+    """
+    Determines all atoms within a sphere around every atom.
+
+    :param coords: List of numpy arrays representing atomic positions.
+    :param radius: Float representing the radius of the sphere.
+    :return: List of arrays. The i-th array starts with 'i' followed by
+    the indices of all atoms within 'radius' of atom 'i' sorted by
+    distance.
+    """
+    search = NeighborSearch(None, coords)
+    result = search.tree.radius_neighbors(search.coords, radius, return_distance=False)
+    return [np.concatenate(([i], search.sort(i, row))).astype(int) for i, row in enumerate(result)]
+
+
+def get_neighbor_pairs(neighbors, limit=None):
+    """
+    Converts the result of 'get_neighbors_within()' to arrays of
+    atom pairs.
+
+    :param neighbors: List of arrays as returned by
+    'get_neighbors_within()'.
+    :param limit: Integer. If given, only the 'limit' closest
+    neighbors of every atom are used.
+    :return: Tuple: (first, second) of integer arrays. The pairs are
+    ordered the same way as in 'neighbors'.
+    """
+    first = [np.zeros(0, dtype=int)]
+    second = [np.zeros(0, dtype=int)]
+    for row in neighbors:
+        partners = row[1:limit + 1 if limit is not None else None]
+        first.append(np.repeat(row[0], len(partners)))
+        second.append(partners)
+    return np.concatenate(first).astype(int), np.concatenate(second).astype(int)
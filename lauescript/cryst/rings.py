@@ -1,33 +1,85 @@
 __author__ = 'jens'
 
-from networkx import cycle_basis, Graph
-from numpy import dot, cross
+import numpy as np
 
-from lauescript.cryst.geom import is_bound
-from lauescript.cryst.iterators import iter_atom_pairs
+from lauescript.cryst.geom import are_bound, get_bond_pairs
+from lauescript.cryst.neighbors import get_neighbor_pairs
+
+
+def cycle_basis(edges):
+    """
+    Determines a cycle basis of a graph. The rings are found along a
+    depth first spanning tree of every connected component. The vertex
+    and edge order follows 'networkx.cycle_basis()' for a graph built
+    from 'edges', so the same rings are returned in the same order.
+    The invariom names of the database depend on this choice of rings.
+
+    :param edges: Iterable of (u, v) tuples of vertex names.
+    :return: List of rings. Each ring is a list of vertex names in
+    ring order.
+    """
+    adjacency = {}
+    for u, v in edges:
+        if not u in adjacency:
+            adjacency[u] = {}
+        if not v in adjacency:
+            adjacency[v] = {}
+        adjacency[u][v] = None
+        adjacency[v][u] = None
+    vertices = set(iter(adjacency))
+    rings = []
+    while vertices:
+        root = vertices.pop()
+        stack = [root]
+        parents = {root: root}
+        used = {root: set()}
+        while stack:
+            vertex = stack.pop()
+            vertex_used = used[vertex]
+            for partner in adjacency[vertex]:
+                if not partner in used:
+                    parents[partner] = vertex
+                    stack.append(partner)
+                    used[partner] = set([vertex])
+                elif partner == vertex:
+                    rings.append([vertex])
+                elif not partner in vertex_used:
+                    partner_used = used[partner]
+                    ring = [partner, vertex]
+                    parent = parents[vertex]
+                    while not parent in partner_used:
+                        ring.append(parent)
+                        parent = parents[parent]
+                    ring.append(parent)
+                    rings.append(ring)
+                    used[partner].add(vertex)
+        vertices -= set(parents)
+    return rings
 
 
 def find_rings(atoms, bonds=None):
-    graph = Graph()
-    # bonds = None
-    class DummyMolecule(object):
-        pass
-    mol = DummyMolecule()
-    mol.atoms = atoms
+    """
+    Determines the rings of a molecule with 'cycle_basis()'.
+
+    :param atoms: List of atom instances.
+    :param bonds: List of neighbor arrays as returned by
+    'neighbors.get_neighbors_within()'. Only the nine closest neighbors
+    of every atom are tested for bonds. If None, the bonds are
+    determined with 'geom.get_bond_pairs()'.
+    :return: List of rings. Each ring is a list of atom names in ring
+    order.
+    """
     if bonds is None:
-        for atom1, atom2 in iter_atom_pairs():
-            graph.add_edge(atom1.name, atom2.name)
+        first, second = get_bond_pairs(atoms)
     else:
-        blacklist = []
-        for b in bonds:
-            for atom2i in b[1:10]:
-                string = ' : '.join(sorted([atoms[b[0]].name, atoms[atom2i].name]))
-                if not string in blacklist:
-                    if is_bound(atoms[b[0]].cart, atoms[b[0]].element, atoms[atom2i].cart, atoms[atom2i].element):
-                        graph.add_edge(atoms[b[0]].name, atoms[atom2i].name)
-                    blacklist.append(string)
-    ring_list = cycle_basis(graph)
-    return ring_list
+        first, second = get_neighbor_pairs(bonds, limit=9)
+        coords = np.array([atom.get_cart() for atom in atoms], dtype=float).reshape((-1, 3))
+        elements = [atom.get_element() for atom in atoms]
+        bound = are_bound(coords[first], [elements[i] for i in first],
+                          coords[second], [elements[i] for i in second])
+        first, second = first[bound], second[bound]
+    names = [atom.get_name() for atom in atoms]
+    return cycle_basis((names[i], names[j]) for i, j in zip(first.tolist(), second.tolist()))
 
 
 def find_planar_rings(atoms, bonds=None, planarityThreshold=.1):
@@ -36,23 +88,28 @@ def find_planar_rings(atoms, bonds=None, planarityThreshold=.1):
 
 
 def are_planar(atoms, all_rings, planarityThreshold=.1):
-    atom_dict = {atom.get_name(): atom for atom in atoms}
-    planar_rings = []
-    for ring in all_rings:
-        l = len(ring)
-        planarity = 0
-        for i, atom_name0 in enumerate(ring):
-            atom_name1 = ring[(i+1) % l]
-            atom_name2 = ring[(i+2) % l]
-            atom_name3 = ring[(i+3) % l]
-            atom0 = atom_dict[atom_name0]
-            atom1 = atom_dict[atom_name1]
-            atom2 = atom_dict[atom_name2]
-            atom3 = atom_dict[atom_name3]
-            v = abs(dot((atom0.cart - atom3.cart), cross((atom1.cart - atom3.cart), (atom2.cart - atom3.cart)))) / 6.
-            planarity += v
-        if planarity / l < planarityThreshold:
-            planar_rings.append(ring)
-    return planar_rings
-
+    """
+    Tests rings for planarity. The planarity of a ring is the mean
+    volume of the tetrahedra spanned by four consecutive ring atoms.
+    All rings of the same size are tested at once.
 
+    :param atoms: List of atom instances.
+    :param all_rings: List of rings. Each ring is a list of atom names
+    in ring order.
+    :param planarityThreshold: Float. Rings with a planarity below the
+    threshold are considered planar.
+    :return: List of the planar rings.
+    """
+    atom_dict = {atom.get_name(): i for i, atom in enumerate(atoms)}
+    coords = np.array([atom.get_cart() for atom in atoms], dtype=float).reshape((-1, 3))
+    sizes = np.array([len(ring) for ring in all_rings], dtype=int)
+    planar = np.zeros(len(all_rings), dtype=bool)
+    for size in np.unique(sizes):
+        selection = np.nonzero(sizes == size)[0]
+        positions = coords[np.array([[atom_dict[name] for name in all_rings[i]] for i in selection], dtype=int)]
+        atom3 = np.roll(positions, -3, axis=1)
+        volumes = np.abs(np.sum((positions - atom3) *
+                                np.cross(np.roll(positions, -1, axis=1) - atom3,
+                                         np.roll(positions, -2, axis=1) - atom3), axis=2)) / 6.
+        planar[selection] = np.cumsum(volumes, axis=1)[:, -1] / size < planarityThreshold
+    return [ring for ring, flag in zip(all_rings, planar) if flag]
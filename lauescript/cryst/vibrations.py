@@ -0,0 +1,125 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module for calculating ADPs from the normal modes of a molecule.
+
+The ADP of atom 'a' is the sum over all frequencies 'f' of the outer
+products of the atom's displacement vectors d_fa weighted by the
+temperature dependent factor delta_f:
+
+    U_a = sum_f delta_f * d_fa * d_fa^T
+
+    delta_f = coth(hk * nu_f / T) * hc / (nu_f * m_f)
+
+where nu_f is the frequency in cm^-1 and m_f the reduced mass of the
+normal mode.
+"""
+import numpy as np
+
+hk = 0.719385E0
+hc = 16.85773329E0
+
+
+def get_displacements(molecule):
+    """
+    Collects the displacement vectors of all atoms of a molecule.
+
+    :param molecule: DABA_MOLECULE instance.
+    :return: Tuple: (frequencies, masses, displacements) where frequencies
+    and masses are arrays of length F and displacements is an array
+    of shape (F, N, 3).
+    """
+    displacements = molecule.displacements
+    if displacements is None:
+        displacements = np.zeros((len(molecule.frequencies), len(molecule.atoms), 3))
+    return molecule.frequencies, molecule.masses, displacements
+
+
+def get_deltas(freqs, masses, temperature):
+    """
+    :param freqs: Array of frequencies in cm^-1.
+    :param masses: Array of reduced masses.
+    :param temperature: Float or array of temperatures in Kelvin.
+    :return: Array of the weights delta_f. If 'temperature' is an array
+    of length T, the shape of the returned array is (T, F).
+    """
+    temperature = np.asarray(temperature, dtype=float)[..., np.newaxis]
+    return 1. / np.tanh(hk * freqs / temperature) * hc / freqs / masses
+
+
+def get_mode_products(displacements):
+    """
+    Computes the contribution of every normal mode to the ADPs.
+
+    :param displacements: Array of shape (F, N, 3).
+    :return: Array of shape (F, N, 6) containing the products of the
+    displacement vector components in the order 11, 22, 33, 12, 13, 23.
+    """
+    i, j = [0, 1, 2, 0, 0, 1], [0, 1, 2, 1, 2, 2]
+    return displacements[:, :, i] * displacements[:, :, j]
+
+
+def get_adps_from_products(products, deltas):
+    """
+    :param products: Array of shape (F, N, 6) as returned by
+    'get_mode_products()'.
+    :param deltas: Array of shape (F,) or (T, F).
+    :return: Array of shape (N, 6) or (T, N, 6) containing the ADPs
+    in the order U11, U22, U33, U12, U13, U23.
+    """
+    return np.tensordot(deltas, products, axes=([-1], [0]))
+
+
+def get_adps(displacements, deltas):
+    """
+    Computes the ADPs of all atoms.
+
+    :param displacements: Array of shape (F, N, 3).
+    :param deltas: Array of shape (F,) or (T, F).
+    :return: Array of shape (N, 6) or (T, N, 6) containing the ADPs
+    in the order U11, U22, U33, U12, U13, U23.
+    """
+    return get_adps_from_products(get_mode_products(displacements), deltas)
+
+
+def _adp_job(job):
+    """
+    Worker function used by 'calculate_adps()'.
+    """
+    name, freqs, masses, displacements, temperature = job
+    return name, get_adps(displacements, get_deltas(freqs, masses, temperature))
+
+
+def calculate_adps(jobs, temperature, workers=None, chunksize=None):
+    """
+    Calculates the ADPs of many compounds using a pool of worker
+    processes. Only the frequencies, reduced masses and displacements
+    of the compounds are sent to the workers.
+
+    :param jobs: List of (name, frequencies, masses, displacements)
+    tuples where the last three values are returned by
+    'get_displacements()'.
+    :param temperature: Float or array of temperatures in Kelvin.
+    :param workers: Integer representing the number of worker processes.
+    Defaults to the number of CPUs.
+    :param chunksize: Integer representing the number of compounds sent
+    to a worker at once.
+    :return: Generator yielding (name, adps) tuples in the order the
+    calculations are finished.
+    """
+    from multiprocessing import Pool, cpu_count
+
+    if not workers:
+        workers = cpu_count()
+    if not chunksize:
+        chunksize = max(1, len(jobs) // (4 * workers))
+    pool = Pool(workers)
+    try:
+        for result in pool.imap_unordered(_adp_job, [job + (temperature,) for job in jobs], chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
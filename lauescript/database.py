@@ -8,337 +8,22 @@ APD-database files.
 """
 import os
 from os import walk, listdir
+from StringIO import StringIO
+from sys import platform
 
 import numpy as np
 
 from lauescript.cryst import crystgeom as cg
 from lauescript.core.core import apd_exit
+from lauescript.laueio.gaussian import GaussianLog, read_log
+from lauescript.laueio.compound_cache import CompoundCache, get_hash
+from lauescript.laueio.compound_store import open_store, STORE_NAME
 from lauescript.invstring2 import get_invariom_names, get_invariom_names_simple
 
 
-def daba_generator(data, frequency_cutoff):
-    """
-    Generates a database.txt file that contains all neccesary data to
-    use the APD-Tools without any other files. (Besides the experimental
-    data files.)
-    """
-    errorlog = open('error.log', 'w')
-    pathlist = []
-    namedict = {}
-    invlist = []
-    print '\nRunning database generator!\n'
-    filepointer = open('DABA.txt')
-    nameswitch = False
-    for line in filepointer.readlines():
-        if 'Path' in line:
-            newpath = line.split(' ')[-1][:-1]
-            newpath = newpath.replace('[', '\[')
-            newpath = newpath.replace(']', '\]')
-            newpath = newpath.replace(',', '.')
-            pathlist.append(newpath)
-            if not pathlist[-1] in namedict.keys():
-                namedict[pathlist[-1]] = []
-        if '!' in line[0]:
-            nameswitch = True
-        elif nameswitch:
-            nameswitch = False
-            namedict[pathlist[-1]].append(str(line[:-1]))
-            invlist.append(str(line[:-1]))
-
-    comlist = pathlist
-
-    datalist = read_multiple_files(invlist, comlist,
-                                   dabamode=True, errorlog=errorlog)
-    datalist2 = [i for i in datalist if i is not None]
-    # ===========================================================================
-    # invlist2=[invlist[i] for i in xrange(len(invlist))\
-    #                      if not datalist[i]==None]
-    # ===========================================================================
-    pathlist2 = [pathlist[i] for i in xrange(len(pathlist)) \
-                 if datalist[i] is not None]
-    invmollist = []
-    for path in pathlist2:
-        invmollist.append(path.split('/')[-4])
-    print 'Parsing frequency information...'
-    global alldata
-    alldata1, warninglist = extract_single_freqencies_from_list(datalist2,
-                                                                invmollist,
-                                                                cutoff=frequency_cutoff)
-    for warning in warninglist:
-        errorlog.write \
-            ('\n!!!WARNING!!! Could not parse frequencies in file :' \
-             + pathlist2[warning][:-11])
-
-    for path in pathlist2:
-        invmollist.append(path.split('/')[-4])
-
-    print 'Setting up data structure...'
-    dabacounter = 0
-    for invmol in invmollist:
-        dabacounter += 1
-        if dabacounter % 400 == 0:
-            print '...'
-        try:
-            i = invmollist.index(invmol)
-            data.add_molecule(str(vars()['invmol']), daba=True)
-            pathlist2[i] = pathlist2[i].replace('home', 'user')
-            cell, pos, keylist = cg.read_coordinates(pathlist2[i] + '/')
-            data[invmol].give_cell(cell)
-            invnames = cg.read_invout_database(pathlist2[i] + '/')
-            for p in keylist:
-                data[invmol].add_atom(name=p, frac=pos[p])
-                data[invmol].atoms[-1].molecule = data[invmol]
-                data[invmol].atoms[-1].invname = invnames[p]
-                data[invmol].inv = data[invmol]
-                data[invmol].freq = []
-                for freq in alldata1[invmol]:
-                    if len(freq) > 3:
-                        data[invmol].freq.append([freq[0], freq[1]])
-                        num = len(data[invmol].atoms) - 1
-                        data[invmol].atoms[-1].add_disps(freq[0],
-                                                         freq[4 + num * 3:7 + num * 3])
-        except:
-            errorlog.write('\n!!!WARNING!!! Could not initialize ' + \
-                           'classes.molecule instance for ' + invmol)
-    # ===========================================================================
-    # count=0
-    # ===========================================================================
-    print 'Starting calculations...'
-    data.update(dabamode=True, errorlog=errorlog)
-
-
-# ===============================================================================
-# def micro_daba_generator(data,frequency_cutoff):
-#     """
-#     Generates a small database file containing the information of
-#     a single molecule.
-#     """
-#     errorlog=open('error.log','w')
-#     datalist=[]
-#     datalist.append(read_frequency_block('g.out',errorlog))
-#     alldata,warninglist=extract_single_freqencies_from_list(datalist,\
-#                                                      ['xylitol'],delnegfreq=True)
-#     data.add_molecule('xylitol',daba=True)
-#     cell,pos,keylist=cg.read_coordinates('./')
-#     data['xylitol'].give_cell(cell)
-#     invnames=cg.read_invout_database('./')
-#     invmol='xylitol'
-#     for p in keylist:
-#         data[invmol].add_atom(name=p,frac=pos[p])
-#         data[invmol].atoms[-1].molecule=data[invmol]
-#         data[invmol].atoms[-1].invname=invnames[p]
-#         data[invmol].inv=data[invmol]
-#         data[invmol].freq=[]
-#         for freq in alldata[invmol]:
-#             if  len(freq)>3:
-#                 data[invmol].freq.append([freq[0],freq[1]])
-#
-#                 num=len(data[invmol].atoms)-1
-#                 data[invmol].atoms[-1].add_disps(freq[0],\
-#                              freq[4+num*3:7+num*3])
-#     data.update(dabamode=True,errorlog=errorlog)
-# ===============================================================================
-
-
-
-
-def read_frequency_block(filename, errorlog):
-    """
-    Reads the atomic positions and the freqency data from a gaussian log filename (filename.log).
-    Needs the log filename name as an argument.
-    Returns a list with the atomic positions as its first element and one of the frequency
-    tables as each of the following elements. The second return value is the number of atoms
-    of the molecule.
-    """
-    blocklist = []
-    block = []
-    read_switch = False
-    coord_switch = 0
-    # ===========================================================================
-    # filename=filename.replace('home','user')
-    # ===========================================================================
-    try:
-        # print filename
-        filepointer = open(filename)
-        # print 'a'
-    except:
-        errorlog.write('\n!!!WARNING!!! File not found: ' + filename)
-        return
-    for line in filepointer.readlines():
-        if 'Input orientation:' in line:
-            block = []
-            block.append(line)
-            coord_switch = 1
-        elif coord_switch == 1:
-            if not 'Symmetry' in line:
-                block.append(line)
-                if '----------------' in line:
-                    try:
-                        splitted = block[-2].split(' ')
-                        _ = splitted[3]
-
-                    except:
-                        pass
-            else:
-                coord_switch = 2
-
-        elif 'Harmonic frequencies (cm**-1)' in line and read_switch == True:
-            blocklist.append(block)
-            # blocklist[1]=del_head(blocklist[1])
-            return blocklist  # ,int(atomnumbers)
-        elif ' Harmonic frequencies' in line and read_switch == False:
-            blocklist.append(block)
-            block = []
-            block.append(line)
-            read_switch = True
-            lineslen = len(block)
-        elif read_switch:
-
-            if len(block) == 0:
-                block.append(line)
-            elif len(line) == len(block[-1]) or len(block) - lineslen <= 11:
-                block.append(line)
-            elif not 'Harmonic frequencies' in line:
-                blocklist.append(block)
-
-                block = []
-                block.append(line)
-    filepointer.close()
-
-    blocklist.append(block)
-    # blocklist[1]=del_head(blocklist[1])
-    return blocklist
-
-
-def read_multiple_files(filelist, comlist, dabamode=False, errorlog=None):
-    """
-    Reads multiple files from a list of files and returns the output from 'read_frequency_clock'
-    for every file as a list.
-    """
-    # ===========================================================================
-    # totalatoms=0
-    # ===========================================================================
-    datalist = []
-    ##    print 'Reading database files...'
-    count = 0
-    for data in comlist:
-        count += 1
-        if count % 50 == 0:
-            print '...' + str(count) + ' files read...'
-        if dabamode:
-            name = data.split('/')[-4]
-            data = data[:-11] + name + '.log'
-        else:
-            data = data[:-3] + 'log'
-        content = read_frequency_block(data, errorlog)
-        datalist.append(content)
-    return datalist
-
-
-def extract_single_freqencies_from_list(datalist, filelist, cutoff=-1):
-    """
-    Converts the ASCII data in datalist to lists of floats and stores the data
-    in a dictionary where every dataset is keyed to its filename.
-    Every key holds a list of frequencies (lowest first).
-    Every list of frequencies holds a list of floats. The first 4 floats are the
-    Frequency, the Reduced Masses, the Force constants and the IR Intensities.
-    Needs the datalist and the filenamelist returned by read_multiple_files as arguments.
-
-    If True is given as a third argument, the function will delete all frequency lists
-    of frequencies <=0.
-    """
-    alldata = {i: [] for i in filelist}
-    print alldata
-    # ===========================================================================
-    # counter=0
-    # ===========================================================================
-    warninglist = []
-    dabacounter = 0
-    for j in xrange(len(datalist)):
-        dabacounter += 1
-        if dabacounter % 400 == 0:
-            print '...'
-        freqcounter = 0
-        try:
-            for block in datalist[j][1:]:
-
-                for i in xrange(5):
-                    alldata[filelist[j]].append([])
-                freqheader = (False, False)
-                for line in block:
-                    try:
-                        freqheader = [float(i) for i in line.split(' ') if '.' in i]
-                    except:
-                        pass
-                    if len(freqheader) > 0:
-                        for element in freqheader:
-                            alldata[filelist[j]][freqcounter].append(element)
-                            freqcounter += 1
-                        freqcounter -= len(freqheader)
-                freqcounter += 5
-                for i in xrange(4):
-                    if len(alldata[filelist[j]][-1]) == 0:
-                        del alldata[filelist[j]][-1]
-            if cutoff > 0:
-                for freqlist in alldata[filelist[j]]:
-                    if freqlist[0] <= cutoff:
-                        # alldata[filelist[j]].remove(freqlist)
-                        freqlist[0] = 9999999
-        except:
-            warninglist.append(j)
-            pass
-    return alldata, warninglist
-
-
-def extract_single_freqency(data, compound_name, cutoff=0):
-    """
-    Converts the ASCII data in datalist to lists of floats and stores the data
-    in a dictionary where every dataset is keyed to its filename.
-    Every key holds a list of frequencies (lowest first).
-    Every list of frequencies holds a list of floats. The first 4 floats are the
-    Frequency, the Reduced Masses, the Force constants and the IR Intensities.
-    Needs the datalist and the filenamelist returned by read_multiple_files as arguments.
-
-    The optional 'cutoff' argument defines the minimum value for frequencies.
-    Frequencies below 'cutoff' are set to 9999999.
-    'cutoff' defaults to 0.
-    """
-
-    frequency_data = []
-
-    freqcounter = 0
-
-    for block in data[1:]:
-
-        for i in xrange(5):
-            frequency_data.append([])
-        freqheader = (False, False)
-        for line in block:
-            if not 'Percent' in line:
-                try:
-                    freqheader = [float(i) for i in line.split(' ') if '.' in i]
-                except:
-                    pass
-                if len(freqheader) > 0:
-                    for element in freqheader:
-                        frequency_data[freqcounter].append(element)
-                        freqcounter += 1
-                    freqcounter -= len(freqheader)
-        freqcounter += 5
-        for i in xrange(4):
-            if len(frequency_data[-1]) == 0:
-                del frequency_data[-1]
-    if cutoff > 0:
-        for freqlist in frequency_data:
-            if freqlist[0] <= cutoff:
-                # frequency_data.remove(freqlist)
-                freqlist[0] = 9999999
-    return frequency_data
-
-
 def generate_database(data, frequency_cutoff, clean=True, temperatures=None,
                       path=None, apd_printer=None, root=None, frequency_scale=1,
-                      newh=False):
+                      newh=False, batch=False, workers=None, incremental=False, binary=False):
     import lauescript.core.apd_printer as pr
     # ===========================================================================
     # from config import DatabasePath
@@ -368,21 +53,18 @@ def generate_database(data, frequency_cutoff, clean=True, temperatures=None,
     # printer.headline('             APD-Toolkit Database Generator           ')
     # ===========================================================================
     if not clean:
-        printer('  Loading saved database state from database.pkl...')
-        import cPickle
+        from lauescript.types.data import GENERATOR
 
-        if path:
-            try:
-                picklepointer = open(path + '/database.pkl', 'r')
-            except IOError:
-                apd_exit(2, '\n\nERROR: Cannot find database file at\n  >>>{}<<<\n'
-                            'Please check if "~/.APDToolkit.ini" points to the correct location.'.format(path + '/database.pkl'))
-        else:
-            picklepointer = open('database.pkl', 'r')
-        data = cPickle.load(picklepointer)
-        data.save = False
-        data.set_temperature(temperatures)
-        data.update(errorlog, printer, path=path)
+        printer('  Loading saved database state from {}...'.format(STORE_NAME))
+        try:
+            store = open_store(path or '.')
+        except IOError:
+            apd_exit(2, '\n\nERROR: Cannot find database file at\n  >>>{}<<<\n'
+                        'Please check if "~/.APDToolkit.ini" points to the correct location.'.format(
+                os.path.join(path or '.', STORE_NAME)))
+        data = GENERATOR(temperatures, False)
+        store.give_compounds(data)
+        data.update(errorlog, printer, path=path, batch=batch, workers=workers, binary=binary)
         printer.bottomline('             Database generation completed            ')
         return
     printer('  Starting database generation...')
@@ -459,7 +141,7 @@ def generate_database(data, frequency_cutoff, clean=True, temperatures=None,
     progress_counter = 0
 
     info_counter = 0
-    dabaerror_log = open('DABAERROR.log', 'w')
+    compound_files = []
     for (path, _, files) in walk(root):
 
         # =======================================================================
@@ -477,7 +159,7 @@ def generate_database(data, frequency_cutoff, clean=True, temperatures=None,
             res, mas, log, fchk = None, None, None, None
         if os.path.split(path)[1] == log_mask:
             # ===================================================================
-            # If the log flag is still True, there was a parsing problem and the other
+            # If the log flag is still set, there was a parsing problem and the other
             # flags need to be reset.
             # ===================================================================
             if log:
@@ -493,51 +175,66 @@ def generate_database(data, frequency_cutoff, clean=True, temperatures=None,
             # ===================================================================
             if len(logfiles) > 0:
                 newest_logfile = max([f for f in listdir(path) if f.endswith('.log')])
-
-                datalist = read_frequency_block(path + '/' + newest_logfile, errorlog)
-                log = True
+                log = path + '/' + newest_logfile
         elif path.endswith(xd_mask2) and log:
-            for filename in files:
-                if 'Test.FChk' == filename:
-                    try:
-                        properties = cg.get_compound_properties(path + '/' + filename)
-                        fchk = True
-                    except IOError:
-                        fchk = False
+            if 'Test.FChk' in files:
+                fchk = path + '/Test.FChk'
 
         # =======================================================================
-        # Reading the xd files associated with the log file.
+        # Collecting the xd files associated with the log file.
         # If the log flag is None, their was a parsing error and the xd files
         # are skipped.
         # =======================================================================
         elif path.endswith(xd_mask) and log and xd_mask2 in path:
-            for filename in files:
-                if 'xd.res' == filename:
-                    positions_dict, atom_names_list = cg.read_xd_parameter_file(path + '/' + filename, True)
-                    res = True
-                if 'xd.mas' == filename:
-                    compound_name, cell = cg.read_xd_master_file(path + '/' + filename, dabaerror_log)
-                    mas = True
+            if 'xd.res' in files:
+                res = path + '/xd.res'
+            if 'xd.mas' in files:
+                mas = path + '/xd.mas'
 
         if res and mas and log and fchk:
-            try:
-                frequency_data = extract_single_freqency(datalist, compound_name, frequency_cutoff)
-            except:
-                errorlog.write('\nError: Failed to parse frequency information for {}'.format(path))
-            add_molecule(data,
-                         atom_names_list,
-                         positions_dict,
-                         compound_name,
-                         cell,
-                         frequency_data,
-                         properties,
-                         path,
-                         frequency_scale,
-                         newh)
+            compound_files.append((path, log, res, mas, fchk))
             res, mas, log, fchk = None, None, None, None
 
+    # ===========================================================================
+    # In incremental mode only model compounds whose files changed since the
+    # last run are read. The records of all other compounds are taken from
+    # the compound cache. The existing database files are patched unless
+    # all compounds are needed anyway: for the multi temperature database
+    # file and for the compound store written in 'save' mode.
+    # ===========================================================================
+    if incremental:
+        cache = CompoundCache()
+        args = (frequency_cutoff, frequency_scale, newh)
+        hashes = {files[0]: get_hash(files[1:], args) for files in compound_files}
+        stale = [compound_path for compound_path in cache.paths()
+                 if not cache.is_current(compound_path, hashes.get(compound_path))]
+        removed = [cache.get_name(compound_path) for compound_path in stale]
+        patch = len(cache.paths()) > 0
+        compound_files = [files for files in compound_files if not cache.is_current(files[0], hashes[files[0]])]
+        printer('  Model compounds to update: {} of {}'.format(len(compound_files), len(hashes)))
+
+    for path, record in read_compounds(compound_files, frequency_cutoff, frequency_scale, newh, workers):
+        if isinstance(record, str):
+            errorlog.write('\nError: Failed to read model compound {}: {}'.format(path, record))
+        else:
+            add_molecule(data, *record)
+            if incremental:
+                data[record[0]].get_criterion()
+                cache.add(path, hashes[path], record, data[record[0]])
+
     printer('  [----------------------All Files Read----------------------]')
-    data.update(errorlog, printer)
+    if incremental:
+        for compound_path in stale:
+            if not cache.is_current(compound_path, hashes.get(compound_path)):
+                cache.remove(compound_path)
+        cache.save()
+        if patch and not batch and not data.save and data.patch(errorlog, printer, removed, cache.get_compounds(),
+                                                                workers=workers, binary=binary):
+            return
+        for compound_path in set(hashes.keys()).difference(files[0] for files in compound_files):
+            if cache.is_current(compound_path, hashes[compound_path]):
+                add_molecule(data, *cache.load(compound_path))
+    data.update(errorlog, printer, batch=batch, workers=workers, binary=binary)
     return
     import lauescript.cryst.molgraph as mg
     graphs = []
@@ -565,49 +262,120 @@ def generate_database(data, frequency_cutoff, clean=True, temperatures=None,
     # ===========================================================================
 
 
+def read_compound(log_file, res_file, mas_file, fchk_file, frequency_cutoff, frequency_scale, newh):
+    """
+    Reads all files of a model compound and determines the invariom
+    names of its atoms.
+
+    :param log_file: String representing the path to the Gaussian log file.
+    :param res_file: String representing the path to the xd.res file.
+    :param mas_file: String representing the path to the xd.mas file.
+    :param fchk_file: String representing the path to the FChk file.
+    :param frequency_cutoff: Float. Frequencies below or equal to the
+    cutoff are set to 9999999 if the cutoff is positive.
+    :param frequency_scale: Float used to scale all frequencies.
+    :param newh: Boolean passed to get_invariom_names().
+    :return: Tuple (compound_name, cell, properties, atom_names_list,
+    positions_list, frequencies, masses, displacements, invarioms) where
+    'displacements' is an array of shape (F, N, 3) and 'invarioms' is a
+    list of (names, orientations) tuples returned by get_invariom_names().
+    """
+    properties = cg.get_compound_properties(fchk_file)
+    positions_dict, atom_names_list = cg.read_xd_parameter_file(res_file, True)
+    compound_name, cell = cg.read_xd_master_file(mas_file, StringIO())
+    if compound_name is None:
+        raise ValueError('Cannot read compound name and cell from ' + mas_file)
+    gaussian_log = read_log(log_file)
+    modes = gaussian_log.valid_modes()
+    if not len(modes):
+        raise ValueError('No frequency information found in ' + log_file)
+    if gaussian_log.displacements.shape[1] < len(atom_names_list):
+        raise ValueError('Number of atoms in {} does not match {}'.format(log_file, res_file))
+    frequencies = gaussian_log.frequencies[modes]
+    if frequency_cutoff > 0:
+        frequencies = np.where(frequencies <= frequency_cutoff, 9999999, frequencies)
+    frequencies = frequencies * frequency_scale
+    masses = gaussian_log.masses[modes]
+    displacements = gaussian_log.displacements[modes, :len(atom_names_list)]
+    positions_list = [positions_dict[atom_name] for atom_name in atom_names_list]
+    invarioms = list(get_invariom_names(atom_names_list,
+                                        frac=positions_list,
+                                        cell=cell,
+                                        dictionary=True,
+                                        orientations=True,
+                                        dynamic=True,
+                                        verbose=False,
+                                        output=printer,
+                                        newH=newh))
+    return (compound_name, cell, properties, atom_names_list, positions_list,
+            frequencies, masses, displacements, invarioms)
+
+
+def _read_compound_job(job):
+    """
+    Worker function used by 'read_compounds()'.
+    """
+    path, files, args = job
+    try:
+        return path, read_compound(*(files + args))
+    except Exception as error:
+        return path, '{}: {}'.format(type(error).__name__, error)
+
+
+def read_compounds(compound_files, frequency_cutoff, frequency_scale, newh, workers=None):
+    """
+    Reads many model compounds using a pool of worker processes.
+
+    :param compound_files: List of (path, log_file, res_file, mas_file,
+    fchk_file) tuples.
+    :param frequency_cutoff: Float passed to read_compound().
+    :param frequency_scale: Float passed to read_compound().
+    :param newh: Boolean passed to read_compound().
+    :param workers: Integer representing the number of worker processes.
+    Defaults to the number of CPUs. If 1, all compounds are read in the
+    current process.
+    :return: Generator yielding (path, record) tuples in the order of
+    'compound_files'. 'record' is the tuple returned by read_compound()
+    or a string describing the error if the compound could not be read.
+    """
+    from multiprocessing import Pool, cpu_count
+
+    args = (frequency_cutoff, frequency_scale, newh)
+    jobs = [(files[0], files[1:], args) for files in compound_files]
+    if platform.startswith('win') or workers == 1:
+        for job in jobs:
+            yield _read_compound_job(job)
+        return
+    if not workers:
+        workers = cpu_count()
+    pool = Pool(workers)
+    try:
+        for result in pool.imap(_read_compound_job, jobs, max(1, len(jobs) // (16 * workers))):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def add_molecule(data,
-                 atom_names_list,
-                 positions_dict,
                  compound_name,
                  cell,
-                 frequency_data,
                  properties,
-                 path,
-                 frequency_scale,
-                 newh):
+                 atom_names_list,
+                 positions_list,
+                 frequencies,
+                 masses,
+                 displacements,
+                 invarioms):
+    """
+    Adds a model compound to the GENERATOR instance 'data'. The arguments
+    following 'data' are the values returned by read_compound().
+    """
     data.give_daba_molecule(compound_name, cell, properties)
-    positions_list = []
-    for atom_name in atom_names_list:
-        positions_list.append(positions_dict[atom_name])
-    # ===========================================================================
-    # invariom_dicts=[]
-    # invariom_orientations=[]
-    # ===========================================================================
     first = True
-    for names, orientations in get_invariom_names(atom_names_list,
-                                                  frac=positions_list,
-                                                  cell=cell,
-                                                  dictionary=True,
-                                                  orientations=True,
-                                                  # ==========================================
-                                                  # corrections_directory=path+'/',
-                                                  # ==========================================
-                                                  dynamic=True,
-                                                  verbose=False,
-                                                  output=printer,
-                                                  newH=newh):
-        # if 'purin-6-amine' in compound_name:
-        #    print names['C(5)']
-        # =======================================================================
-        # invariom_dicts.append(names)
-        # invariom_orientations.append(orientations)
-        # =======================================================================
-
-
-        # ===========================================================================
-        # invariom_dict=invariom_dict[0]
-        # ===========================================================================
-        for atom_name in atom_names_list:
+    for names, orientations in invarioms:
+        for num, atom_name in enumerate(atom_names_list):
             if first:
 
                 atom_element = atom_name.partition('(')[0]
@@ -617,20 +385,13 @@ def add_molecule(data,
                     atom_element = atom_element.replace('+', '')
                 data[compound_name].give_atom(name=atom_name,
                                               element=atom_element,
-                                              frac=positions_dict[atom_name],
+                                              frac=positions_list[num],
                                               molecule=data[compound_name])
 
-                for freq in frequency_data:
-                    if len(freq) > 3:
-                        if atom_name == atom_names_list[0]:
-                            data[compound_name].freq.append([freq[0] * frequency_scale, freq[1]])
-                        num = len(data[compound_name].atoms) - 1
-                        data[compound_name].atoms[-1].add_disps(freq[0] * frequency_scale,
-                                                                freq[4 + num * 3:7 + num * 3])
-
             data[compound_name][atom_name].add_invariom(names[atom_name],
                                                         orientations[atom_name])
         first = False
+    data[compound_name].set_modes(frequencies, masses, displacements[:, :len(atom_names_list)])
 
 
 class Reader(object):
@@ -708,12 +469,31 @@ def generate_micro_database(data,
                             path=None,
                             clustersize=17,
                             printer=None,
-                            frequency_scale=1.):
+                            frequency_scale=1.,
+                            output=None):
+    """
+    Generates a micro database from the log file of an ONIOM calculation.
+    All parser state is local to the function call, so the function can
+    be called repeatedly and in several processes at the same time.
+
+    :param data: GENERATOR instance the micro database is added to.
+    :param frequency_cutoff: Float. Frequencies below the cutoff are
+    ignored.
+    :param path: String representing the path of the log file.
+    :param clustersize: Integer representing the size of the cluster.
+    :param printer: Instance of the APD_Printer class used for printing
+    output.
+    :param frequency_scale: Float used to scale all frequencies.
+    :param output: String representing the directory the database files
+    are written to. Defaults to the working directory.
+    :return: None
+    """
     import lauescript.core.apd_printer as pr
     if not printer:
         printer = pr.apd_printer(5, __name__)
     # printer.headline('          APD-Toolkit Micro-Database Generator        ')
     filepointer = Reader(path)
+    zmatrix = ZMatrix()
     switch = False
     matrix_buffer = None
     # countSwitch = 0
@@ -722,14 +502,16 @@ def generate_micro_database(data,
     readZMatrix = False
     ZMatrixCounter = 0
     readConstants = 0
+    gaussian_log = GaussianLog(path)
     for line in filepointer.readlines():
+        gaussian_log.feed(line)
         if not zMatrixFound and 'Z-Matrix taken from the checkpoint file' in line:
             printer('No Z-Matrix in LOG file. Checking COM file...')
             try:
                 filepointer.insert(path[:-3] + 'com')
             except IOError:
-                apd_exit(1,'\n\nERROR: Cannot find corresponding COM file:\n   >>>{}<<<\nMake sure that the COM'
-                    ' file has the same base name as the LOG file'.format(path[:-3] + 'com'))
+                raise IOError('Cannot find corresponding COM file:\n   >>>{}<<<\nMake sure that the COM'
+                              ' file has the same base name as the LOG file'.format(path[:-3] + 'com'))
             readZMatrix = True
             continue
         # Identify core atoms and pseudo molecules in Z-matrix.
@@ -743,13 +525,13 @@ def generate_micro_database(data,
             sLine = line.strip().split()
             params = sLine[2:-1]
             name = sLine[0]
-            ProtoAtom(name, *params)
+            zmatrix.addAtom(name, *params)
         elif readZMatrix and 'X--' in line:
             ZMatrixCounter += 1
             sLine = line.strip().split()
             params = sLine[2:-1]
             name = sLine[0]
-            ProtoAtom(name, *params).setID(ZMatrixCounter)
+            zmatrix.addAtom(name, *params).setID(ZMatrixCounter)
         elif readZMatrix and line.strip().endswith('L'):
             ZMatrixCounter += 1
         # -------------
@@ -758,7 +540,7 @@ def generate_micro_database(data,
         if readConstants == 0 and 'Constants:' in line:
             readConstants = 1
         elif readConstants > 0:
-            ProtoAtom.resolveReferences(line)
+            zmatrix.resolveReferences(line)
 
         # if countSwitch > 0 and 'Variables:' in line:
         #     countSwitch = -1
@@ -773,69 +555,130 @@ def generate_micro_database(data,
         elif 'Coordinates (Angstroms)' in line:
             switch = True
             matrix_buffer = Log_Buffer(clustersize, data, path, frequency_cutoff, printer, frequency_scale,
-                                       atoms=ProtoAtom.numberOfCoreAtoms())
-    printer('Number of atoms: {}'.format(ProtoAtom.numberOfCoreAtoms()))
-    matrix_buffer.flush()
+                                       atoms=zmatrix.numberOfCoreAtoms(), output=output)
+    gaussian_log.close()
+    if matrix_buffer is None:
+        raise ValueError('No coordinates found in {}'.format(path))
+    printer('Number of atoms: {}'.format(zmatrix.numberOfCoreAtoms()))
+    matrix_buffer.flush(gaussian_log, zmatrix)
     printer.bottomline('             Database generation completed            ')
-    # for a in ProtoAtom.coreAtoms:
+    # for a in zmatrix.coreAtoms:
     #     print a
     # print 'x'
-    # for a in ProtoAtom.pseudoMolecules:
+    # for a in zmatrix.pseudoMolecules:
     #     print a
 
 
-class ProtoAtom(object):
-    counter = 0
-    instances = []
-    coreAtoms = []
-    pseudoMolecules = []
-    atomByID = {}
-    referenceTable = {}
-
-    def __init__(self, name, xVar, yVar, zVar):
-        self.name = name
-        self.xVar = xVar
-        self.yVar = yVar
-        self.zVar = zVar
-        self.ID = None
-        self.disps = {}
-        self.x, self.y, self.z = None, None, None
-        ProtoAtom.referenceTable[xVar] = self
-        ProtoAtom.referenceTable[yVar] = self
-        ProtoAtom.referenceTable[zVar] = self
-        self.counter = ProtoAtom.counter
-        ProtoAtom.counter += 1
-        ProtoAtom.instances.append(self)
-        if name.startswith('X--'):
-            ProtoAtom.pseudoMolecules.append(self)
-        else:
-            ProtoAtom.coreAtoms.append(self)
+def micro_database_directory(path):
+    """
+    :param path: String representing the path of an ONIOM log file.
+    :return: String representing the directory the micro database of
+    the log file is written to by 'generate_micro_databases()'.
+    """
+    return os.path.splitext(path)[0] + '_micro'
 
-    def setID(self, ID):
-        self.ID = ID
-        ProtoAtom.atomByID[ID] = self
 
-    def __str__(self):
-        return '{}-{} {} {} {}'.format(self.counter, self.name, self.x, self.y, self.z)
+def is_oniom_log(path, lines=1000):
+    """
+    :param path: String representing the path of a log file.
+    :param lines: Integer representing the number of lines searched
+    for the route section.
+    :return: Boolean: True if the file is the log file of a Gaussian
+    ONIOM calculation.
+    """
+    try:
+        with open(path) as fp:
+            for i, line in enumerate(fp):
+                if i >= lines:
+                    break
+                line = line.strip()
+                if line.startswith('#') and 'oniom' in line.lower():
+                    return True
+    except IOError:
+        pass
+    return False
+
+
+def _micro_database_job(job):
+    """
+    Worker function used by 'generate_micro_databases()'.
+    """
+    import lauescript.core.apd_printer as pr
+    from lauescript.types.data import GENERATOR
 
-    def setValue(self, var, value):
-        self.__dict__[var[0]] = value
+    path, kwargs = job
+    output = micro_database_directory(path)
+    printer = pr.apd_printer(5, __name__)
+    printer.mute()
+    try:
+        if not os.path.isdir(output):
+            os.makedirs(output)
+        generate_micro_database(GENERATOR([], True), path=path, printer=printer, output=output, **kwargs)
+    except Exception as error:
+        return path, '{}: {}'.format(type(error).__name__, error)
+    return path, None
 
-    def addDisplacement(self, coord, freq, disp):
-        sfreq = '{}:{}'.format(freq.number, freq.freq)
-        if int(coord) == 1:
-            self.disps[sfreq] = [freq.mass, float(disp), None, None]
-        else:
-            self.disps[sfreq][int(coord)] = float(disp)
-            # if int(coord) == 3:
-            #     print self, sfreq, self.disps[sfreq], self.ID
 
-    @staticmethod
-    def numberOfCoreAtoms():
-        return len(ProtoAtom.coreAtoms)
+def generate_micro_databases(paths, frequency_cutoff, clustersize=17, frequency_scale=1., workers=None):
+    """
+    Generates a micro database for every ONIOM log file in 'paths' using
+    a pool of worker processes. The database files of every log file
+    are written to the directory returned by 'micro_database_directory()'.
+
+    :param paths: List of strings representing the paths of log files.
+    :param frequency_cutoff: Float passed to generate_micro_database().
+    :param clustersize: Integer passed to generate_micro_database().
+    :param frequency_scale: Float passed to generate_micro_database().
+    :param workers: Integer representing the number of worker processes.
+    Defaults to the number of CPUs. If 1, all log files are processed in
+    the current process.
+    :return: Generator yielding (path, error) tuples in the order the
+    jobs are finished. 'error' is None if the micro database was
+    generated successfully and a string describing the error otherwise.
+    """
+    from multiprocessing import Pool, cpu_count
+
+    kwargs = {'frequency_cutoff': frequency_cutoff,
+              'clustersize': clustersize,
+              'frequency_scale': frequency_scale}
+    jobs = [(path, kwargs) for path in paths]
+    if platform.startswith('win') or workers == 1:
+        for job in jobs:
+            yield _micro_database_job(job)
+        return
+    if not workers:
+        workers = cpu_count()
+    pool = Pool(workers)
+    try:
+        for result in pool.imap_unordered(_micro_database_job, jobs):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
 
-    @staticmethod
-    def resolveReferences(line):
+
+class ZMatrix(object):
+    """
+    Atoms of the symbolic Z-matrix of an ONIOM calculation.
+    Every micro database job uses its own instance.
+    """
+
+    def __init__(self):
+        self.counter = 0
+        self.instances = []
+        self.coreAtoms = []
+        self.pseudoMolecules = []
+        self.atomByID = {}
+        self.referenceTable = {}
+
+    def addAtom(self, name, xVar, yVar, zVar):
+        return ProtoAtom(self, name, xVar, yVar, zVar)
+
+    def numberOfCoreAtoms(self):
+        return len(self.coreAtoms)
+
+    def resolveReferences(self, line):
         try:
             var, value = line.strip().split()
         except ValueError:
@@ -846,24 +689,56 @@ class ProtoAtom(object):
             else:
                 var = var.strip()
         try:
-            reference = ProtoAtom.referenceTable[var]
+            reference = self.referenceTable[var]
         except KeyError:
             pass
         else:
             reference.setValue(var, float(value))
 
 
+class ProtoAtom(object):
+    def __init__(self, zmatrix, name, xVar, yVar, zVar):
+        self.zmatrix = zmatrix
+        self.name = name
+        self.xVar = xVar
+        self.yVar = yVar
+        self.zVar = zVar
+        self.ID = None
+        self.x, self.y, self.z = None, None, None
+        zmatrix.referenceTable[xVar] = self
+        zmatrix.referenceTable[yVar] = self
+        zmatrix.referenceTable[zVar] = self
+        self.counter = zmatrix.counter
+        zmatrix.counter += 1
+        zmatrix.instances.append(self)
+        if name.startswith('X--'):
+            zmatrix.pseudoMolecules.append(self)
+        else:
+            zmatrix.coreAtoms.append(self)
+
+    def setID(self, ID):
+        self.ID = ID
+        self.zmatrix.atomByID[ID] = self
+
+    def __str__(self):
+        return '{}-{} {} {} {}'.format(self.counter, self.name, self.x, self.y, self.z)
+
+    def setValue(self, var, value):
+        self.__dict__[var[0]] = value
+
+
 class Log_Buffer(list):
     exclude = ['Number', 'Type', '-----']
 
-    def __init__(self, clustersize, data, path, frequency_cutoff, printer, frequency_scale, atoms=None):
+    def __init__(self, clustersize, data, path, frequency_cutoff, printer, frequency_scale, atoms=None, output=None):
         self.data = data
         self.frequency_cutoff = frequency_cutoff
         self.path = path
         self.atoms = atoms
         self.printer = printer
         self.clustersize = clustersize
-        self.errorlog = open('error.log', 'w')
+        self.output = output
+        self.errorlog = open(os.path.join(output or '.', 'error.log'), 'w')
         self.frequency_scale = frequency_scale
         super(Log_Buffer, self).__init__()
 
@@ -871,23 +746,22 @@ class Log_Buffer(list):
         if not any(i in string for i in Log_Buffer.exclude):
             super(Log_Buffer, self).append([value for value in string.split(' ') if len(value) > 0])
 
-    def flush(self):
+    def flush(self, gaussian_log, zmatrix):
         self.find_pattern()
-        self.setup_data()
-        self.data.update(self.errorlog, self.printer, parallel=False)
+        self.setup_data(gaussian_log, zmatrix)
+        self.data.update(self.errorlog, self.printer, path=self.output, parallel=False)
 
     def find_pattern(self):
         # num_atoms = len(self) / self.clustersize
         num_atoms = self.atoms
         self.molecule = self[:num_atoms]
 
-    def setup_data(self):
+    def setup_data(self, gaussian_log, zmatrix):
         self.data.give_daba_molecule('micro', properties=[0, 0, 0, 0])
         self.data.set_temperature([100])
-        # datalist = read_frequency_block(self.path, self.errorlog)
-        # frequency_data = extract_single_freqency(datalist, 'micro', self.frequency_cutoff)
-        # frequency_data = extract_single_freqency(datalist, 'micro', -9999)
-        FrequencyReader(self.path)
+        frequencies = gaussian_log.frequencies * self.frequency_scale
+        modes = gaussian_log.valid_modes()
+        core_modes = modes[gaussian_log.frequencies[modes] >= self.frequency_cutoff]
         # for x in frequency_data:
         #     print str(x)[:50]
         positions_list = []
@@ -903,7 +777,6 @@ class Log_Buffer(list):
                                                                 orientations=True,
                                                                 newH=True)
 
-        freq_num = len(atom_names_list) * 3 - 2
         for i, atom_name in enumerate(atom_names_list):
             atom_element = cg.number_proton['{0:{2}>{1}}'.format(atom_data[1], 3, '0')]
             self.data['micro'].give_atom(name=atom_name,
@@ -914,140 +787,18 @@ class Log_Buffer(list):
             self.data['micro'][atom_name].add_invariom(invariom_dict[atom_name],
                                                        orientations[atom_name])
 
-            # for j, freq in enumerate(frequency_data[freq_num * -1:]):
-            #     if len(freq) > 3:
-            #         if atom_name == atom_names_list[0]:
-            #             if not freq[0] > 99999:
-            #                 self.data['micro'].freq.append([freq[0] * self.frequency_scale, freq[1]])
-            #                 print freq[0], freq[1]
-            #         num = len(self.data['micro'].atoms) - 1
-            #         if not freq[0] > 99999:
-            #             self.data['micro'].atoms[-1].add_disps(freq[0] * self.frequency_scale,
-            #                                                    freq[4 + num * 3:7 + num * 3])
-
-            atom = self.data['micro'].atoms[-1]
-            for freq, disps in ProtoAtom.coreAtoms[i].disps.items():
-                if disps[0] == 99999999:
-                    continue
-
-                freq = float(freq.split(':')[1])
-                if freq < self.frequency_cutoff:
-                    continue
-                atom.add_disps(freq * self.frequency_scale, disps[1:])
-                if i == 0:
-                    # if not freq > 99999:
-                    # print freq * self.frequency_scale, disps[0]
-                    self.data['micro'].freq.append([freq * self.frequency_scale, disps[0]])
+        self.data['micro'].set_modes(frequencies[core_modes],
+                                     gaussian_log.masses[core_modes],
+                                     gaussian_log.displacements[core_modes, :len(atom_names_list)])
 
         # Add PseudoMolecules
-        for i, pseudoMol in enumerate(ProtoAtom.pseudoMolecules):
+        for i, pseudoMol in enumerate(zmatrix.pseudoMolecules):
             name = 'pointMass_{}'.format(i)
             self.data.give_daba_molecule(name, properties=[0, 0, 0, 0])
             self.data[name].give_atom(name=name + 'atom',
                                       element='H',
                                       cart=[pseudoMol.x, pseudoMol.y, pseudoMol.z],
                                       molecule=self.data[name])
-            atom = self.data[name].atoms[0]
-            for freq, disps in pseudoMol.disps.items():
-                if disps[0] == 99999999:
-                    continue
-
-                freq = float(freq.split(':')[1])
-                # if freq < self.frequency_cutoff:
-                #     continue
-                # print freq, disps
-                atom.add_disps(freq * self.frequency_scale, disps[1:])
-                # if not freq > 99999:
-                # print freq * self.frequency_scale, disps[0]
-                self.data[name].freq.append([freq * self.frequency_scale, disps[0]])
-
-
-class FrequencyReader(object):
-    def __init__(self, fileName):
-        self.counter = 1
-        self.frequencies = {}
-        self.buffer = []
-        self.columnMap = {}
-        tryblock = False
-        with open(fileName, 'r') as fp:
-            for line in fp.readlines():
-                if 'Harmonic frequencies (cm**-1)' in line:
-                    tryblock = False
-                if ' Coord Atom Element:' in line:
-                    tryblock = True
-                if 'Frequencies ---' in line:
-                    if self.buffer:
-                        self.flush()
-                    self.bufferFrequencies(line)
-                elif 'Reduced masses ---' in line:
-                    self.parseMasses(line)
-                elif tryblock:
-                    try:
-                        int(line[3])
-                        int(line[9])
-                        int(line[15])
-                    except:
-                        pass
-                    else:
-                        self.parseDisplacements(line)
-
-    def bufferFrequencies(self, line):
-        self.columnMap = {}
-        line = [f for f in line.strip().split()[2:]]
-        for i, freq in enumerate(line):
-            self.columnMap[i] = self.counter
-            self.frequencies[self.counter] = Frequency(freq, self.counter)
-            self.counter += 1
-            # print self.columnMap.items()
-
-    def parseMasses(self, line):
-        line = line.split('---')[1][1:-1]
-        i = 0
-        chunks = []
-        while True:
-            chunk = line[i:i + 10]
-            i += 10
-            if not chunk:
-                break
-            try:
-                chunk = float(chunk)
-            except ValueError:
-                chunk = 99999999
-            chunks.append(chunk)
-        for i, mass in enumerate(chunks):
-            self.frequencies[self.columnMap[i]].addMass(mass)
-
-    def parseDisplacements(self, line):
-        line = [i for i in line.strip().split() if i]
-        coord, atom, element = line[:3]
-        disps = line[3:]
-        # print atom, disps
-        for i, disp in enumerate(disps):
-            self.frequencies[self.columnMap[i]].addDisplacement(atom, coord, disp)
-
-
-class Frequency(object):
-    def __init__(self, freq, number):
-        self.number = number
-        self.freq = float(freq)
-        self.coreAtoms = ProtoAtom.coreAtoms
-        self.displacements = []
-
-    def addMass(self, mass):
-        self.mass = mass
-        # print self.freq, self.mass
-
-    def addDisplacement(self, atom, coord, disp):
-        self.displacements.append(disp)
-        atom = int(atom) - 1
-        try:
-            protoAtom = self.coreAtoms[atom]
-        except IndexError:
-            try:
-                protoAtom = ProtoAtom.atomByID[atom + 1]
-            except KeyError:
-                pass
-            else:
-                protoAtom.addDisplacement(coord, self, disp)
-        else:
-            protoAtom.addDisplacement(coord, self, disp)
+            self.data[name].set_modes(frequencies[modes],
+                                      gaussian_log.masses[modes],
+                                      gaussian_log.displacements[modes, pseudoMol.ID - 1])
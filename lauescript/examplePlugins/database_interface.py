@@ -1,69 +1,135 @@
-"""
-Created on 09.02.2014
-
-@author: Jens Luebben
-
-Plugin providing an interface to the database generator.
-This plugin is usually called by the APD-Toolkit automatically
-if necessary but can also be manually called to compile
-database files for certain temperatures.
-"""
-
-KEY = 'D'
-# OPTION_ARGUMENTS = 'T'
-HEADLINE = '             APD-Toolkit Database Generator           '
-BOTTOMLINE = '             Database generation completed            '
-
-
-def run(configurator):
-    """
-    Called by the plugin manager. Accesses the 'data'
-    instance returned by the plugin manager and generates
-    a database file based on the attributs of 'data'
-    """
-    global printer, config
-    config = configurator
-    printer = config.setup()
-    data = config.get_variable()
-    generate(data)
-
-
-def generate(data):
-    """
-    Sets up the database generator depending on the use input
-    provided by the plugin manager.
-    """
-    import lauescript.database as db
-    from lauescript.types.data import GENERATOR
-
-    if config.arg('clean'):
-        clean = True
-    else:
-        clean = False
-    temperatures = []
-    # ===========================================================================
-    # for arg in mo['options']:
-    #     try:
-    #         temperatures.append(float(arg))
-    #     except:
-    #         pass
-    #===========================================================================
-    if not clean:
-        db.generate_database(data,
-                             config.get_frequency_cutoff(),
-                             clean=False,
-                             temperatures=temperatures,
-                             path=config.config.DatabasePath,
-                             root=config.get_config_value('Database', 'modelcompountrootdirectory'),
-                             newh=config.get_config_value('APD', 'newH'))
-        return
-
-    if config.arg('save'):
-        save = True
-    else:
-        save = False
-    data = GENERATOR(temperatures, save)
-    db.generate_database(data, config.get_frequency_cutoff(),
-                         root=config.get_config_value('Database', 'modelcompountrootdirectory'),
-                         frequency_scale=config.get_config_valueFloat('Database', 'frequency_scale'),
-                         newh=config.get_config_value('APD', 'newH'))
\ No newline at end of file
+"""
+Created on 09.02.2014
+
+@author: Jens Luebben
+
+Plugin providing an interface to the database generator.
+This plugin is usually called by the APD-Toolkit automatically
+if necessary but can also be manually called to compile
+database files for certain temperatures.
+
+Use the 'compile' option to convert all database text files in the
+database directory to the binary database format. Together with
+'clean', the binary database files are written during the generation.
+
+Use the 'grid' option to calculate ADPs for a range of temperatures
+in one pass, e.g. 'grid 90:300:1'. The ADPs for all temperatures are
+written to a single multi temperature database file.
+
+Use the 'incremental' option together with 'clean' to read only model
+compounds whose files changed since the last run. The existing database
+files are updated instead of being rewritten.
+"""
+
+KEY = 'D'
+OPTION_ARGUMENTS = {'grid': None}
+HEADLINE = '             APD-Toolkit Database Generator           '
+BOTTOMLINE = '             Database generation completed            '
+
+
+def run(configurator):
+    """
+    Called by the plugin manager. Accesses the 'data'
+    instance returned by the plugin manager and generates
+    a database file based on the attributs of 'data'
+    """
+    global printer, config
+    config = configurator
+    printer = config.setup()
+    data = config.get_variable()
+    generate(data)
+
+
+def generate(data):
+    """
+    Sets up the database generator depending on the use input
+    provided by the plugin manager.
+    """
+    import lauescript.database as db
+    from lauescript.types.data import GENERATOR
+
+    if config.arg('clean'):
+        clean = True
+    else:
+        clean = False
+    binary = bool(config.arg('compile'))
+    if binary and not clean:
+        compile_databases(config.get_databasepath())
+        return
+
+    temperatures = []
+    batch = False
+    if config.arg('grid') or 'grid' in config.get_raw_args():
+        try:
+            temperatures = get_temperature_grid(config.arg('grid'))
+        except ValueError as error:
+            printer('Error: {}'.format(error))
+            return
+        batch = True
+    # ===========================================================================
+    # for arg in mo['options']:
+    #     try:
+    #         temperatures.append(float(arg))
+    #     except:
+    #         pass
+    #===========================================================================
+    if not clean:
+        db.generate_database(data,
+                             config.get_frequency_cutoff(),
+                             clean=False,
+                             temperatures=temperatures,
+                             path=config.config.DatabasePath,
+                             root=config.get_config_value('Database', 'modelcompountrootdirectory'),
+                             newh=config.get_config_value('APD', 'newH'),
+                             batch=batch,
+                             workers=config.get_worker_count())
+        return
+
+    if config.arg('save'):
+        save = True
+    else:
+        save = False
+    data = GENERATOR(temperatures, save)
+    db.generate_database(data, config.get_frequency_cutoff(),
+                         root=config.get_config_value('Database', 'modelcompountrootdirectory'),
+                         frequency_scale=config.get_config_valueFloat('Database', 'frequency_scale'),
+                         newh=config.get_config_value('APD', 'newH'),
+                         batch=batch,
+                         workers=config.get_worker_count(),
+                         incremental=bool(config.arg('incremental')),
+                         binary=binary)
+
+
+def get_temperature_grid(string):
+    """
+    Converts a string of the format 'Tmin:Tmax:step' to a list of
+    temperatures. The step defaults to 1 K.
+    Raises a ValueError if the string is missing or malformed.
+    """
+    usage = 'The grid option requires temperatures in the format Tmin:Tmax:step, e.g. \'grid 90:300:1\'.'
+    if not isinstance(string, basestring) or not string:
+        raise ValueError(usage)
+    try:
+        values = [float(value) for value in string.split(':')]
+    except ValueError:
+        raise ValueError(usage)
+    if not 2 <= len(values) <= 3:
+        raise ValueError(usage)
+    tmin, tmax = values[0], values[1]
+    step = values[2] if len(values) > 2 else 1.
+    if step <= 0 or tmax < tmin:
+        raise ValueError('Invalid temperature grid {}: Tmax must not be smaller than Tmin and the step '
+                         'must be positive.'.format(string))
+    return [tmin + i * step for i in xrange(int(round((tmax - tmin) / step)) + 1)]
+
+
+def compile_databases(path):
+    """
+    Compiles all database text files in 'path' to binary database files.
+    """
+    from glob import glob
+    from lauescript.laueio.binary_database import compile_database
+
+    for filename in sorted(glob(path + '/APD_DABA_*_.txt')):
+        printer('Compiling {}...'.format(filename))
+        printer('  ...written to {}.'.format(compile_database(filename)))
@@ -32,5 +32,6 @@ def run(pluginManager):
 
         printer('\nName: {}\nInvariom Priority: {}'
                 '\nNumber of H atoms: {}'
-                '\nAverage H-bond length: {:5.3f}'.format(molecule, molecule.criterion.replace('  ', ''),
+                '\nAverage H-bond length: {:5.3f}'.format(molecule,
+                                                          getattr(molecule, 'criterion', 'unknown').replace('  ', ''),
                                                           len(h_atoms), average_bond_length))
@@ -23,6 +23,7 @@ averaged.
 
 
 from lauescript.cryst.iterators import database, atoms_of_element
+from lauescript.laueio.database_index import open_index
 from numpy import mean
 
 KEY = 'gethdist'  # Edit this to control which cmd line keyword starts the plugin.
@@ -65,8 +66,10 @@ def run(pluginManager):
     altcount = 0
     dist = 0.0
     #print "\nhydrogen.invarioms.keys()[0] bond hydrogen.name name2 name3 \n"
-    for molecule in database(pluginManager):
-        if molecule.name in list(hmodelsdict.values()):
+    index = open_index(path_string)
+    names = [name for name in sorted(set(hmodelsdict.values())) if name in index.rows]
+    for molecule in database(pluginManager, names):
+        if molecule.name in hmodelsdict.values():
             #printer(molecule)
             count=count+1
             h_atoms = atoms_of_element(molecule, 'H')
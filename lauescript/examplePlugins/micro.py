@@ -20,6 +20,7 @@ def run(config):
     configures the database generator to generate
     the desired database file.
     """
+    import os
     import lauescript.database as db
     from lauescript.types.data import GENERATOR
     from lauescript.laueio.inout import FlexLoad
@@ -30,12 +31,19 @@ def run(config):
     dabapath = '.'
     match = 'geom'
     if config.arg('generate'):
+        path = config.arg('load')
+        frequency_scale = config.get_config_valueFloat('Database', 'frequency_scale')
+        if os.path.isdir(path):
+            generate_directory(config, printer, path, frequency_scale)
+            apd_exit(0)
         printer('Generating new micro database.')
         data = GENERATOR([], True)
-        path = config.arg('load')
-        db.generate_micro_database(data, config.get_frequency_cutoff(), path=path,
-                                   printer=printer, clustersize=int(config.arg('cluster')),
-                                   frequency_scale=config.get_config_valueFloat('Database', 'frequency_scale'))
+        try:
+            db.generate_micro_database(data, config.get_frequency_cutoff(), path=path,
+                                       printer=printer, clustersize=int(config.arg('cluster')),
+                                       frequency_scale=frequency_scale)
+        except (IOError, ValueError) as error:
+            apd_exit(1, '\n\nERROR: {}'.format(error))
         apd_exit(0)
     data = config.get_variable()
     printer('Loading data.')
@@ -58,4 +66,33 @@ def run(config):
         FlexLoad(data, loader, dabapath, config)
     printer('Loading successful.')
 
-    data.update(match=match)
\ No newline at end of file
+    data.update(match=match)
+
+
+def generate_directory(config, printer, path, frequency_scale):
+    """
+    Generates a micro database for every ONIOM log file found in the
+    directory 'path' and its subdirectories. The log files are processed
+    in parallel. The '*_micro' output directories of previous runs are
+    skipped and only log files of ONIOM calculations are used.
+    """
+    import os
+    import lauescript.database as db
+
+    logs = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = [dirname for dirname in dirnames if not dirname.endswith('_micro')]
+        logs += [os.path.join(dirpath, filename) for filename in sorted(filenames)
+                 if filename.endswith('.log') and db.is_oniom_log(os.path.join(dirpath, filename))]
+    printer('Generating micro databases for {} log files.'.format(len(logs)))
+    failed = 0
+    for log, error in db.generate_micro_databases(sorted(logs), config.get_frequency_cutoff(),
+                                                  clustersize=int(config.arg('cluster')),
+                                                  frequency_scale=frequency_scale,
+                                                  workers=config.get_worker_count()):
+        if error:
+            failed += 1
+            printer('Failed: {}\n    {}'.format(log, error))
+        else:
+            printer('Done:   {} -> {}'.format(log, db.micro_database_directory(log)))
+    printer('\n{} of {} micro databases generated.'.format(len(logs) - failed, len(logs)))
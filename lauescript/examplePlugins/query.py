@@ -0,0 +1,66 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Plugin for querying the invarioms and model compounds of the database
+without loading the database files.
+
+Use 'invariom <name>' to list all compounds containing an invariom,
+'element <symbol>' to list all invarioms of an element, 'compound <name>'
+to list the atoms and invarioms of a compound and 'search <prefix>' or
+'regex <expression>' to search invariom names. The 'rebuild' option
+forces a rebuild of the index file.
+
+Other plugins should use 'lauescript.laueio.database_index.open_index()'
+directly.
+"""
+KEY = 'query'
+OPTION_ARGUMENTS = {'invariom': None,
+                    'element': None,
+                    'compound': None,
+                    'search': None,
+                    'regex': None}
+
+
+def run(config):
+    """
+    Called by the plugin manager.
+    """
+    from lauescript.laueio.database_index import open_index
+
+    printer = config.setup()
+    index = open_index(config.get_databasepath(), rebuild=bool(config.arg('rebuild')))
+    printer('Database index: {} invarioms in {} compounds.'.format(len(index), len(index.compounds)))
+
+    invariom = config.arg('invariom')
+    if invariom:
+        compounds = index.get_compounds(invariom)
+        printer('\nInvariom {} occurs in {} compounds.'.format(invariom, len(compounds)))
+        printer('Mapped to: {}'.format(index.get_mapped_compound(invariom)))
+        for name in compounds:
+            printer('    {}'.format(name))
+
+    element = config.arg('element')
+    if element:
+        invarioms = index.get_invarioms(element)
+        printer('\n{} invarioms of element {}:'.format(len(invarioms), element))
+        for name in invarioms:
+            printer('    {}'.format(name))
+
+    compound = config.arg('compound')
+    if compound:
+        if not compound in index.rows:
+            printer('\nCompound {} not found.'.format(compound))
+        else:
+            printer('\nAtoms of compound {}:'.format(compound))
+            for name, element, invarioms in index.get_atoms(compound):
+                printer('    {:8} {}'.format(name, ' '.join(invarioms)))
+
+    for option, regex in (('search', False), ('regex', True)):
+        pattern = config.arg(option)
+        if pattern:
+            matches = index.search(pattern, regex=regex)
+            printer('\n{} invarioms matching {}:'.format(len(matches), pattern))
+            for name in matches:
+                printer('    {:30} {}'.format(name, len(index.get_compounds(name))))
@@ -9,12 +9,18 @@ over several threshold sets.
 Use the 'get_invariom_names_simple' functions if no iterator behavior
 is desired.
 """
+import os
+import json
+import atexit
+import tempfile
+from hashlib import sha1
 import numpy as np
 from numpy.linalg import norm
-from sys import stdout
+from sys import stdout, platform
 from string import ascii_letters
 from lauescript.cryst.rings import find_planar_rings
-from sklearn.neighbors import NearestNeighbors
+from lauescript.cryst.neighbors import get_neighbors_within, get_neighbor_pairs
+from lauescript.laueio.arrayfile import replace_file
 
 covalence_radius = {'H': .37, 'He': .0, 'Li': 1.23, 'Be': .90, 'B': .80, 'C': .77,
                     'N': .74, 'O': .71, 'F': .72, 'Ne': 0., 'Na': 1.54, 'Mg': 1.36,
@@ -34,6 +40,15 @@ electro_negativ = {'H': 2.20, 'He': 5.50, 'Li': .97, 'Be': 1.47, 'B': 2.01, 'C':
                    'Se': 2.48, 'Br': 2.74, 'Kr': 2.90,
                    'Rb': .89}
 
+# Order, priority and growth behavior of the bond order codes returned
+# by 'get_bond_orders()'. A growth behavior of None keeps the current
+# value of 'Bond.grow'.
+BOND_ORDERS = (('1', '000', False),
+               ('~', '790', True),
+               ('2', '800', True),
+               ('3', '900', None),
+               ('1', '000', True))
+
 electron_number = {'H': '001', 'He': '002', 'Li': '003', 'Be': '004', 'B': '005', 'C': '006', 'N': '007', 'O': '008',
                    'F': '009', 'Ne': '010', 'Na': '011', 'Mg': '012', 'Al': '013', 'Si': '014', 'P': '015',
                    'S': '016', 'Cl': '017', 'Ar': '018', 'K': '019', 'Ca': '020', 'Sc': '021', 'Ti': '022',
@@ -44,7 +59,9 @@ tsm = 0.0847,
 tmd = 0.184,
 tdt = 0.27,
 
-v = False
+invariom_maps = {}
+
+NAME_CACHE_VERSION = 1
 
 def get_invariom_names(names,
                        cart=None,
@@ -60,7 +77,8 @@ def get_invariom_names(names,
                        dynamic=False,
                        classic=True,
                        newH=True,
-                       planarityThreshold=.1):
+                       planarityThreshold=.1,
+                       cache=None):
     """
     Generator that returns the desired output once for every set
     of threshold values.
@@ -90,7 +108,8 @@ def get_invariom_names(names,
     provided by the 'names' argument.
 
     :param compounds: must be a filepointer to the 'APD_MAP.txt' file int the
-    database directory or None. If not None a dictionary is returned keying
+    database directory, the path of that file, a dictionary returned by
+    'get_invariom_map()' or None. If not None a dictionary is returned keying
     the name of the corresponding model compound to the invariom names.
 
     :param orientations: specifies whether a dictionary keying two orientation
@@ -117,57 +136,41 @@ def get_invariom_names(names,
     :param classic: must be a boolean. If True, double bonded atoms do not
     imply that the next neighbor must also be considered.
 
+    :param cache: can be an InvariomNameCache instance or the path of a
+    cache file. Invariom names of chemical enviroments found in the
+    cache are not generated again. New enviroments are added to the
+    cache. If a path is given, the instance returned by
+    'open_name_cache()' is used. Otherwise the caller is responsible
+    for calling the cache's save() method.
+
     :return: The return value depends on the chosen parameters but is always
     a list with the same order. The first element contains the list/dict of
     invariom names. The following elements are present if the corresponding
     parameters are set to 'True'.
     """
-    if verbose:
-        global v
-        v = True
+    if not cart and (frac is None or cell is None):
+        raise ValueError('Either cartesian coordinates or fractional coordinates and a cell are required.')
     if not output:
         output = stdout
-    global printer, classic_names
-    printer = output
-    classic_names = classic
 
     if dynamic:
         thresholds = [[0.0827, 0.184, 0.27], [0.0927, 0.194, 0.27], [0.07, 0.160, 0.27]]
-    elif not thresholds:
-        thresholds = [[0.0827, 0.0847, 0.27]]
 
-    global invfilter
-    invfilter = CorrectionFilter(corrections)
-
-    generator = InvariomGenerator(thresholds)
+    if isinstance(cache, basestring):
+        cache = open_name_cache(cache)
+    namer = InvariomNamer(thresholds=thresholds,
+                          corrections=corrections,
+                          compounds=compounds,
+                          classic=classic,
+                          newH=newH,
+                          planarityThreshold=planarityThreshold,
+                          cache=cache,
+                          output=output,
+                          verbose=verbose)
     if cart:
-        generator.populate(names, cart, system='cart', planarityThreshold=planarityThreshold)
-    elif frac:
-        generator.populate(names, frac, system='frac', cell=cell, planarityThreshold=planarityThreshold)
-
-    if compounds:
-        invariom_map = compounds.readlines()
-
-    returnlists = []
-    for l in xrange(len(thresholds)):
-        returnlist = []
-        name_dictionary = {}
-        orientation_dictionary = {}
-        for i, j, k, atom in generator.harvest(l):
-            if newH:
-                element = Atom.generateElement(i)
-                if element == 'H':
-                    j = newAge(generator.get_invariom_name_of(i, l), atom, generator, l)
-            name_dictionary[i] = j
-            orientation_dictionary[i] = k
-
-        if dictionary:
-            returnlist.append(name_dictionary)
-        if orientations:
-            returnlist.append(orientation_dictionary)
-        if compounds:
-            returnlist.append(get_compounds(invariom_map, name_dictionary.values()))
-        returnlists.append(returnlist)
+        returnlists = namer.name(names, cart, dictionary=dictionary, orientations=orientations)
+    else:
+        returnlists = namer.name(names, frac, cell=cell, dictionary=dictionary, orientations=orientations)
     for returnlist in returnlists:
         yield returnlist
 
@@ -257,7 +260,8 @@ def get_invariom_names_simple(names,
     provided by the 'names' argument.
 
     :param compounds: must be a filepointer to the 'APD_MAP.txt' file int the
-    database directory or None. If not None a dictionary is returned keying
+    database directory, the path of that file, a dictionary returned by
+    'get_invariom_map()' or None. If not None a dictionary is returned keying
     the name of the corresponding model compound to the invariom names.
 
     :param orientations: specifies whether a dictionary keying two orientation
@@ -289,134 +293,510 @@ def get_invariom_names_simple(names,
     invariom names. The following elements are present if the corresponding
     parameters are set to 'True'.
     """
-    if verbose:
-        pass
+    if not cart and (frac is None or cell is None):
+        raise ValueError('Either cartesian coordinates or fractional coordinates and a cell are required.')
     if not output:
         output = stdout
-    global printer, classic_names
-    printer = output
-    classic_names = classic
 
     if dynamic:
         thresholds = [[0.0827, 0.0847, 0.27], [0.0927, 0.0947, 0.27], [0.049, 0.0847, 0.27]]
-    elif not thresholds:
-        thresholds = [[0.0827, 0.0847, 0.27]]
 
-    global invfilter
-    invfilter = CorrectionFilter(corrections)
-
-    generator = InvariomGenerator(thresholds)
+    namer = InvariomNamer(thresholds=thresholds,
+                          corrections=corrections,
+                          compounds=compounds,
+                          classic=classic,
+                          newH=False,
+                          planarityThreshold=planarityThreshold,
+                          output=output)
     if cart:
-        generator.populate(names, cart, system='cart', planarityThreshold=planarityThreshold)
-    elif frac:
-        generator.populate(names, frac, system='frac', cell=cell, planarityThreshold=planarityThreshold)
-
-    if compounds:
-        invariom_map = compounds.readlines()
-
-    returnlists = []
-    for l in xrange(len(thresholds)):
-        returnlist = []
-        name_dictionary = {}
-        orientation_dictionary = {}
-        for i, j, k, _ in generator.harvest(l):
-            # ===================================================================
-            # try:
-            # name_dictionary[i].append(j)
-            #     orientation_dictionary[i].append(k)
-            #     #===============================================================
-            #     # if not  name_dictionary[i][0]==name_dictionary[i][1]:
-            #     #     print i,name_dictionary[i][0],j
-            #     #===============================================================
-            #===================================================================
-
-            #===================================================================
-            # except:
-            #===================================================================
-
-            #===================================================================
-            # if classic:
-            #     j=truncate_neighbors(j)
-            #===================================================================
-            name_dictionary[i] = j
-            orientation_dictionary[i] = k
-
-        if dictionary:
-            returnlist.append(name_dictionary)
-        if orientations:
-            returnlist.append(orientation_dictionary)
-        if compounds:
-            invariom_map = compounds.readlines()
-            returnlist.append(get_compounds(invariom_map, name_dictionary.values()))
-        returnlists.append(returnlist)
-        # =======================================================================
-        # yield returnlist
-        # =======================================================================
+        returnlists = namer.name(names, cart, dictionary=dictionary, orientations=orientations)
+    else:
+        returnlists = namer.name(names, frac, cell=cell, dictionary=dictionary, orientations=orientations)
     if not dynamic:
         return returnlists[0]
     else:
         return returnlists
 
 
-def get_compounds(invariom_map, invariom_names):
+def get_invariom_map(compounds):
+    """
+    Parses the 'APD_MAP.txt' file. The parsed map is cached for the
+    lifetime of the process and is only parsed again if the file
+    changes.
+
+    :param compounds: filepointer to the 'APD_MAP.txt' file, the path
+    of the file or an already parsed dictionary.
+
+    :return: Dictionary keying invariom names to model compound names.
+    """
+    if isinstance(compounds, dict):
+        return compounds
+    if isinstance(compounds, basestring):
+        filename = compounds
+    else:
+        filename = getattr(compounds, 'name', None)
+    if not filename or not os.path.isfile(filename):
+        return parse_invariom_map(compounds)
+    key = os.path.abspath(filename)
+    mtime = os.path.getmtime(filename)
+    try:
+        cached_mtime, invariom_map = invariom_maps[key]
+        if cached_mtime == mtime:
+            return invariom_map
+    except KeyError:
+        pass
+    with open(filename) as fp:
+        invariom_map = parse_invariom_map(fp)
+    invariom_maps[key] = (mtime, invariom_map)
+    return invariom_map
+
+
+def parse_invariom_map(lines):
+    """
+    :param lines: Iterable of strings in the format of the
+    'APD_MAP.txt' file.
+
+    :return: Dictionary keying invariom names to model compound names.
+    """
+    invariom_map = {}
+    for line in lines:
+        line = line.partition(':')
+        invariom_map[line[0]] = line[2].rstrip('\n')
+    return invariom_map
+
+
+def get_compounds(invariom_map, invariom_names, output=None):
     """
     Links every invariom name to the name of the 'smallest'
     model compound that it occurs in.
 
-    :param invariom_map: filepointer to the 'APD_MAP.txt' file
-    in the database directory.
+    :param invariom_map: dictionary returned by 'get_invariom_map()'
+    or the lines of the 'APD_MAP.txt' file in the database directory.
 
     :param invariom_names: list of invariom names ordered corresponding
     to the atom names list passed to the interface functions.
 
+    :param output: callable used for reporting invariom names missing
+    in 'invariom_map'. If None, nothing is reported.
+
     :return: Dictionary keying model compound names to their
     corresponding invariom names.
     """
+    if not isinstance(invariom_map, dict):
+        invariom_map = parse_invariom_map(invariom_map)
     compounds_dict = {}
-    for line in invariom_map:
-        line = line.partition(':')
-        if any([line[0] == name for name in invariom_names]):
-            compounds_dict[line[0]] = line[2].rstrip('\n')
-
     missing = []
     for name in invariom_names:
-        if not name in compounds_dict.keys():
+        try:
+            compounds_dict[name] = invariom_map[name]
+        except KeyError:
             missing.append(name)
-    if len(missing) > 0 and v:
-        printer('\nError: Not all invarioms found in Database.')
+    if len(missing) > 0 and output:
+        output('\nError: Not all invarioms found in Database.')
         for miss in missing:
-            printer(miss)
-        printer()
+            output(miss)
+        output()
     return compounds_dict
 
 
+def _run_naming_job(namer, job, dictionary, orientations):
+    """
+    Generates the invariom names of a single (names, coordinates, cell)
+    job with 'namer'.
+
+    :return: List returned by 'InvariomNamer.name()' or a string
+    describing the error.
+    """
+    names, coordinates, cell = job
+    try:
+        return namer.name(names, coordinates, cell=cell, dictionary=dictionary, orientations=orientations)
+    except Exception as error:
+        return '{}: {}'.format(type(error).__name__, error)
+
+
+_worker = None
+
+
+def _init_naming_worker(options, names, dictionary, orientations):
+    """
+    Initializer of the worker processes used by 'iter_invariom_names()'.
+    Loads the correction table, the invariom map and the cached names
+    once per process.
+    """
+    global _worker
+    cache = None
+    if names is not None:
+        cache = InvariomNameCache()
+        cache.names = names
+    _worker = InvariomNamer(cache=cache, **options), dictionary, orientations
+
+
+def _naming_job(job):
+    """
+    Worker function used by 'iter_invariom_names()'.
+
+    :return: Tuple: (result, names) where 'result' is the value returned
+    by '_run_naming_job()' and 'names' is a dictionary of the cache
+    entries added since the last job.
+    """
+    namer, dictionary, orientations = _worker
+    result = _run_naming_job(namer, job, dictionary, orientations)
+    if namer.cache is None:
+        return result, None
+    return result, namer.cache.take_new_names()
+
+
+def iter_invariom_names(jobs,
+                        workers=None,
+                        chunksize=None,
+                        thresholds=None,
+                        dictionary=True,
+                        orientations=True,
+                        compounds=None,
+                        corrections=None,
+                        dynamic=True,
+                        classic=True,
+                        newH=True,
+                        planarityThreshold=.1,
+                        cache=None):
+    """
+    Generates the invariom names of many structures using a pool of
+    worker processes. The function does not depend on module level
+    state and can be used concurrently.
+
+    :param jobs: Iterable of (names, coordinates, cell) tuples. If 'cell'
+    is None, the coordinates are cartesian. Otherwise they are
+    fractional coordinates and 'cell' is a list of six floats.
+    :param workers: Integer representing the number of worker processes.
+    Defaults to the number of CPUs. If 1, all structures are processed
+    in the current process.
+    :param chunksize: Integer representing the number of jobs sent to a
+    worker at once.
+    :param compounds: path of the 'APD_MAP.txt' file or a dictionary
+    returned by 'get_invariom_map()'. Loaded once per worker.
+    :param corrections: path of a 'empirical_corrections.txt' file.
+    Loaded once per worker.
+    :param cache: InvariomNameCache instance or the path of a cache file.
+    All workers start with the cached names. Names generated by the
+    workers are added to the cache. If a path is given, the cache file
+    is updated once all jobs are done.
+
+    The remaining parameters are used as in 'get_invariom_names()'.
+
+    :return: Generator yielding one item per job in the order of 'jobs':
+    the list of return lists yielded by 'get_invariom_names()' or a
+    string describing the error if the job failed.
+    """
+    from multiprocessing import Pool, cpu_count
+
+    if dynamic:
+        thresholds = [[0.0827, 0.184, 0.27], [0.0927, 0.194, 0.27], [0.07, 0.160, 0.27]]
+    save_cache = isinstance(cache, basestring)
+    if save_cache:
+        cache = open_name_cache(cache)
+    options = {'thresholds': thresholds,
+               'corrections': corrections,
+               'compounds': compounds,
+               'classic': classic,
+               'newH': newH,
+               'planarityThreshold': planarityThreshold}
+    try:
+        if platform.startswith('win') or workers == 1:
+            namer = InvariomNamer(cache=cache, **options)
+            for job in jobs:
+                yield _run_naming_job(namer, job, dictionary, orientations)
+            return
+        if not workers:
+            workers = cpu_count()
+        if not chunksize:
+            chunksize = max(1, len(jobs) // (16 * workers)) if hasattr(jobs, '__len__') else 1
+        pool = Pool(workers, _init_naming_worker,
+                    (options, cache.names if cache is not None else None, dictionary, orientations))
+        try:
+            for result, names in pool.imap(_naming_job, jobs, chunksize):
+                if names:
+                    cache.update(names)
+                yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    finally:
+        if save_cache:
+            cache.save()
+
+
+class InvariomNamer(object):
+    """
+    Class for generating the invariom names of structures with a
+    common set of parameters. All parameters are stored in the
+    instance, so several instances can be used independently.
+    """
+
+    def __init__(self,
+                 thresholds=None,
+                 corrections=None,
+                 compounds=None,
+                 classic=True,
+                 newH=True,
+                 planarityThreshold=.1,
+                 cache=None,
+                 output=None,
+                 verbose=False):
+        """
+        :param thresholds: list of threshold sets as used by
+        'get_invariom_names()'.
+        :param corrections: filepointer or path of a
+        'empirical_corrections.txt' file or None.
+        :param compounds: filepointer or path of the 'APD_MAP.txt' file,
+        a dictionary returned by 'get_invariom_map()' or None.
+        :param classic: Boolean. See 'get_invariom_names()'.
+        :param newH: Boolean. If True, the invariom names of hydrogen
+        atoms are extended by the invariom name of the bonded atom.
+        :param planarityThreshold: Float used for finding planar rings.
+        :param cache: InvariomNameCache instance or None.
+        :param output: callable used for printing messages.
+        :param verbose: Boolean. If True, missing invarioms are reported.
+        """
+        if not thresholds:
+            thresholds = [[0.0827, 0.0847, 0.27]]
+        self.thresholds = thresholds
+        if isinstance(corrections, basestring):
+            with open(corrections) as filepointer:
+                self.corrections = CorrectionFilter(filepointer, output)
+        else:
+            self.corrections = CorrectionFilter(corrections, output)
+        self.invariom_map = get_invariom_map(compounds) if compounds else None
+        self.classic = classic
+        self.newH = newH
+        self.planarityThreshold = planarityThreshold
+        self.cache = cache
+        self.output = output if verbose else None
+
+    def name(self, names, coordinates, cell=None, dictionary=True, orientations=False):
+        """
+        Generates the invariom names of a single structure.
+
+        :param names: list of unique strings identifying each atom.
+        :param coordinates: list of coordinates. If 'cell' is None, the
+        coordinates are cartesian. Otherwise they are fractional.
+        :param cell: list of six floats representing the cell parameters
+        a, b, c, alpha, beta, gamma or None.
+        :param dictionary: Boolean. See 'get_invariom_names()'.
+        :param orientations: Boolean. See 'get_invariom_names()'.
+
+        :return: list containing one return list for every set of
+        thresholds. The return lists are the values yielded by
+        'get_invariom_names()'.
+        """
+        generator = InvariomGenerator(self.thresholds, cache=self.cache, classic=self.classic,
+                                      corrections=self.corrections)
+        if coordinates is not None and len(coordinates):
+            if cell is None:
+                generator.populate(names, coordinates, system='cart', planarityThreshold=self.planarityThreshold)
+            else:
+                generator.populate(names, coordinates, system='frac', cell=cell,
+                                   planarityThreshold=self.planarityThreshold)
+
+        returnlists = []
+        for l in xrange(len(self.thresholds)):
+            returnlist = []
+            name_dictionary = {}
+            orientation_dictionary = {}
+            for i, j, k, atom in generator.harvest(l):
+                if self.newH:
+                    element = Atom.generateElement(i)
+                    if element == 'H':
+                        j = newAge(generator.get_invariom_name_of(i, l), atom, generator, l)
+                name_dictionary[i] = j
+                orientation_dictionary[i] = k
+
+            if dictionary:
+                returnlist.append(name_dictionary)
+            if orientations:
+                returnlist.append(orientation_dictionary)
+            if self.invariom_map is not None:
+                returnlist.append(get_compounds(self.invariom_map, name_dictionary.values(), self.output))
+            returnlists.append(returnlist)
+        return returnlists
+
+
+class InvariomNameCache(object):
+    """
+    Class for caching invariom names of chemical enviroments.
+
+    The cache keys the hashes returned by 'Enviroment.get_key()' to
+    invariom names. If a filename is given, the cache is read from
+    that file and 'save()' writes new entries back to it. Missing or
+    unreadable cache files are ignored.
+    """
+
+    def __init__(self, filename=None):
+        """
+        :param filename: String representing the path of the cache file.
+        """
+        self.filename = filename
+        self.names = {}
+        self.new_names = {}
+        self.modified = False
+        if not filename:
+            return
+        try:
+            with open(filename) as fp:
+                content = json.load(fp)
+        except (IOError, ValueError):
+            return
+        if content.get('version') == NAME_CACHE_VERSION:
+            self.names = {str(key): str(name) for key, name in content['names'].items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, key):
+        """
+        :param key: String returned by 'Enviroment.get_key()'.
+        :return: String representing the cached invariom name or None.
+        """
+        return self.names.get(key)
+
+    def add(self, key, name):
+        """
+        Adds an invariom name to the cache.
+
+        :param key: String returned by 'Enviroment.get_key()'.
+        :param name: String representing the invariom name.
+        """
+        self.names[key] = name
+        self.new_names[key] = name
+        self.modified = True
+
+    def update(self, names):
+        """
+        Adds several invariom names to the cache.
+
+        :param names: Dictionary keying hashes to invariom names.
+        """
+        for key, name in names.items():
+            self.add(key, name)
+
+    def take_new_names(self):
+        """
+        :return: Dictionary of all entries added since the last call.
+        """
+        names, self.new_names = self.new_names, {}
+        return names
+
+    def save(self):
+        """
+        Writes the cache file if new names were added. Errors are
+        ignored since the cache is optional.
+        """
+        if not self.filename or not self.modified:
+            return
+        try:
+            handle, temporary = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(self.filename),
+                                                 dir=os.path.dirname(os.path.abspath(self.filename)))
+        except (IOError, OSError):
+            return
+        try:
+            mask = os.umask(0)
+            os.umask(mask)
+            os.chmod(temporary, 0o666 & ~mask)
+            with os.fdopen(handle, 'w') as fp:
+                json.dump({'version': NAME_CACHE_VERSION, 'names': self.names}, fp)
+            replace_file(temporary, self.filename)
+        except (IOError, OSError):
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+        self.modified = False
+
+
+_name_caches = {}
+
+
+def open_name_cache(filename):
+    """
+    Returns the shared InvariomNameCache instance of a cache file. The
+    file is read once per process and written when the interpreter
+    exits, so repeated calls of 'get_invariom_names()' do not read and
+    write the file every time.
+
+    :param filename: String representing the path of the cache file.
+    :return: InvariomNameCache instance.
+    """
+    filename = os.path.abspath(filename)
+    try:
+        return _name_caches[filename]
+    except KeyError:
+        cache = _name_caches[filename] = InvariomNameCache(filename)
+        atexit.register(cache.save)
+        return cache
+
+
+def get_bond_orders(xi, elements1, elements2, tsm, tmd, tdt):
+    """
+    Determines the bond orders of many bonds at once.
+
+    :param xi: Array of floats representing Xi of every bond.
+    :param elements1: Array of strings representing the elements of
+    the first atoms of the bonds.
+    :param elements2: Array of strings representing the elements of
+    the second atoms of the bonds.
+    :param tsm: Float threshold single meso.
+    :param tmd: Float threshold meso double.
+    :param tdt: Float threshold double triple.
+    :return: Tuple: (codes, grow). 'codes' is an integer array of
+    indices of BOND_ORDERS. 'grow' is a boolean array that is True
+    for bonds that always require next next neighbors because
+    they involve sulfur or phosphorus.
+    """
+    xi = np.asarray(xi, dtype=float)
+    codes = np.select([xi < tsm, xi < tmd, xi < tdt], [0, 1, 2], 3)
+    codes[(elements1 == 'H') | (elements2 == 'H')] = 4
+    grow = np.in1d(elements1, ('S', 'P')) | np.in1d(elements2, ('S', 'P'))
+    return codes, grow
+
+
 class InvariomGenerator(object):
     """
     Class for generating invariom names and orientations
     from atomic positions.
     """
 
-    def __init__(self, thresholds=None):
+    def __init__(self, thresholds=None, cache=None, classic=True, corrections=None):
         """
         Initializes the InvariomGenerator.
         :param thresholds: must
         be a list where each element is a list of three floats.
-        """
+        :param cache: InvariomNameCache instance or None.
+        :param classic: Boolean. See 'get_invariom_names()'.
+        :param corrections: CorrectionFilter instance or None.
+        """
+        self.cache = cache
+        self.classic = classic
+        if corrections is None:
+            corrections = CorrectionFilter(None)
+        self.corrections = corrections
         self.tms = None
         if not thresholds:
             self.thresholds = [[0.0827, 0.0847, 0.27]]
         else:
             self.thresholds = thresholds
-        self.neigh = NearestNeighbors(5, 0.4)
         self.names = None
         self.dist_result = None
         self.i = 0
         self.bonds = {}
+        self.bond_list = []
+        self.bond_xi = None
+        self.bond_elements = None
         self.atoms = {}
         self.angles = {}
         self.invariom_names = {}
         self.orientations = {}
-        self.anglehashes = []
+        self.ring_bonds = []
         self.tsm = None
         self.tmd = None
         self.tdt = None
@@ -434,23 +814,27 @@ class InvariomGenerator(object):
         self.tdt = self.thresholds[self.i][2]
         self.i += 1
 
-    def create_bond(self, atom1, atom2):
+    def create_bond(self, atom1, atom2, length=None, xi=None):
         """
         Creates a bond between atom1 and atom2.
         If the bond distance is not physically reasonable,
         the bond is deleted.
         :param atom1: Atom instance.
         :param atom2: Atom instance.
+        :param length: Float. See 'Bond.__init__()'.
+        :param xi: Float. See 'Bond.__init__()'.
+        :return: The new Bond instance or None.
         """
-        bond = Bond(atom1, atom2, self)
+        bond = Bond(atom1, atom2, self, length, xi)
         if bond.get_id() in self.bonds or bond.no_bond():
             del bond
-        else:
-            self.bonds[bond.get_id()] = bond
-            atom1.add_bond(bond)
-            atom2.add_bond(bond)
+            return None
+        self.bonds[bond.get_id()] = bond
+        atom1.add_bond(bond)
+        atom2.add_bond(bond)
+        return bond
 
-    def create_atom(self, name, coord, system, cell):
+    def create_atom(self, name, coord, system, cell, matrix=None):
         """
         Creates an atom based on the name and its coordinates.
         :param name: String representing the atom's name.
@@ -460,12 +844,14 @@ class InvariomGenerator(object):
         system is 'frac' for fractional or 'cart' for cartesian.
         :param cell: List of six floats representing cell parameters
         of the format [a, b, c, alpha, beta, gamma]
+        :param matrix: numpy matrix transforming fractional to
+        cartesian coordinates. Computed from 'cell' if None.
         """
         atom = Atom(name)
         if system == 'cart':
             atom.set_cart(coord)
         elif system == 'frac':
-            atom.set_frac(coord, cell)
+            atom.set_frac(coord, cell, matrix)
         # =======================================================================
         # else:
         # print 'Error'
@@ -476,7 +862,11 @@ class InvariomGenerator(object):
     def populate(self, names, coordinates, system='cart', cell=None, planarityThreshold=.1):
         """
         Populates the generator instance with atoms and carries
-        out all necessary computations.
+        out all necessary computations. Bonds and rings are
+        determined once. Only the bond orders are determined again
+        for every set of thresholds. Angles are not needed for
+        invariom names and orientations and are only computed on
+        request, see 'generate_angles()' and 'get_angle_data()'.
 
         :param names: List of strings where each name represents an
         atom's name.
@@ -492,22 +882,23 @@ class InvariomGenerator(object):
             print 'invsting2.py: Error. Cell missing.'
             exit()
 
-        samples = coordinates
-
-        self.neigh.fit(samples)
-        self.dist_result = self.neigh.kneighbors(samples, len(samples), return_distance=False)
-
-        for _ in xrange(len(self.thresholds)):
+        self.atoms = {}
+        matrix = None
+        if system == 'frac':
+            matrix = Atom._get_frac2cart_matrix(cell)
+        for i, name in enumerate(names):
+            self.create_atom(name, coordinates[i], system, cell, matrix)
+        self.find_neighbors()
+        for i in xrange(len(self.thresholds)):
             self.next()
-            self.atoms = {}
-            for i, name in enumerate(names):
-                self.create_atom(name, coordinates[i], system, cell)
-            self.generate_bonds()
-            self.generate_angles()
-            self.find_rings(planarityThreshold)
+            if not i:
+                self.generate_bonds()
+                self.find_rings(planarityThreshold)
+            else:
+                self.classify_bonds()
             self.grow_enviroments()
             for name, atom in self.atoms.items():
-                if invfilter.correct(atom.enviroment):
+                if self.corrections.correct(atom.enviroment):
                     orientation = [None, None]
                 else:
                     orientation = atom.get_orientation()
@@ -528,39 +919,111 @@ class InvariomGenerator(object):
         for key, value in self.invariom_names.items():
             yield key, value[i], self.orientations[key][i], self.atoms[key]
 
+    def find_neighbors(self):
+        """
+        Determines the neighbors of every atom that are close enough
+        to be bound to it. The largest covalence radius of all
+        elements in the molecule defines the search radius.
+        The neighbors are sorted by their cartesian distance. Neighbors
+        with equal distance are sorted by atom index, so the reference
+        atoms of orientations with exactly equal bond lengths may differ
+        from those of the full neighbor sort used before.
+        """
+        atoms = [self.atoms[name] for name in self.names]
+        radius = 2 * max(covalence_radius[atom.get_element()] for atom in atoms) + .2
+        self.dist_result = get_neighbors_within([atom.get_cart() for atom in atoms], radius)
+
     def generate_bonds(self):
         """
-        Iterates over all atom pairs for bond generation
-        between them.
+        Generates the bonds between all pairs of neighboring atoms.
+        Bond lengths, covalent cutoffs and Xi are computed for all
+        pairs at once. Bond instances are only created for pairs
+        close enough to be bound.
         """
         self.bonds = {}
-
-        for atoms in self.dist_result:
-            for neighbor in atoms[1:]:
-                # printer('{}  -  {}'.format(atom_list[atoms[0]].get_name(), atom_list[neighbor].get_name()))
-                self.create_bond(self.atoms[self.names[atoms[0]]], self.atoms[self.names[neighbor]])
+        self.bond_list = []
+
+        atoms = [self.atoms[name] for name in self.names]
+        first, second = get_neighbor_pairs(self.dist_result)
+        coords = np.array([atom.get_cart() for atom in atoms], dtype=float).reshape((-1, 3))
+        elements = np.array([atom.get_element() for atom in atoms])
+        table, codes = np.unique(elements, return_inverse=True)
+        radii = np.array([covalence_radius[element] for element in table], dtype=float)[codes]
+        negativities = np.array([electro_negativ[element] for element in table], dtype=float)[codes]
+
+        lengths = norm(coords[first] - coords[second], axis=1)
+        cutoffs = radii[first] + radii[second]
+        bound = np.nonzero(lengths < cutoffs + .1)[0]
+        first, second = first[bound], second[bound]
+        lengths = lengths[bound]
+        xis = cutoffs[bound] - 0.08 * np.abs(negativities[first] - negativities[second]) - lengths
+
+        keep = []
+        for k, (i, j) in enumerate(zip(first, second)):
+            bond = self.create_bond(atoms[i], atoms[j], lengths[k], xis[k])
+            if bond is not None:
+                self.bond_list.append(bond)
+                keep.append(k)
+        self.bond_xi = xis[keep]
+        self.bond_elements = (elements[first[keep]], elements[second[keep]])
+        self.set_bond_orders()
+
+    def set_bond_orders(self, reset=False):
+        """
+        Determines the bond orders of all bonds based on the current
+        set of thresholds.
+
+        :param reset: Boolean. If True, the ring information of the
+        bonds is discarded.
+        """
+        codes, grow = get_bond_orders(self.bond_xi, self.bond_elements[0], self.bond_elements[1],
+                                      self.tsm, self.tmd, self.tdt)
+        for bond, code, forced in zip(self.bond_list, codes, grow):
+            if reset:
+                bond.reset_bond_order(code, forced)
+            else:
+                bond.set_bond_order(code, forced)
 
     def generate_angles(self):
         """
-        Iterates of all bond pairs for each atom to
-        instantiate all angles within the molecule.
+        Instantiates all angles within the molecule. Every
+        angle is created once for every unordered pair of bonds
+        of its central atom.
+
+        :return: Dictionary of all Angle instances.
         """
-        self.anglehashes = []
+        self.angles = {}
         for atom in self.atoms.values():
-            for bond1, bond2 in atom.iter_bond_pairs():
-                angle = Angle(atom, bond1.get_partner(atom), bond2.get_partner(atom))
+            for angle in atom.get_angles():
                 self.angles[angle.get_id()] = angle
-                self.anglehashes.append(angle.hash)
-                atom.add_angle(angle)
+        return self.angles
+
+    def get_angle_data(self):
+        """
+        Computes all angles within the molecule at once without
+        creating Angle instances.
+
+        :return: Tuple: (triples, angles, normals, centers) where
+        'triples' is a list of (central_atom, atom2, atom3) name
+        tuples and the other items are the arrays returned by
+        'compute_angles()' for these triples.
+        """
+        triples = []
+        for atom in self.atoms.values():
+            for bond1, bond2 in atom.iter_bond_pairs(unique=True):
+                triples.append((atom, bond1.get_partner(atom), bond2.get_partner(atom)))
+        coords = [np.array([triple[i].get_cart() for triple in triples], dtype=float).reshape((-1, 3))
+                  for i in xrange(3)]
+        angles, normals, centers = compute_angles(*coords)
+        return [tuple(member.get_name() for member in triple) for triple in triples], angles, normals, centers
 
     def find_rings(self, planarityThreshold):
         """
-        Uses the RingFinder class to find rings in the molecule
+        Uses 'find_planar_rings()' to find rings in the molecule
         and communicates the obtained information to the
         corresponding atoms and bonds.
         """
-        # finder = RingFinder(self.angles, self.anglehashes)
-        # rings = finder.harvest()
+        self.ring_bonds = []
         rings = find_planar_rings([self.atoms[name] for name in self.names], self.dist_result, planarityThreshold)
         for ring in rings:
             length = len(ring)
@@ -575,6 +1038,19 @@ class InvariomGenerator(object):
                             if ID in self.bonds.keys():
                                 IDs.append(ID)
                                 self.bonds[ID].add_ring(length)
+                                self.ring_bonds.append((ID, length))
+        for atom in self.atoms.values():
+            atom.update_ring_data()
+
+    def classify_bonds(self):
+        """
+        Determines the bond orders of all bonds based on the current
+        set of thresholds. The bonds and ring systems determined for
+        the first set of thresholds are reused.
+        """
+        self.set_bond_orders(reset=True)
+        for ID, length in self.ring_bonds:
+            self.bonds[ID].add_ring(length)
         for atom in self.atoms.values():
             atom.update_ring_data()
 
@@ -583,7 +1059,7 @@ class InvariomGenerator(object):
         Triggers the grow_enviroment function for all atoms.
         """
         for atom in self.atoms.values():
-            atom.grow_enviroment()
+            atom.grow_enviroment(self.cache, self.classic)
 
     def get_tsm(self):
         """
@@ -612,7 +1088,7 @@ class Bond(object):
     Class representing a chemical bond.
     """
 
-    def __init__(self, atom1, atom2, controller):
+    def __init__(self, atom1, atom2, controller, length=None, xi=None):
         """
         Initializes the bond instance. The bond is created
         between atom1 and atom2.
@@ -621,6 +1097,10 @@ class Bond(object):
         :param atom2: Atom instance.
         :param controller: must be an
         instance of the InvariomGenerator class.
+        :param length: Float representing the precomputed bond
+        length. If given, the atoms are considered to be bound and
+        the bond order must be set by calling 'set_bond_order()'.
+        :param xi: Float representing the precomputed Xi.
         """
         self.order = None
         self.priority = None
@@ -634,6 +1114,13 @@ class Bond(object):
         self.atom2 = atom2
         self.set_id()
         self.grow = True
+        if length is not None:
+            self.length = length
+            self.xi = xi
+            self.too_far = False
+            if xi is None:
+                self.set_xi()
+            return
         self.length = norm(atom1.get_cart() - atom2.get_cart())
         if self.length < covalence_radius[atom1.get_element()] + covalence_radius[atom2.get_element()] + .1:
             self.too_far = False
@@ -685,7 +1172,7 @@ class Bond(object):
                 abs(electro_negativ[self.atom1.get_element()] - electro_negativ[
                     self.atom2.get_element()]))) - self.length)
 
-    def set_bond_order(self):
+    def set_bond_order(self, code=None, grow=False):
         """
         Determines the bond order based on the thresholds
         provided by the InvariomGenerator. The bond gets also
@@ -693,31 +1180,37 @@ class Bond(object):
 
         The priority is used to realize the correct sorting
         of the invariom string.
-        """
-        if self.xi < self.controller.get_tsm():
-            self.order = '1'
-            self.priority = '000'
-            self.grow = False
-        elif self.xi < self.controller.get_tmd():
-            self.order = '~'
-            self.priority = '790'
-            self.grow = True
-        elif self.xi < self.controller.get_tdt():
-            self.order = '2'
-            self.priority = '800'
-            self.grow = True
-        else:
-            self.order = '3'
-            self.priority = '900'
-        if self.atom1.get_element() == 'H' or self.atom2.get_element() == 'H':
-            self.order = '1'
-            self.priority = '000'
-            self.grow = True
-        if self.atom1.get_element() == 'S' or self.atom2.get_element() == 'S':
-            self.grow = True
-        if self.atom1.get_element() == 'P' or self.atom2.get_element() == 'P':
+
+        :param code: Integer index of BOND_ORDERS as returned by
+        'get_bond_orders()'. Determined from Xi if None.
+        :param grow: Boolean as returned by 'get_bond_orders()'.
+        """
+        if code is None:
+            codes, forced = get_bond_orders(np.array([self.xi]),
+                                            np.array([self.atom1.get_element()]),
+                                            np.array([self.atom2.get_element()]),
+                                            self.controller.get_tsm(),
+                                            self.controller.get_tmd(),
+                                            self.controller.get_tdt())
+            code, grow = codes[0], forced[0]
+        self.order, self.priority, order_grow = BOND_ORDERS[code]
+        if order_grow is not None:
+            self.grow = order_grow
+        if grow:
             self.grow = True
 
+    def reset_bond_order(self, code=None, grow=False):
+        """
+        Discards the ring information of the bond and determines
+        the bond order again based on the current thresholds.
+
+        :param code: See 'set_bond_order()'.
+        :param grow: See 'set_bond_order()'.
+        """
+        self.rings = []
+        self.at = False
+        self.set_bond_order(code, grow)
+
     def get_bond_priority(self):
         """
         :return: String representing the bond's priority.
@@ -796,8 +1289,7 @@ class Atom(object):
     """
     Class for representing an atom.
     """
-    f2c_matrix = None
-    
+
     @staticmethod
     def generateElement(atomName):
         element = []
@@ -860,7 +1352,7 @@ class Atom(object):
         """
         self.cart = np.array(cart)
 
-    def set_frac(self, frac, cell):
+    def set_frac(self, frac, cell, matrix=None):
         """
         Uses the cell and the fractional coordinates to
         set the atoms position in cartesian coordinates.
@@ -869,11 +1361,12 @@ class Atom(object):
         atom's position in fractional coordinates.
         :param cell: List of 6 floats representing the cell
         parameter: [a, b, c, alpha, beta, gamma]
+        :param matrix: numpy matrix returned by
+        '_get_frac2cart_matrix(cell)'. Computed if None.
         """
-        # if not Atom.f2c_matrix != None:
-        if Atom.f2c_matrix is None:
-            Atom.f2c_matrix = self._get_frac2cart_matrix(cell)
-        self.cart = np.array(self._frac2cart(frac, Atom.f2c_matrix))
+        if matrix is None:
+            matrix = self._get_frac2cart_matrix(cell)
+        self.cart = np.array(self._frac2cart(frac, matrix))
 
     def get_cart(self):
         """
@@ -967,6 +1460,19 @@ class Atom(object):
         """
         self.angles[angle.get_id()] = angle
 
+    def get_angles(self):
+        """
+        Creates the Angle instances of all pairs of bonds of the
+        atom on first access.
+
+        :return: List of Angle instances where the atom is the
+        central atom.
+        """
+        if not self.angles:
+            for bond1, bond2 in self.iter_bond_pairs(unique=True):
+                self.add_angle(Angle(self, bond1.get_partner(self), bond2.get_partner(self)))
+        return self.angles.values()
+
     def iter_bonds(self):
         """
         An iterator iterating over all bonds in the atom's
@@ -977,16 +1483,19 @@ class Atom(object):
         for bond in self.bonds.values():
             yield bond
 
-    def iter_bond_pairs(self):
+    def iter_bond_pairs(self, unique=False):
         """
         An iterator iterating of all pairs of bonds in the atom's
         bonds dictionary.
 
+        :param unique: Boolean. If True, every pair is only
+        returned once.
         :return: List of two Bond instances.
         """
-        for bond1 in self.iter_bonds():
-            for bond2 in self.iter_bonds():
-                if not bond1 == bond2:
+        bonds = self.bonds.values()
+        for i, bond1 in enumerate(bonds):
+            for j, bond2 in enumerate(bonds):
+                if i < j or (i > j and not unique):
                     yield bond1, bond2
 
     def get_atom_priority(self):
@@ -995,15 +1504,28 @@ class Atom(object):
         """
         return self.priority
 
-    def grow_enviroment(self):
+    def grow_enviroment(self, cache=None, classic=True):
         """
         Adds an instance of the Enviroment class to the atom and
         triggers the enviroment's grow() and build_invariom_name()
         methods.
+
+        :param cache: InvariomNameCache instance. If the enviroment
+        is found in the cache, the invariom name is not built again.
+        :param classic: Boolean passed to the Enviroment instance.
         """
-        self.enviroment = Enviroment(self)
+        self.enviroment = Enviroment(self, classic)
         self.enviroment.grow()
+        key = None
+        if cache is not None:
+            key = self.enviroment.get_key()
+        name = cache.get(key) if key else None
+        if name:
+            self.enviroment.set_invariom_name(name)
+            return
         self.enviroment.build_invariom_name()
+        if key and self.enviroment.has_unique_order():
+            cache.add(key, self.enviroment.get_invariom_name())
 
         # =======================================================================
         # print self.enviroment
@@ -1099,6 +1621,42 @@ class Atom(object):
         return self.bonds
 
 
+def compute_angles(center, coords2, coords3):
+    """
+    Vectorized version of the computations carried out by the
+    Angle class for many angles at once.
+
+    :param center: Array of shape (N, 3) representing the positions
+    of the central atoms.
+    :param coords2: Array of shape (N, 3) representing the positions
+    of the second atoms.
+    :param coords3: Array of shape (N, 3) representing the positions
+    of the third atoms.
+    :return: Tuple: (angles, normals, centers). 'angles' is an array
+    of length N containing the angles in radians. 'normals' and
+    'centers' are arrays of shape (N, 3) as computed by
+    'Angle.set_normal()' and 'Angle.set_center()'.
+    """
+    v1x = coords2 - center
+    v2x = coords3 - center
+    length1 = norm(v1x, axis=1)[:, None]
+    length2 = norm(v2x, axis=1)[:, None]
+    v1 = v1x / length1
+    v2 = v2x / length2
+    average_length = 2. / (1. / length1 + 1. / length2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        angles = np.arccos(np.sum(v1 * v2, axis=1))
+        scale = (np.sin(0.5 * angles) ** 2 / np.sin(angles) ** 2)[:, None]
+        normals = np.cross(v1, v2)
+        normals /= norm(normals, axis=1)[:, None]
+        bisectors = v1 + v2
+        bisectors /= norm(bisectors, axis=1)[:, None]
+    centers = bisectors * scale * average_length + center
+    square = np.abs(angles * 180. / np.pi - 90) < 2
+    centers[square] = center[square] + (v1x[square] + v2x[square]) / 2.
+    return angles, normals, centers
+
+
 class Angle(object):
     """
     A class representing an angle defined by the positions
@@ -1220,16 +1778,19 @@ class Enviroment(object):
     string representing the chemical enviroment.
     """
 
-    def __init__(self, atom):
+    def __init__(self, atom, classic=True):
         """
         Initializes the Enviroment instance by defining
         the atom that is the 'seed' of the enviroment.
 
         :param atom: Atom instance representing the beginning
         of an enviroment.
+        :param classic: Boolean. If True, next neighbors of double
+        bonded atoms are removed from the invariom name.
         """
 
         self.seed = atom
+        self.classic = classic
         self.chains = {}
         self.chain_order = None
         self.orientation = None
@@ -1267,12 +1828,9 @@ class Enviroment(object):
         Sorting all created chain instances by the value of their
         priority attribute.
         """
-        self.chain_order = [i.get_id() for i in sorted([chain for chain in self.chains.values()],
-                                                       key=lambda thischain: thischain.get_chain_priority(),
-                                                       reverse=True)]
-        self.priorities = [i.get_chain_priority() for i in sorted([chain for chain in self.chains.values()],
-                                                                  key=lambda thischain: thischain.get_chain_priority(),
-                                                                  reverse=True)]
+        chains = sorted(self.chains.values(), key=lambda thischain: thischain.get_chain_priority(), reverse=True)
+        self.chain_order = [chain.get_id() for chain in chains]
+        self.priorities = [chain.get_chain_priority() for chain in chains]
         for p in self.priorities:
             if self.priorities.count(p) is 2:
                 c = ''.join(p)
@@ -1310,7 +1868,7 @@ class Enviroment(object):
                                                                                                    + 1]
 
         self.invariom_name = ''.join(name_list)
-        if classic_names:
+        if self.classic:
             self.invariom_name = truncate_neighbors(self.invariom_name)
 
     def get_invariom_name(self):
@@ -1319,6 +1877,35 @@ class Enviroment(object):
         """
         return self.invariom_name
 
+    def _sorted_chain_keys(self):
+        return sorted((chain.get_chain_priority(), chain.get_key()) for chain in self.chains.values())
+
+    def get_key(self):
+        """
+        Computes a hash of the seed atom and all chains. Enviroments with
+        the same hash have the same invariom name if 'has_unique_order()'
+        is True.
+
+        :return: String representing the hash or None if the invariom
+        name of the enviroment depends on the atom names.
+        """
+        if not all(chain.is_name_independent() for chain in self.chains.values()):
+            return None
+        return sha1(repr((self.classic,
+                          self.seed.get_element(),
+                          tuple(self.seed.get_rings()),
+                          [key for _, key in self._sorted_chain_keys()]))).hexdigest()
+
+    def has_unique_order(self):
+        """
+        :return: Boolean: True if the invariom name does not depend on
+        the order of chains or branch atoms with equal priorities.
+        """
+        chains = self._sorted_chain_keys()
+        if any(chain1[0] == chain2[0] and not chain1 == chain2 for chain1, chain2 in zip(chains, chains[1:])):
+            return False
+        return all(chain.has_unique_order() for chain in self.chains.values())
+
     def set_invariom_name(self, name):
         """
         Overwrites the determined invariom name with 'name'.
@@ -1471,6 +2058,7 @@ class Chain(object):
         self.ordered_atoms = []
         self.atoms = {}
         self.brackets = False
+        self.key = None
 
         #########################################################
         firstpriority = ''.join([self.root.get_bond_priority(),
@@ -1509,31 +2097,69 @@ class Chain(object):
     def get_chain_priority(self):
         """
         Determines the chain's priority by analysing all bonds
-        and atoms that are part of the chain.
+        and atoms that are part of the chain. The priority is only
+        determined once.
 
         :return: String representing the instance's priority.
         """
+        if self.key is not None:
+            return self.priority
         priorities = []
+        branch_keys = []
         for bond in self.branch.values():
-            self.atoms[bond.get_partner(self.root_atom).get_id()] = bond.get_partner(self.root_atom)
+            partner = bond.get_partner(self.root_atom)
+            self.atoms[partner.get_id()] = partner
             secondpriority = ''.join([bond.get_bond_priority(),
-                                      bond.get_partner(self.root_atom).get_atom_priority()])
-            if bond.get_partner(self.root_atom).is_ring_atom() and not bond.is_at_bond():
+                                      partner.get_atom_priority()])
+            if partner.is_ring_atom() and not bond.is_at_bond():
                 # Working arround the issue that being part of a ring can also be an atom property not only
                 # a bond property.
-                secondpriority = '{p:{f}<3}'.format(p=''.join(bond.get_partner(self.root_atom).rings), f='0') + bond.get_partner(self.root_atom).get_atom_priority()
-            self.branch_priorities[bond.get_partner(self.root_atom).get_id()] = secondpriority
+                secondpriority = '{p:{f}<3}'.format(p=''.join(partner.rings), f='0') + partner.get_atom_priority()
+            self.branch_priorities[partner.get_id()] = secondpriority
             priorities.append(secondpriority)
-
+            branch_keys.append((secondpriority, bond.get_invariom_char(), bond.is_at_bond(), partner.get_element(),
+                                tuple(partner.get_rings()),
+                                any(ring_id in self.seed.ring_ids for ring_id in partner.ring_ids)))
 
         priorities = sorted(priorities, reverse=True)
         self.priority[1] = ''.join(priorities)
         self.ordered_atoms = sorted([i for i in self.branch_priorities.items()], key=lambda pair: pair[1], reverse=True)
         if len(self.ordered_atoms) > 0 and self.grow:
             self.brackets = True
+        self.key = (self.root.get_invariom_char(), self.root.get_bond_priority(), self.root_atom.get_element(),
+                    tuple(self.root_atom.get_rings()), self.grow, tuple(sorted(branch_keys)))
 
         return self.priority
 
+    def get_key(self):
+        """
+        :return: Tuple describing all bonds and atoms of the chain
+        independent of the atom names.
+        """
+        self.get_chain_priority()
+        return self.key
+
+    def is_name_independent(self):
+        """
+        :return: Boolean: True if the chain string does not depend on
+        the atom names. 'build_chain_string()' identifies the bond of
+        a branch atom by searching the atom's name in the bond IDs,
+        which is ambiguous if the name is part of another bond's ID.
+        """
+        self.get_chain_priority()
+        for atom_name in self.atoms:
+            if sum(atom_name in bond_id for bond_id in self.branch) > 1:
+                return False
+        return True
+
+    def has_unique_order(self):
+        """
+        :return: Boolean: True if all branch atoms with equal priorities
+        are represented by the same string.
+        """
+        branch_keys = self.get_key()[-1]
+        return not any(key1[0] == key2[0] and not key1 == key2 for key1, key2 in zip(branch_keys, branch_keys[1:]))
+
     def build_chain_string(self):
         """
         Generates the invariom string representation of the
@@ -1645,14 +2271,16 @@ class CorrectionFilter(object):
     the generated invariom names.
     """
 
-    def __init__(self, filepointer):
+    def __init__(self, filepointer, output=None):
         """
         Initializes the CorrectionFilter instance.
 
         :param filepointer:
         must be a filepointer to a 'empirical_corrections.txt' file.
+        :param output: callable used for reporting applied corrections.
         """
         self.filepointer = filepointer
+        self.printer = output
         self.corrections = {}
         try:
             self.setup()
@@ -1688,7 +2316,8 @@ class CorrectionFilter(object):
         if enviroment.get_invariom_name() in self.corrections.keys():
             oldname = enviroment.get_invariom_name()
             enviroment.set_invariom_name(self.corrections[enviroment.get_invariom_name()].rstrip('\n'))
-            printer('Empircal correction applied: {} --> {}'.format(oldname, enviroment.get_invariom_name()))
+            if self.printer:
+                self.printer('Empircal correction applied: {} --> {}'.format(oldname, enviroment.get_invariom_name()))
             return True
         return False
 
@@ -0,0 +1,131 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module implementing a minimal container format for storing a set of
+named numpy arrays in a single binary file.
+
+The file starts with a magic string and a JSON header describing the
+type, shape and position of every array. The raw array data follows
+the header. Arrays are accessed through memory maps, so opening a file
+is cheap and only the parts of the file that are actually used are
+read from disk.
+"""
+import json
+import os
+import struct
+from sys import platform
+
+import numpy as np
+
+MAGIC = 'LAUEARR1'
+ALIGNMENT = 64
+
+
+def _aligned(size):
+    """
+    :param size: Integer representing a number of bytes.
+    :return: Integer: 'size' rounded up to the next multiple of ALIGNMENT.
+    """
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def replace_file(source, target):
+    """
+    Renames 'source' to 'target'. An existing target file is replaced.
+    On Windows 'os.rename()' fails if the target exists, so the target
+    is removed first.
+
+    :param source: String representing the name of the new file.
+    :param target: String representing the name of the replaced file.
+    :return: None
+    """
+    if platform.startswith('win') and os.path.exists(target):
+        os.remove(target)
+    os.rename(source, target)
+
+
+def write_arrays(filename, arrays, meta=None):
+    """
+    Writes a set of arrays to a binary file. The data is written to a
+    temporary file that replaces 'filename' when it is complete.
+
+    :param filename: String representing the file name.
+    :param arrays: Dictionary keying array names to numpy arrays.
+    :param meta: Dictionary of JSON serializable values that is stored
+    in the file header.
+    :return: None
+    """
+    names = sorted(arrays.keys())
+    arrays = {name: np.ascontiguousarray(arrays[name]) for name in names}
+    directory = {}
+    offset = 0
+    for name in names:
+        array = arrays[name]
+        directory[name] = {'dtype': array.dtype.str,
+                           'shape': list(array.shape),
+                           'offset': offset}
+        offset += _aligned(array.nbytes)
+    header = json.dumps({'meta': meta or {}, 'arrays': directory})
+    header_size = _aligned(len(MAGIC) + 8 + len(header))
+    with open(filename + '.tmp', 'wb') as fp:
+        fp.write(MAGIC)
+        fp.write(struct.pack('<Q', len(header)))
+        fp.write(header)
+        fp.write('\0' * (header_size - len(MAGIC) - 8 - len(header)))
+        for name in names:
+            array = arrays[name]
+            fp.write(array.tostring())
+            fp.write('\0' * (_aligned(array.nbytes) - array.nbytes))
+    replace_file(filename + '.tmp', filename)
+
+
+class ArrayFile(object):
+    """
+    Read access to a file written by 'write_arrays()'.
+
+    Arrays are accessed like dictionary items. By default the
+    returned arrays are read only memory maps of the file.
+    """
+
+    def __init__(self, filename, mmap=True):
+        """
+        :param filename: String representing the file name.
+        :param mmap: Boolean. If False, the arrays are read into
+        memory when accessed.
+        """
+        self.filename = filename
+        self.mmap = mmap
+        with open(filename, 'rb') as fp:
+            if not fp.read(len(MAGIC)) == MAGIC:
+                raise IOError('{} is not a binary array file.'.format(filename))
+            size = struct.unpack('<Q', fp.read(8))[0]
+            header = json.loads(fp.read(size))
+        self.data_start = _aligned(len(MAGIC) + 8 + size)
+        self.meta = header['meta']
+        self.directory = header['arrays']
+
+    def __contains__(self, name):
+        return name in self.directory
+
+    def __getitem__(self, name):
+        entry = self.directory[name]
+        dtype = np.dtype(str(entry['dtype']))
+        shape = tuple(entry['shape'])
+        if not all(shape):
+            return np.zeros(shape, dtype=dtype)
+        array = np.memmap(self.filename,
+                          dtype=dtype,
+                          mode='r',
+                          offset=self.data_start + entry['offset'],
+                          shape=shape)
+        if not self.mmap:
+            return np.array(array)
+        return array
+
+    def keys(self):
+        """
+        :return: List of all array names stored in the file.
+        """
+        return self.directory.keys()
@@ -0,0 +1,446 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module implementing a compiled binary representation of the
+'APD_DABA_<T>_.txt' database files.
+
+The binary file stores coordinates, ADPs and invariom orientations of
+all model compounds as packed numpy arrays. The file header contains an
+index mapping every compound name to the range of atom rows belonging
+to that compound. Reading a model compound therefore does not require
+parsing the complete database.
+
+Multi temperature database files store the ADPs for a grid of
+temperatures together with the contributions of the individual normal
+modes. ADPs can therefore be evaluated for any temperature.
+
+Use 'compile_database()' or run this module as a script to convert a
+database text file:
+
+    python -m lauescript.laueio.binary_database APD_DABA_122.0_.txt
+"""
+import os
+from glob import glob
+from datetime import datetime
+
+import numpy as np
+
+from lauescript.laueio.arrayfile import ArrayFile, write_arrays
+from lauescript.cryst.vibrations import get_deltas, get_adps_from_products
+
+FORMAT = 'APD_DABA'
+VERSION = 1
+
+
+def binary_filename(filename):
+    """
+    :param filename: String representing the path of a database text file.
+    :return: String representing the path of the corresponding binary file.
+    """
+    return os.path.splitext(filename)[0] + '.bin'
+
+
+def is_up_to_date(filename):
+    """
+    Checks whether a compiled version of the database text file
+    'filename' exists that is at least as new as the text file.
+
+    :param filename: String representing the path of a database text file.
+    :return: Boolean.
+    """
+    binfile = binary_filename(filename)
+    if not os.path.isfile(binfile):
+        return False
+    if not os.path.isfile(filename):
+        return True
+    return os.path.getmtime(binfile) >= os.path.getmtime(filename)
+
+
+def find_database(path, temperature=None):
+    """
+    Searches 'path' for an up to date binary database file.
+
+    :param path: String representing the database directory.
+    :param temperature: Float representing the temperature of the
+    database. If None, any compiled database file is accepted.
+    :return: String representing the path of the binary file or None.
+    """
+    if temperature is not None:
+        candidates = [os.path.join(path, 'APD_DABA_{:.1f}_.txt'.format(temperature))]
+    else:
+        candidates = [os.path.splitext(binfile)[0] + '.txt'
+                      for binfile in sorted(glob(os.path.join(path, 'APD_DABA_*_.bin')))]
+    for filename in candidates:
+        if is_up_to_date(filename):
+            return binary_filename(filename)
+
+
+def multi_temperature_filename(path):
+    """
+    :param path: String representing the database directory.
+    :return: String representing the path of the multi temperature
+    database file.
+    """
+    return os.path.join(path, 'APD_DABA_multi_.bin')
+
+
+def is_multi_temperature_up_to_date(path):
+    """
+    Checks whether the multi temperature database file in 'path' is at
+    least as new as the 'APD_MAP.txt' file and all database text files.
+    Any other regeneration or update of the database makes the file
+    outdated.
+
+    :param path: String representing the database directory.
+    :return: Boolean.
+    """
+    filename = multi_temperature_filename(path)
+    if not os.path.isfile(filename):
+        return False
+    mtime = os.path.getmtime(filename)
+    sources = glob(os.path.join(path, 'APD_DABA_*_.txt')) + [os.path.join(path, 'APD_MAP.txt')]
+    return all(os.path.getmtime(source) <= mtime for source in sources if os.path.isfile(source))
+
+
+def open_multi_temperature_database(path, temperature):
+    """
+    Opens the multi temperature database file in 'path' if it is up to
+    date and can provide ADPs at 'temperature'.
+
+    :param path: String representing the database directory.
+    :param temperature: Float representing a temperature in Kelvin.
+    :return: BinaryDatabase instance or None.
+    """
+    if not is_multi_temperature_up_to_date(path):
+        return None
+    filename = multi_temperature_filename(path)
+    database = BinaryDatabase(filename)
+    if not database.covers(temperature):
+        return None
+    database.set_temperature(temperature)
+    return database
+
+
+def parse_text_database(lines):
+    """
+    Parses the content of a database text file.
+
+    :param lines: Iterable of strings representing the lines of the file.
+    :return: Tuple: (compound_list, arrays) where compound_list is a list of
+    [name, first_atom, last_atom + 1] lists and arrays is a dictionary of
+    numpy arrays as expected by 'write_database()'.
+    """
+    compounds = []
+    elements = []
+    coordinates = []
+    adps = []
+    invariom_counts = []
+    invariom_names = []
+    orientations = []
+    count = 0
+    for line in lines:
+        key = line[:1]
+        if key == 'N':
+            if compounds:
+                compounds[-1][2] = len(elements)
+            compounds.append([line.rstrip('\n')[2:], len(elements), None])
+        elif key == 'E':
+            elements.append(line.rstrip('\n')[2:])
+            count = 0
+        elif key == 'I':
+            line = line[2:].split()
+            invariom_names.append(line[0])
+            orientations.append(' '.join(line[1:]))
+            count += 1
+        elif key == 'C':
+            coordinates.append(line[2:])
+        elif key == 'A':
+            adps.append(line[2:])
+            invariom_counts.append(count)
+    if compounds:
+        compounds[-1][2] = len(elements)
+
+    table = sorted(set(invariom_names))
+    codes = {name: i for i, name in enumerate(table)}
+    arrays = {'elements': np.array(elements, dtype='S'),
+              'coordinates': _parse_floats(coordinates, 3),
+              'adps': _parse_floats(adps, 6),
+              'invariom_offsets': np.concatenate([[0], np.cumsum(invariom_counts)]).astype(np.int64),
+              'invariom_table': np.array(table, dtype='S'),
+              'invariom_codes': np.array([codes[name] for name in invariom_names], dtype=np.int32),
+              'orientations': _parse_floats(orientations, 6)}
+    return compounds, arrays
+
+
+def parse_molecules(molecules):
+    """
+    Collects the atomic data of model compounds.
+
+    :param molecules: List of DABA_MOLECULE instances.
+    :return: Tuple: (compound_list, arrays) as returned by
+    'parse_text_database()'. The arrays do not include the ADPs.
+    """
+    compounds = []
+    elements = []
+    coordinates = []
+    invariom_counts = []
+    invariom_names = []
+    orientations = []
+    for molecule in molecules:
+        compounds.append([molecule.name, len(elements), len(elements) + len(molecule.atoms)])
+        for atom in molecule.atoms:
+            elements.append(atom.element)
+            coordinates.append(atom.cart)
+            invariom_counts.append(len(atom.invarioms))
+            for invariom_name, orientation in atom.invarioms.items():
+                invariom_names.append(invariom_name)
+                orientations.append(np.concatenate(orientation))
+
+    table = sorted(set(invariom_names))
+    codes = {name: i for i, name in enumerate(table)}
+    arrays = {'elements': np.array(elements, dtype='S'),
+              'coordinates': np.array(coordinates, dtype=np.float64).reshape((-1, 3)),
+              'invariom_offsets': np.concatenate([[0], np.cumsum(invariom_counts)]).astype(np.int64),
+              'invariom_table': np.array(table, dtype='S'),
+              'invariom_codes': np.array([codes[name] for name in invariom_names], dtype=np.int32),
+              'orientations': np.array(orientations, dtype=np.float64).reshape((-1, 6))}
+    return compounds, arrays
+
+
+def _parse_floats(lines, columns):
+    """
+    Converts a list of strings containing whitespace separated numbers
+    to a two dimensional array.
+    """
+    return np.array(' '.join(lines).split(), dtype=np.float64).reshape((-1, columns))
+
+
+def write_database(filename, compounds, arrays, meta=None):
+    """
+    Writes a binary database file.
+
+    :param filename: String representing the file name.
+    :param compounds: List of [name, first_atom, last_atom + 1] lists.
+    :param arrays: Dictionary of numpy arrays.
+    :param meta: Dictionary with additional header information.
+    :return: None
+    """
+    # Compound names are stored as latin-1 to preserve arbitrary byte strings.
+    header = {'format': FORMAT,
+              'version': VERSION,
+              'generated': str(datetime.now()),
+              'compounds': [[name.decode('latin-1'), start, stop] for name, start, stop in compounds]}
+    if meta:
+        header.update(meta)
+    write_arrays(filename, arrays, header)
+
+
+def compile_database(filename, output=None):
+    """
+    Compiles the database text file 'filename' to a binary database file.
+
+    :param filename: String representing the path of a database text file.
+    :param output: String representing the path of the binary file. Defaults
+    to the text file's name with the extension '.bin'.
+    :return: String representing the path of the binary file.
+    """
+    if not output:
+        output = binary_filename(filename)
+    with open(filename, 'r') as fp:
+        compounds, arrays = parse_text_database(fp)
+    write_database(output, compounds, arrays, {'source': os.path.basename(filename)})
+    return output
+
+
+class BinaryDatabase(object):
+    """
+    Class providing access to a binary database file.
+    """
+
+    def __init__(self, filename, mmap=True, temperature=None):
+        """
+        :param filename: String representing the path of the binary file.
+        :param mmap: Boolean. If False, the complete file is read into
+        memory.
+        :param temperature: Float representing the temperature used for
+        multi temperature database files.
+        """
+        self.filename = filename
+        self.file = ArrayFile(filename, mmap=mmap)
+        meta = self.file.meta
+        if not meta.get('format') == FORMAT or meta.get('version') > VERSION:
+            raise IOError('{} is not a supported database file.'.format(filename))
+        self.compounds = []
+        self.index = {}
+        for name, start, stop in meta['compounds']:
+            name = name.encode('latin-1')
+            self.compounds.append(name)
+            self.index[name] = (start, stop)
+        self.elements = self.file['elements']
+        self.coordinates = self.file['coordinates']
+        self.adps = self.file['adps']
+        self.invariom_offsets = self.file['invariom_offsets']
+        self.invariom_table = self.file['invariom_table'].tolist()
+        self.invariom_codes = self.file['invariom_codes']
+        self.orientations = self.file['orientations']
+        self.rows = {name: i for i, name in enumerate(self.compounds)}
+        self.temperatures = None
+        self.temperature = None
+        if 'temperatures' in self.file:
+            self.temperatures = self.file['temperatures']
+        self.modes = 'mode_frequencies' in self.file
+        if self.modes:
+            self.mode_frequencies = self.file['mode_frequencies']
+            self.mode_masses = self.file['mode_masses']
+            self.mode_offsets = self.file['mode_offsets']
+            self.mode_products = self.file['mode_products']
+            self.product_offsets = self.file['product_offsets']
+        if temperature is not None:
+            self.set_temperature(temperature)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.compounds)
+
+    def keys(self):
+        """
+        :return: List of all compound names in database order.
+        """
+        return list(self.compounds)
+
+    def is_multi_temperature(self):
+        """
+        :return: Boolean: True if the ADPs depend on the selected
+        temperature.
+        """
+        return self.modes or self.temperatures is not None
+
+    def covers(self, temperature):
+        """
+        :param temperature: Float representing a temperature in Kelvin.
+        :return: Boolean: True if the database can provide ADPs at
+        'temperature'.
+        """
+        if self.modes:
+            return True
+        if self.temperatures is None:
+            return False
+        return self.temperatures[0] - 1e-6 <= temperature <= self.temperatures[-1] + 1e-6
+
+    def set_temperature(self, temperature):
+        """
+        Selects the temperature of a multi temperature database file.
+        If the file contains the contributions of the individual normal
+        modes, the ADPs are evaluated exactly at 'temperature'. Otherwise
+        they are interpolated linearly between the neighboring
+        temperatures of the temperature grid.
+
+        :param temperature: Float representing a temperature in Kelvin.
+        :return: None
+        """
+        if not self.is_multi_temperature():
+            raise ValueError('{} is not a multi temperature database.'.format(self.filename))
+        if not self.covers(temperature):
+            raise ValueError('Temperature {:.1f} K not available in {}.'.format(temperature, self.filename))
+        self.temperature = float(temperature)
+
+    def get_adps(self, name):
+        """
+        :param name: String representing the compound's name.
+        :return: Array of shape (N, 6) containing the ADPs of the
+        compound's atoms at the selected temperature.
+        """
+        start, stop = self.index[name]
+        if not self.is_multi_temperature():
+            return self.adps[start:stop]
+        if self.temperature is None:
+            raise ValueError('No temperature selected for {}.'.format(self.filename))
+        if self.modes:
+            i = self.rows[name]
+            first, last = self.mode_offsets[i], self.mode_offsets[i + 1]
+            products = self.mode_products[self.product_offsets[i]:self.product_offsets[i + 1]]
+            products = np.array(products, dtype=np.float64).reshape((last - first, stop - start, 6))
+            deltas = get_deltas(self.mode_frequencies[first:last], self.mode_masses[first:last], self.temperature)
+            return get_adps_from_products(products, deltas)
+        grid = self.temperatures
+        if len(grid) == 1:
+            return self.adps[0, start:stop]
+        k = min(max(np.searchsorted(grid, self.temperature), 1), len(grid) - 1)
+        weight = (self.temperature - grid[k - 1]) / (grid[k] - grid[k - 1])
+        return (1 - weight) * self.adps[k - 1, start:stop] + weight * self.adps[k, start:stop]
+
+    def load_compound(self, name):
+        """
+        Creates a DABA_MOLECULE instance representing the model compound
+        'name'. The atoms are named and populated the same way the
+        text database reader does it.
+
+        :param name: String representing the compound's name.
+        :return: DABA_MOLECULE instance.
+        """
+        from lauescript.types.molecule import DABA_MOLECULE
+
+        molecule = DABA_MOLECULE(name)
+        start, stop = self.index[name]
+        adps = self.get_adps(name)
+        for i, row in enumerate(xrange(start, stop)):
+            molecule.give_atom(name='{}({})'.format(str(self.elements[row]), i),
+                               cart=np.array(self.coordinates[row]))
+            atom = molecule.atoms[-1]
+            atom.give_adp(key='cart_int', value=np.array(adps[i], dtype=np.float64))
+            for j in xrange(self.invariom_offsets[row], self.invariom_offsets[row + 1]):
+                orientation = self.orientations[j]
+                atom.add_invariom(self.invariom_table[self.invariom_codes[j]],
+                                  [np.array(orientation[:3]), np.array(orientation[3:])])
+        return molecule
+
+    def give_compound(self, data, name):
+        """
+        Adds the model compound 'name' to the DATA instance 'data'.
+
+        :param data: DATA instance.
+        :param name: String representing the compound's name.
+        :return: None
+        """
+        data.register_molecule(self.load_compound(name), name)
+
+
+class BinaryDatabaseReader(object):
+    """
+    Drop in replacement for the 'inout.DatabaseReader' class reading
+    model compounds from a BinaryDatabase instance.
+    """
+
+    def __init__(self, database, readAll=False):
+        self.readAll = readAll
+        self.daba = database
+
+    def read(self, data, invlist):
+        """
+        Adds all compounds in 'invlist' to 'data'. If the reader was
+        initialized with 'readAll=True' all compounds in the database
+        are added.
+
+        :param data: DATA instance.
+        :param invlist: List of strings representing compound names.
+        :return: None
+        """
+        for inv in invlist:
+            if not inv in data.keys():
+                data.give_daba_molecule(inv)
+        if self.readAll:
+            invlist = self.daba.keys()
+        for name in invlist:
+            if name in self.daba and not (name in data.keys() and data[name].atoms):
+                self.daba.give_compound(data, name)
+
+
+if __name__ == '__main__':
+    from sys import argv
+
+    for textfile in argv[1:]:
+        print 'Compiled {} to {}.'.format(textfile, compile_database(textfile))
@@ -0,0 +1,154 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module implementing a cache of model compound records used for
+incremental database generation.
+
+The cache directory contains a JSON manifest and one pickled record per
+model compound. The manifest keys the path of every model compound
+to a hash of its source files and stores the name, sorting criterion
+and invariom names of the compound, so the invariom map can be
+updated without loading the records.
+"""
+import cPickle
+import hashlib
+import json
+import os
+
+from lauescript.laueio.arrayfile import replace_file
+
+CACHE_DIRECTORY = 'compound_cache'
+MANIFEST = 'manifest.json'
+
+
+def get_hash(filenames, args=()):
+    """
+    :param filenames: List of strings representing file names.
+    :param args: Tuple of additional values that influence the
+    processing of the files.
+    :return: String representing the SHA1 hash of the content of all
+    files and of 'args'.
+    """
+    sha = hashlib.sha1(repr(args))
+    for filename in filenames:
+        with open(filename, 'rb') as fp:
+            while True:
+                chunk = fp.read(1 << 20)
+                if not chunk:
+                    break
+                sha.update(chunk)
+    return sha.hexdigest()
+
+
+class CompoundCache(object):
+    """
+    Cache of the records returned by 'database.read_compound()'.
+    """
+
+    def __init__(self, path='.'):
+        """
+        :param path: String representing the directory containing the
+        cache directory.
+        """
+        self.directory = os.path.join(path, CACHE_DIRECTORY)
+        self.filename = os.path.join(self.directory, MANIFEST)
+        try:
+            with open(self.filename) as fp:
+                self.entries = json.load(fp)
+        except IOError:
+            self.entries = {}
+
+    def _record_filename(self, path):
+        return os.path.join(self.directory, hashlib.sha1(path).hexdigest() + '.pkl')
+
+    def is_current(self, path, file_hash):
+        """
+        :param path: String representing the path of a model compound.
+        :param file_hash: String returned by 'get_hash()'.
+        :return: True if the cached record of the model compound was
+        created from files with the given hash.
+        """
+        try:
+            return self.entries[path]['hash'] == file_hash
+        except KeyError:
+            return False
+
+    def paths(self):
+        """
+        :return: List of the paths of all cached model compounds.
+        """
+        return self.entries.keys()
+
+    def get_name(self, path):
+        """
+        :param path: String representing the path of a model compound.
+        :return: String representing the name of the model compound.
+        """
+        return self.entries[path]['name'].encode('latin-1')
+
+    def load(self, path):
+        """
+        :param path: String representing the path of a model compound.
+        :return: Cached record of the model compound.
+        """
+        with open(self._record_filename(path), 'rb') as fp:
+            return cPickle.load(fp)
+
+    def add(self, path, file_hash, record, molecule):
+        """
+        Adds or replaces the record of a model compound.
+
+        :param path: String representing the path of a model compound.
+        :param file_hash: String returned by 'get_hash()'.
+        :param record: Tuple returned by 'database.read_compound()'.
+        :param molecule: DABA_MOLECULE instance created from 'record'
+        with the 'criterion' attribute set.
+        :return: None
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        with open(self._record_filename(path), 'wb') as fp:
+            cPickle.dump(record, fp, cPickle.HIGHEST_PROTOCOL)
+        invarioms = []
+        for atom in molecule.atoms:
+            invarioms.extend(atom.invarioms.keys())
+        self.entries[path] = {'hash': file_hash,
+                              'name': molecule.name.decode('latin-1'),
+                              'criterion': molecule.criterion,
+                              'invarioms': sorted(invarioms)}
+
+    def remove(self, path):
+        """
+        Removes the record of a model compound.
+
+        :param path: String representing the path of a model compound.
+        :return: None
+        """
+        del self.entries[path]
+        try:
+            os.remove(self._record_filename(path))
+        except OSError:
+            pass
+
+    def get_compounds(self):
+        """
+        :return: Dictionary keying the names of all cached model compounds
+        to (criterion, invarioms) tuples where 'invarioms' is a list of
+        the invariom names of all atoms of the compound.
+        """
+        return {entry['name'].encode('latin-1'): (entry['criterion'], [str(name) for name in entry['invarioms']])
+                for entry in self.entries.values()}
+
+    def save(self):
+        """
+        Writes the manifest file.
+
+        :return: None
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        with open(self.filename + '.tmp', 'w') as fp:
+            json.dump(self.entries, fp)
+        replace_file(self.filename + '.tmp', self.filename)
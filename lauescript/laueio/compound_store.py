@@ -0,0 +1,277 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module implementing a columnar store for the model compounds of the
+database generator. The store replaces the pickled 'database.pkl' file.
+
+Compounds, atoms, invarioms, normal modes and displacement vectors are
+stored as packed arrays in a single binary file (see 'arrayfile').
+Loading a compound only reads the rows belonging to that compound and
+the normal modes are only read if they are requested.
+
+Use 'migrate()' or run this module as a script to convert an existing
+'database.pkl' file:
+
+    python -m lauescript.laueio.compound_store database.pkl
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+
+from lauescript.laueio.arrayfile import ArrayFile, write_arrays
+from lauescript.laueio.binary_database import parse_molecules
+from lauescript.cryst.vibrations import get_displacements
+
+FORMAT = 'APD_STORE'
+VERSION = 1
+STORE_NAME = 'database.bin'
+PICKLE_NAME = 'database.pkl'
+
+
+def _properties_to_json(properties):
+    if properties is None:
+        return None
+    return [value if value is None or isinstance(value, basestring) else float(value) for value in properties]
+
+
+def _properties_from_json(properties):
+    if properties is None:
+        return None
+    return [value.encode('latin-1') if isinstance(value, basestring) else value for value in properties]
+
+
+def write_store(filename, molecules):
+    """
+    Writes the model compounds to a store file.
+
+    :param filename: String representing the file name.
+    :param molecules: List of DABA_MOLECULE instances.
+    :return: None
+    """
+    molecules = list(molecules)
+    compounds, arrays = parse_molecules(molecules)
+    names = []
+    fractional = []
+    adps = []
+    cells = []
+    properties = []
+    frequencies = [np.zeros(0)]
+    masses = [np.zeros(0)]
+    displacements = [np.zeros((0, 3))]
+    for molecule in molecules:
+        for atom in molecule.atoms:
+            names.append(atom.name)
+            fractional.append(atom.frac if atom.frac is not None else [np.nan] * 3)
+            try:
+                adps.append(atom.adp['cart_int'])
+            except KeyError:
+                adps.append([np.nan] * 6)
+        # The angles of 'molecule.cell' are converted to radians by 'give_cell()'.
+        cell = getattr(molecule, 'cell_deg', None)
+        cells.append(cell if cell is not None else [np.nan] * 6)
+        properties.append(_properties_to_json(getattr(molecule, 'properties', None)))
+        freqs, mred, disps = get_displacements(molecule)
+        frequencies.append(freqs)
+        masses.append(mred)
+        displacements.append(disps.reshape((-1, 3)))
+
+    arrays['names'] = np.array(names, dtype='S')
+    arrays['fractional'] = np.array(fractional, dtype=np.float64).reshape((-1, 3))
+    arrays['adps'] = np.array(adps, dtype=np.float64).reshape((-1, 6))
+    arrays['cells'] = np.array(cells, dtype=np.float64).reshape((-1, 6))
+    arrays['mode_frequencies'] = np.concatenate(frequencies)
+    arrays['mode_masses'] = np.concatenate(masses)
+    arrays['mode_offsets'] = np.cumsum([len(i) for i in frequencies]).astype(np.int64)
+    arrays['displacements'] = np.concatenate(displacements)
+    arrays['displacement_offsets'] = np.cumsum([len(i) for i in displacements]).astype(np.int64)
+    header = {'format': FORMAT,
+              'version': VERSION,
+              'generated': str(datetime.now()),
+              'compounds': [[name.decode('latin-1'), start, stop] for name, start, stop in compounds],
+              'properties': properties}
+    write_arrays(filename, arrays, header)
+
+
+def _convert_modes(molecule):
+    """
+    Converts the 'freq' list and the 'disps' dictionaries of the atoms
+    of molecules pickled by older versions to the arrays used by
+    DABA_MOLECULE.set_modes().
+    """
+    if not 'freq' in molecule.__dict__:
+        return
+    freq = molecule.__dict__.pop('freq')
+    displacements = [[atom.__dict__['disps'][str(f)] for atom in molecule.atoms] for f, _ in freq]
+    for atom in molecule.atoms:
+        atom.__dict__.pop('disps', None)
+    molecule.set_modes([f for f, _ in freq], [m for _, m in freq],
+                       np.array(displacements, dtype=float).reshape((len(freq), len(molecule.atoms), 3)))
+
+
+def migrate(pickle_filename, filename=None):
+    """
+    Converts a pickled GENERATOR instance to a store file.
+
+    :param pickle_filename: String representing the path of the
+    'database.pkl' file.
+    :param filename: String representing the path of the store file.
+    Defaults to 'database.bin' in the directory of the pickle file.
+    :return: String representing the path of the store file.
+    """
+    import cPickle
+
+    if not filename:
+        filename = os.path.join(os.path.dirname(pickle_filename), STORE_NAME)
+    with open(pickle_filename, 'rb') as fp:
+        data = cPickle.load(fp)
+    for molecule in data.values():
+        _convert_modes(molecule)
+    write_store(filename, data.values())
+    return filename
+
+
+def open_store(path):
+    """
+    Opens the store file in the directory 'path'. If only a
+    'database.pkl' file exists, it is converted first.
+
+    :param path: String representing the database directory.
+    :return: CompoundStore instance.
+    """
+    filename = os.path.join(path, STORE_NAME)
+    if not os.path.isfile(filename):
+        migrate(os.path.join(path, PICKLE_NAME), filename)
+    return CompoundStore(filename)
+
+
+class CompoundStore(object):
+    """
+    Read access to a store file written by 'write_store()'.
+    """
+
+    def __init__(self, filename, mmap=True):
+        """
+        :param filename: String representing the path of the store file.
+        :param mmap: Boolean. If False, the arrays are read into memory.
+        """
+        self.filename = filename
+        self.file = ArrayFile(filename, mmap=mmap)
+        meta = self.file.meta
+        if not meta.get('format') == FORMAT or meta.get('version') > VERSION:
+            raise IOError('{} is not a supported compound store.'.format(filename))
+        self.compounds = []
+        self.index = {}
+        for name, start, stop in meta['compounds']:
+            name = name.encode('latin-1')
+            self.compounds.append(name)
+            self.index[name] = (start, stop)
+        self.rows = {name: i for i, name in enumerate(self.compounds)}
+        self.properties = meta['properties']
+        self.names = self.file['names']
+        self.elements = self.file['elements']
+        self.coordinates = self.file['coordinates']
+        self.fractional = self.file['fractional']
+        self.adps = self.file['adps']
+        self.cells = self.file['cells']
+        self.invariom_offsets = self.file['invariom_offsets']
+        self.invariom_table = self.file['invariom_table'].tolist()
+        self.invariom_codes = self.file['invariom_codes']
+        self.orientations = self.file['orientations']
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.compounds)
+
+    def keys(self):
+        """
+        :return: List of all compound names in store order.
+        """
+        return list(self.compounds)
+
+    def get_modes(self, name):
+        """
+        :param name: String representing the compound's name.
+        :return: Tuple: (frequencies, masses, displacements) as returned
+        by 'vibrations.get_displacements()'.
+        """
+        i = self.rows[name]
+        start, stop = self.index[name]
+        first, last = self.file['mode_offsets'][i:i + 2]
+        frequencies = np.array(self.file['mode_frequencies'][first:last])
+        masses = np.array(self.file['mode_masses'][first:last])
+        first, last = self.file['displacement_offsets'][i:i + 2]
+        displacements = np.array(self.file['displacements'][first:last])
+        return frequencies, masses, displacements.reshape((len(frequencies), stop - start, 3))
+
+    def load_compound(self, name, modes=True):
+        """
+        Creates a DABA_MOLECULE instance representing the model compound
+        'name'.
+
+        :param name: String representing the compound's name.
+        :param modes: Boolean. If False, the normal modes and displacement
+        vectors are not loaded.
+        :return: DABA_MOLECULE instance.
+        """
+        from lauescript.types.molecule import DABA_MOLECULE
+
+        i = self.rows[name]
+        start, stop = self.index[name]
+        cell = self.cells[i]
+        molecule = DABA_MOLECULE(name,
+                                 cell=None if np.isnan(cell).any() else list(cell),
+                                 properties=_properties_from_json(self.properties[i]))
+        for row in xrange(start, stop):
+            frac = self.fractional[row]
+            molecule.give_atom(name=str(self.names[row]),
+                               element=str(self.elements[row]),
+                               cart=np.array(self.coordinates[row]),
+                               frac=None if np.isnan(frac).any() else np.array(frac),
+                               molecule=molecule)
+            atom = molecule.atoms[-1]
+            if not np.isnan(self.adps[row]).any():
+                atom.adp['cart_int'] = np.array(self.adps[row])
+            for j in xrange(self.invariom_offsets[row], self.invariom_offsets[row + 1]):
+                orientation = self.orientations[j]
+                atom.add_invariom(self.invariom_table[self.invariom_codes[j]],
+                                  [np.array(orientation[:3]), np.array(orientation[3:])])
+        if modes:
+            molecule.set_modes(*self.get_modes(name))
+        return molecule
+
+    def iter_compounds(self, names=None, modes=True):
+        """
+        Yields the model compounds one at a time.
+
+        :param names: List of compound names. Defaults to all compounds.
+        :param modes: Boolean passed to 'load_compound()'.
+        :return: Generator yielding DABA_MOLECULE instances.
+        """
+        if names is None:
+            names = self.compounds
+        for name in names:
+            yield self.load_compound(name, modes)
+
+    def give_compounds(self, data, names=None, modes=True):
+        """
+        Adds model compounds to the DATA instance 'data'.
+
+        :param data: DATA or GENERATOR instance.
+        :param names: List of compound names. Defaults to all compounds.
+        :param modes: Boolean passed to 'load_compound()'.
+        :return: None
+        """
+        for molecule in self.iter_compounds(names, modes):
+            data[molecule.name] = molecule
+
+
+if __name__ == '__main__':
+    import sys
+
+    for filename in sys.argv[1:]:
+        print 'Converting {} to {}'.format(filename, migrate(filename))
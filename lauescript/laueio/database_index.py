@@ -0,0 +1,291 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module implementing an inverted index over the model compounds of a
+database directory.
+
+The index maps every invariom name to the compounds containing it,
+every element to its invarioms and every compound to its atoms and
+their invarioms. It is stored next to the database files as
+'APD_INDEX.bin' (see 'arrayfile') and rebuilt automatically if a
+database file is newer than the index.
+
+Use 'open_index()' to query a database directory:
+
+    index = open_index(path)
+    index.get_compounds('H1c[1c1h1h]')
+    index.search('H1c')
+"""
+import os
+import re
+from bisect import bisect_left
+from glob import glob
+from datetime import datetime
+
+import numpy as np
+
+from lauescript.laueio.arrayfile import ArrayFile, write_arrays
+from lauescript.laueio.binary_database import BinaryDatabase, find_database, parse_text_database
+
+FORMAT = 'APD_INDEX'
+VERSION = 1
+INDEX_NAME = 'APD_INDEX.bin'
+MAP_NAME = 'APD_MAP.txt'
+
+
+def _source_files(path):
+    """
+    :param path: String representing the database directory.
+    :return: List of the database files the index is built from.
+    """
+    return glob(os.path.join(path, 'APD_DABA_*_.*')) + glob(os.path.join(path, MAP_NAME))
+
+
+def _read_database(path):
+    """
+    Reads the compounds of the database directory 'path'. Compiled
+    database files are preferred over database text files.
+
+    :param path: String representing the database directory.
+    :return: Tuple: (filename, compounds, arrays) as returned by
+    'binary_database.parse_text_database()'.
+    """
+    filename = find_database(path)
+    if filename:
+        database = BinaryDatabase(filename)
+        compounds = [[name, start, stop] for name, (start, stop) in
+                     sorted(database.index.items(), key=lambda item: item[1])]
+        arrays = {'elements': database.elements,
+                  'invariom_offsets': database.invariom_offsets,
+                  'invariom_table': np.array(database.invariom_table, dtype='S'),
+                  'invariom_codes': database.invariom_codes}
+        return filename, compounds, arrays
+    filenames = sorted(glob(os.path.join(path, 'APD_DABA_*_.txt')))
+    if not filenames:
+        raise IOError('No database file found in {}.'.format(path))
+    with open(filenames[0]) as fp:
+        compounds, arrays = parse_text_database(fp)
+    return filenames[0], compounds, arrays
+
+
+def _invert(keys, values, size, count):
+    """
+    :param keys: Integer array.
+    :param values: Integer array of the same length as 'keys'.
+    :param size: Integer larger than all values.
+    :param count: Integer larger than all keys.
+    :return: Tuple: (offsets, values) where values[offsets[k]:offsets[k + 1]]
+    are the sorted unique values paired with key 'k'.
+    """
+    pairs = np.unique(keys.astype(np.int64) * size + values)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(pairs // size, minlength=count))])
+    return offsets.astype(np.int64), (pairs % size).astype(np.int32)
+
+
+def write_index(path, filename=None):
+    """
+    Builds the index of the database directory 'path'.
+
+    :param path: String representing the database directory.
+    :param filename: String representing the path of the index file.
+    Defaults to 'APD_INDEX.bin' in 'path'.
+    :return: String representing the path of the index file.
+    """
+    from lauescript.invstring2 import parse_invariom_map
+
+    if not filename:
+        filename = os.path.join(path, INDEX_NAME)
+    source, compounds, arrays = _read_database(path)
+    names = [name for name, start, stop in compounds]
+    compound_offsets = np.array([0] + [stop for name, start, stop in compounds], dtype=np.int64)
+    elements = np.asarray(arrays['elements'])
+    invariom_offsets = np.asarray(arrays['invariom_offsets'])
+    invariom_table = np.asarray(arrays['invariom_table'])
+    invariom_codes = np.asarray(arrays['invariom_codes'], dtype=np.int64)
+
+    atom_compounds = np.repeat(np.arange(len(names)), np.diff(compound_offsets))
+    entry_atoms = np.repeat(np.arange(len(elements)), np.diff(invariom_offsets))
+    element_table, element_codes = np.unique(elements, return_inverse=True)
+    invariom_compound_offsets, invariom_compounds = _invert(invariom_codes, atom_compounds[entry_atoms],
+                                                            max(len(names), 1), len(invariom_table))
+    element_offsets, element_invarioms = _invert(element_codes[entry_atoms], invariom_codes,
+                                                 max(len(invariom_table), 1), len(element_table))
+
+    mapped = np.empty(len(invariom_table), dtype=np.int32)
+    mapped.fill(-1)
+    map_filename = os.path.join(path, MAP_NAME)
+    if os.path.isfile(map_filename):
+        rows = {name: i for i, name in enumerate(names)}
+        codes = {name: i for i, name in enumerate(invariom_table.tolist())}
+        with open(map_filename) as fp:
+            for invariom, compound in parse_invariom_map(fp).items():
+                if invariom in codes and compound in rows:
+                    mapped[codes[invariom]] = rows[compound]
+
+    index_arrays = {'elements': elements,
+                    'compound_offsets': compound_offsets,
+                    'invariom_offsets': invariom_offsets,
+                    'invariom_codes': invariom_codes.astype(np.int32),
+                    'invariom_table': invariom_table,
+                    'invariom_compound_offsets': invariom_compound_offsets,
+                    'invariom_compounds': invariom_compounds,
+                    'element_table': element_table,
+                    'element_offsets': element_offsets,
+                    'element_invarioms': element_invarioms,
+                    'mapped': mapped}
+    header = {'format': FORMAT,
+              'version': VERSION,
+              'generated': str(datetime.now()),
+              'source': os.path.basename(source),
+              'compounds': [name.decode('latin-1') for name in names]}
+    write_arrays(filename, index_arrays, header)
+    return filename
+
+
+def is_up_to_date(path):
+    """
+    :param path: String representing the database directory.
+    :return: Boolean: True if the index file exists and is at least
+    as new as all database files.
+    """
+    filename = os.path.join(path, INDEX_NAME)
+    if not os.path.isfile(filename):
+        return False
+    mtime = os.path.getmtime(filename)
+    return all(os.path.getmtime(source) <= mtime for source in _source_files(path))
+
+
+def open_index(path, rebuild=False):
+    """
+    Opens the index of the database directory 'path'. The index is
+    built first if it does not exist or is outdated.
+
+    :param path: String representing the database directory.
+    :param rebuild: Boolean. If True, the index is always rebuilt.
+    :return: DatabaseIndex instance.
+    """
+    if rebuild or not is_up_to_date(path):
+        write_index(path)
+    return DatabaseIndex(os.path.join(path, INDEX_NAME))
+
+
+class DatabaseIndex(object):
+    """
+    Read access to an index file written by 'write_index()'.
+    Compound lists are returned in database order.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: String representing the path of the index file.
+        """
+        self.filename = filename
+        self.file = ArrayFile(filename)
+        meta = self.file.meta
+        if not meta.get('format') == FORMAT or meta.get('version') > VERSION:
+            raise IOError('{} is not a supported index file.'.format(filename))
+        self.compounds = [name.encode('latin-1') for name in meta['compounds']]
+        self.rows = {name: i for i, name in enumerate(self.compounds)}
+        self.invariom_table = self.file['invariom_table'].tolist()
+        self.codes = {name: i for i, name in enumerate(self.invariom_table)}
+        self.element_table = self.file['element_table'].tolist()
+        self.element_codes = {name: i for i, name in enumerate(self.element_table)}
+
+    def __contains__(self, invariom):
+        return invariom in self.codes
+
+    def __len__(self):
+        return len(self.invariom_table)
+
+    def get_invarioms(self, element=None):
+        """
+        :param element: String representing an element symbol. If None,
+        all invarioms are returned.
+        :return: Sorted list of invariom names.
+        """
+        if element is None:
+            return list(self.invariom_table)
+        try:
+            i = self.element_codes[element]
+        except KeyError:
+            return []
+        offsets = self.file['element_offsets']
+        return [self.invariom_table[code] for code in self.file['element_invarioms'][offsets[i]:offsets[i + 1]]]
+
+    def get_compounds(self, invariom):
+        """
+        :param invariom: String representing an invariom name.
+        :return: List of the names of all compounds containing the
+        invariom.
+        """
+        try:
+            i = self.codes[invariom]
+        except KeyError:
+            return []
+        offsets = self.file['invariom_compound_offsets']
+        return [self.compounds[row] for row in self.file['invariom_compounds'][offsets[i]:offsets[i + 1]]]
+
+    def get_mapped_compound(self, invariom):
+        """
+        :param invariom: String representing an invariom name.
+        :return: String representing the name of the compound the
+        invariom is mapped to in 'APD_MAP.txt' or None.
+        """
+        try:
+            row = self.file['mapped'][self.codes[invariom]]
+        except KeyError:
+            return None
+        if row < 0:
+            return None
+        return self.compounds[row]
+
+    def get_atoms(self, compound):
+        """
+        :param compound: String representing a compound name.
+        :return: List of (atom_name, element, invarioms) tuples of all
+        atoms of the compound. The atoms are named the same way
+        the database readers name them.
+        """
+        i = self.rows[compound]
+        start, stop = self.file['compound_offsets'][i:i + 2]
+        elements = self.file['elements']
+        offsets = self.file['invariom_offsets']
+        codes = self.file['invariom_codes']
+        atoms = []
+        for j, row in enumerate(xrange(start, stop)):
+            element = str(elements[row])
+            atoms.append(('{}({})'.format(element, j),
+                          element,
+                          [self.invariom_table[code] for code in codes[offsets[row]:offsets[row + 1]]]))
+        return atoms
+
+    def get_compound_invarioms(self, compound):
+        """
+        :param compound: String representing a compound name.
+        :return: Sorted list of all invariom names occurring in the
+        compound.
+        """
+        invarioms = set()
+        for name, element, atom_invarioms in self.get_atoms(compound):
+            invarioms.update(atom_invarioms)
+        return sorted(invarioms)
+
+    def search(self, pattern, regex=False):
+        """
+        :param pattern: String representing either a prefix or a regular
+        expression.
+        :param regex: Boolean. If True, 'pattern' is treated as a regular
+        expression that must match somewhere in the invariom name.
+        :return: Sorted list of all matching invariom names.
+        """
+        if regex:
+            expression = re.compile(pattern)
+            return [name for name in self.invariom_table if expression.search(name)]
+        matches = []
+        for name in self.invariom_table[bisect_left(self.invariom_table, pattern):]:
+            if not name.startswith(pattern):
+                break
+            matches.append(name)
+        return matches
@@ -0,0 +1,203 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module for reading the results of Gaussian frequency calculations.
+
+The log file is read line by line in a single pass. Only the last
+molecular geometry printed before the frequency section and the first
+table of normal modes are kept. If the calculation was run with the
+'HPModes' option, the first table is the high precision table.
+"""
+import re
+
+import numpy as np
+
+VALUE = re.compile(r'-?\d+\.\d*|\*{2,}')
+
+
+def _values(line):
+    """
+    :param line: String of the form 'Label -- value value ...'.
+    :return: List of floats. Values that cannot be parsed are returned
+    as NaN.
+    """
+    return [float('nan') if value.startswith('*') else float(value) for value in VALUE.findall(line)]
+
+
+class GaussianLog(object):
+    """
+    Parser for the log file of a Gaussian frequency calculation.
+
+    The lines of the log file are passed to 'feed()' in the order they
+    appear in the file. After 'close()' is called, the following
+    attributes are available:
+
+        elements: Array of the atomic numbers of the N atoms.
+        coordinates: Array of shape (N, 3) containing the cartesian
+        coordinates in Angstrom.
+        frequencies: Array of the F frequencies in cm^-1.
+        masses: Array of the F reduced masses.
+        displacements: Array of shape (F, N, 3) containing the
+        displacement vectors of all atoms in all normal modes.
+
+    Values that are missing or cannot be parsed are set to NaN.
+    """
+
+    def __init__(self, filename=None):
+        """
+        :param filename: String representing the name of the log file.
+        Only used for reference.
+        """
+        self.filename = filename
+        self.complete = False
+        self.elements = None
+        self.coordinates = None
+        self.frequencies = None
+        self.masses = None
+        self.displacements = None
+        self._atoms = []
+        self._table = None
+        self._dashes = 0
+        self._section = False
+        self._frequencies = []
+        self._masses = []
+        self._groups = []
+        self._group = None
+        self._rows = None
+
+    def feed(self, line):
+        """
+        Parses a single line of the log file.
+
+        :param line: String.
+        :return: None
+        """
+        if self.complete:
+            return
+        if 'Harmonic frequencies (cm**-1)' in line:
+            if self._section:
+                self._finish_group()
+                self.complete = True
+            self._section = True
+        elif self._section:
+            self._feed_frequencies(line)
+        elif 'orientation:' in line:
+            self._table = []
+            self._dashes = 0
+        elif self._table is not None:
+            self._feed_geometry(line)
+
+    def _feed_geometry(self, line):
+        if line.strip().startswith('-----'):
+            self._dashes += 1
+            if self._dashes == 3:
+                self._atoms = self._table
+                self._table = None
+        elif self._dashes == 2:
+            fields = line.split()
+            self._table.append((int(fields[1]), [float(value) for value in fields[-3:]]))
+
+    def _feed_frequencies(self, line):
+        if 'Frequencies --' in line:
+            self._finish_group()
+            values = _values(line)
+            self._group = (len(self._frequencies), len(values), [])
+            self._frequencies.extend(values)
+            self._rows = None
+        elif self._group is None:
+            return
+        elif 'masses --' in line:
+            self._masses.extend(_values(line))
+        elif 'Coord Atom Element:' in line:
+            self._rows = 'coord'
+        elif line.split()[:2] == ['Atom', 'AN']:
+            self._rows = 'atom'
+        elif self._rows:
+            if not self._feed_displacements(line.split()):
+                self._rows = None
+
+    def _feed_displacements(self, fields):
+        """
+        :param fields: List of strings.
+        :return: Boolean. False if the fields do not represent a row of
+        the current normal mode table.
+        """
+        columns = self._group[1]
+        try:
+            if self._rows == 'coord' and len(fields) == 3 + columns:
+                coord, atom = int(fields[0]) - 1, int(fields[1]) - 1
+                values = [float(value) for value in fields[3:]]
+                self._group[2].append((atom, coord, values))
+            elif self._rows == 'atom' and len(fields) == 2 + 3 * columns:
+                atom = int(fields[0]) - 1
+                values = [float(value) for value in fields[2:]]
+                for coord in xrange(3):
+                    self._group[2].append((atom, coord, values[coord::3]))
+            else:
+                return False
+        except ValueError:
+            return False
+        return True
+
+    def _finish_group(self):
+        """
+        Converts the displacement rows of the current group of normal
+        modes to an array.
+        """
+        if self._group is None:
+            return
+        offset, columns, rows = self._group
+        atoms = max([len(self._atoms)] + [row[0] + 1 for row in rows])
+        displacements = np.empty((columns, atoms, 3))
+        displacements.fill(np.nan)
+        for atom, coord, values in rows:
+            displacements[:, atom, coord] = values
+        self._groups.append((offset, displacements))
+        self._group = None
+
+    def close(self):
+        """
+        Creates the arrays from the parsed data.
+
+        :return: None
+        """
+        self._finish_group()
+        self._table = None
+        self.elements = np.array([atom[0] for atom in self._atoms], dtype=int)
+        self.coordinates = np.array([atom[1] for atom in self._atoms], dtype=float).reshape((-1, 3))
+        self.frequencies = np.array(self._frequencies, dtype=float)
+        self.masses = np.empty(len(self.frequencies))
+        self.masses.fill(np.nan)
+        self.masses[:len(self._masses)] = self._masses[:len(self.frequencies)]
+        atoms = max([len(self._atoms)] + [group.shape[1] for _, group in self._groups])
+        self.displacements = np.empty((len(self.frequencies), atoms, 3))
+        self.displacements.fill(np.nan)
+        for offset, group in self._groups:
+            self.displacements[offset:offset + len(group), :group.shape[1]] = group
+        self._frequencies, self._masses, self._groups = [], [], []
+
+    def valid_modes(self):
+        """
+        :return: Array of the indices of all normal modes with a valid
+        frequency and reduced mass.
+        """
+        return np.flatnonzero(np.isfinite(self.frequencies) & np.isfinite(self.masses))
+
+
+def read_log(filename):
+    """
+    Reads the log file of a Gaussian frequency calculation.
+
+    :param filename: String representing the name of the log file.
+    :return: GaussianLog instance.
+    """
+    log = GaussianLog(filename)
+    with open(filename) as fp:
+        for line in fp:
+            log.feed(line)
+            if log.complete:
+                break
+    log.close()
+    return log
@@ -18,6 +18,9 @@ from lauescript.core import core
 import lauescript.cryst.crystgeom as cg
 import lauescript.invstring2 as invstring
 from lauescript.core import core
+from lauescript.laueio.binary_database import BinaryDatabase, BinaryDatabaseReader, binary_filename, is_up_to_date, \
+    open_multi_temperature_database
+from lauescript.laueio.invariom_table import open_table
 
 
 # ===============================================================================
@@ -98,10 +101,33 @@ def read_database2(data, dabapointer, invlist):  #,invdict,atomlist):
 
 
 def read_database(data, database, invlist, readAll=False):
-    reader = DatabaseReader(database, readAll=readAll)
+    """
+    Reads the model compounds in 'invlist' from 'database' into 'data'.
+
+    :param database: Either a list of lines of a database text file or
+    a BinaryDatabase instance.
+    """
+    if isinstance(database, BinaryDatabase):
+        reader = BinaryDatabaseReader(database, readAll=readAll)
+    else:
+        reader = DatabaseReader(database, readAll=readAll)
     reader.read(data, invlist)
 
 
+def open_database(filename):
+    """
+    Opens the database file 'filename'. If an up to date compiled
+    version of the file exists, a BinaryDatabase instance is returned.
+    Otherwise the lines of the text file are returned.
+
+    :param filename: String representing the path of a database text file.
+    """
+    if is_up_to_date(filename):
+        return BinaryDatabase(binary_filename(filename))
+    with open(filename) as dabapointer:
+        return dabapointer.readlines()
+
+
 class DatabaseReader(object):
     def __init__(self, database, readAll=False):
         self.readAll = readAll
@@ -233,43 +259,66 @@ def FlexLoad(data, loader, dabapath, config, filename='./', noTransfer=False, pl
     if not T:
         printer.highlight('Warning: No temperature specified. Falling back to default.')
         T = 100
-    T = int(T)
+    database = open_multi_temperature_database(dabapath, float(T))
+    if database:
+        T = float(T)
+    else:
+        T = int(T)
     data.give_temperature(T)
 
-    dabapa = dabapath + '/APD_DABA_{:.1f}_.txt'.format(data.temperature)
     printer('Crystal temperature: {:.1f} K'.format(data.temperature))
-    try:
-        dabapointer = open(dabapa)
-    except IOError:
-        printer('inout.py: Error: File {} not found.'.format(dabapa))
-        printer('Calling database generator to generate appropriate database file.\n\n')
-        import lauescript.database as db
-
-        frequency_cutoff = config.get_frequency_cutoff()
-        db.generate_database(data, frequency_cutoff, clean=False, temperatures=[data.temperature], path=dabapath,
-                             newh=config.get_config_valueBool('APD', 'newH'))
-        dabapointer = open(dabapa)
-
-    database = dabapointer.readlines()
+    if database:
+        printer('Using ADPs from multi temperature database {}.'.format(database.filename))
+    else:
+        dabapa = dabapath + '/APD_DABA_{:.1f}_.txt'.format(data.temperature)
+        if not os.path.isfile(dabapa) and not is_up_to_date(dabapa):
+            printer('inout.py: Error: File {} not found.'.format(dabapa))
+            printer('Calling database generator to generate appropriate database file.\n\n')
+            import lauescript.database as db
+
+            frequency_cutoff = config.get_frequency_cutoff()
+            db.generate_database(data, frequency_cutoff, clean=False, temperatures=[data.temperature], path=dabapath,
+                                 newh=config.get_config_valueBool('APD', 'newH'),
+                                 workers=config.get_worker_count())
+
+        database = open_database(dabapa)
     printer()
     if noTransfer:
-        read_database(data, database, invlist=[], readAll=True)
+        if isinstance(database, BinaryDatabase):
+            data.attach_database(database)
+        else:
+            read_database(data, database, invlist=[], readAll=True)
         return
+    table = None
+    if not isinstance(database, BinaryDatabase) or not database.is_multi_temperature():
+        try:
+            table = open_table(dabapa, dabapath + '/APD_MAP.txt')
+        except (IOError, OSError):
+            # The database directory is not writable and no up to date
+            # table exists. The model compounds are read instead.
+            printer('Invariom table not available. Reading model compounds from {}.'.format(dabapa))
+        else:
+            data.attach_invariom_table(table)
+            if isinstance(database, list):
+                # 'open_table()' compiles the database text file if necessary.
+                database = open_database(dabapa)
     correctionsPointer = open(dabapath + '/empirical_corrections.txt')
     for invdict, orientations, compounds in invstring.get_invariom_names(names=[i.name for i in data['exp'].atoms],
                                                                          cart=[i.cart for i in data['exp'].atoms],
                                                                          dictionary=True,
                                                                          orientations=True,
-                                                                         compounds=open(dabapath + '/APD_MAP.txt'),
+                                                                         compounds=dabapath + '/APD_MAP.txt',
                                                                          corrections=correctionsPointer,
                                                                          dynamic=True,
                                                                          output=printer,
                                                                          verbose=False,
                                                                          newH=config.get_config_valueBool('APD', 'newH'),
-                                                                         planarityThreshold=planarityThreshold):
+                                                                         planarityThreshold=planarityThreshold,
+                                                                         cache=config.get_name_cache()):
 
 
-        invlist = [item for _, item in compounds.items()]
+        invlist = [item for invname, item in compounds.items()
+                   if table is None or not table.get_compound_name(invname) == item]
         read_database(data, database, invlist)
         kill = False
         misses = []
@@ -279,7 +328,10 @@ def FlexLoad(data, loader, dabapath, config, filename='./', noTransfer=False, pl
             atom.add_invariom(invname, orientation)
             if invname in compounds.keys() and not atom.model_compound:
                 modelname = compounds[invname]
-                atom.model_compound = data[modelname]
+                if table is not None and table.get_compound_name(invname) == modelname:
+                    atom.model_compound = table.give_compound(modelname)
+                else:
+                    atom.model_compound = data[modelname]
                 atom.set_active_invariom(invname)
             elif invname not in compounds.keys() and not atom.model_compound:
                 misses.append((atom, invname))
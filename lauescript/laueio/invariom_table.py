@@ -0,0 +1,319 @@
+"""
+Created on Oct 18, 2026
+
+@author: jens
+
+Module implementing a canonical table of the invarioms of a database
+file.
+
+For every invariom listed in 'APD_MAP.txt' the table stores the atom of
+the mapped model compound that is used for the ADP transfer: its ADP,
+its orientation vectors and its prochirality. In addition the table
+stores statistics over all occurrences of the invariom in the database
+file:
+
+    occurrences  Number of atoms carrying the invariom.
+    ueq          Mean and standard deviation of U_eq.
+    spread       Standard deviation of the six ADP components expressed
+                 in the local coordinate system defined by the
+                 orientation vectors of each occurrence.
+
+The table is stored next to the database file as
+'APD_INVARIOMS_<T>_.bin' (see 'arrayfile') and rebuilt automatically
+if the database file or the invariom map is newer than the table.
+
+Use 'open_table()' to look up invarioms without loading model
+compounds:
+
+    table = open_table('APD_DABA_100.0_.txt', 'APD_MAP.txt')
+    atom = table.give_atom('H1c[1c1h1h]')
+    atom.adp['cart_int'], atom.spread
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+
+from lauescript.laueio.arrayfile import ArrayFile, write_arrays
+from lauescript.laueio.binary_database import BinaryDatabase, binary_filename, compile_database, is_up_to_date
+from lauescript.types.atom import ATOM
+
+FORMAT = 'APD_INVARIOMS'
+VERSION = 1
+SIDES = (None, 're', 'si')
+
+
+def table_filename(filename):
+    """
+    :param filename: String representing the path of a database text file.
+    :return: String representing the path of the corresponding invariom
+    table.
+    """
+    path, name = os.path.split(os.path.splitext(filename)[0])
+    return os.path.join(path, name.replace('APD_DABA_', 'APD_INVARIOMS_', 1) + '.bin')
+
+
+def _local_adps(adps, orientations):
+    """
+    Expresses ADPs in the local coordinate systems defined by
+    orientation vectors.
+
+    :param adps: Array of shape (N, 6) containing cartesian ADPs.
+    :param orientations: Array of shape (N, 6) containing the two
+    orientation vectors of each ADP.
+    :return: Array of shape (N, 6). Rows with degenerate orientation
+    vectors are NaN.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        e1 = orientations[:, :3] / np.linalg.norm(orientations[:, :3], axis=1)[:, None]
+        e2 = orientations[:, 3:] - np.einsum('ij,ij->i', orientations[:, 3:], e1)[:, None] * e1
+        e2 /= np.linalg.norm(e2, axis=1)[:, None]
+    basis = np.stack([e1, e2, np.cross(e1, e2)], axis=1)
+    u11, u22, u33, u12, u13, u23 = adps.T
+    matrices = np.array([[u11, u12, u13],
+                         [u12, u22, u23],
+                         [u13, u23, u33]]).transpose((2, 0, 1))
+    local = np.einsum('nij,njk,nlk->nil', basis, matrices, basis)
+    return np.stack([local[:, 0, 0], local[:, 1, 1], local[:, 2, 2],
+                     local[:, 0, 1], local[:, 0, 2], local[:, 1, 2]], axis=1)
+
+
+def _grouped_statistics(codes, values, count):
+    """
+    :param codes: Integer array of length N.
+    :param values: Array of length N. NaN values are ignored.
+    :param count: Integer larger than all codes.
+    :return: Tuple: (mean, std) arrays of length 'count'.
+    """
+    valid = ~np.isnan(values)
+    n = np.bincount(codes[valid], minlength=count).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(codes[valid], values[valid], minlength=count) / n
+        square = np.bincount(codes[valid], values[valid] ** 2, minlength=count) / n
+    return mean, np.sqrt(np.maximum(square - mean ** 2, 0))
+
+
+def _get_side(database, name, row, invariom, molecules):
+    """
+    Determines the prochirality of an atom of a model compound the same
+    way 'DATA.update()' does it.
+
+    :return: Integer: index of the atom's side in SIDES.
+    """
+    if invariom[1:2] in ('', '@'):
+        return 0
+    if not name in molecules:
+        molecule = database.load_compound(name)
+        molecule.get_distances()
+        molecules[name] = molecule
+    atom = molecules[name].atoms[row - database.index[name][0]]
+    atom.set_active_invariom(invariom)
+    atom.get_prochirality()
+    if not atom.prochiral:
+        return 0
+    return SIDES.index(atom.side)
+
+
+def write_table(filename, map_filename, output=None):
+    """
+    Builds the invariom table of a database file. The database file is
+    compiled first if no up to date binary version exists.
+
+    :param filename: String representing the path of a database text file.
+    :param map_filename: String representing the path of the
+    'APD_MAP.txt' file.
+    :param output: String representing the path of the table file.
+    Defaults to 'table_filename(filename)'.
+    :return: String representing the path of the table file.
+    """
+    from lauescript.invstring2 import parse_invariom_map
+
+    if not output:
+        output = table_filename(filename)
+    if not is_up_to_date(filename):
+        compile_database(filename)
+    database = BinaryDatabase(binary_filename(filename))
+    if database.is_multi_temperature():
+        raise ValueError('{} is a multi temperature database.'.format(database.filename))
+    with open(map_filename) as fp:
+        invariom_map = parse_invariom_map(fp)
+
+    adps = np.asarray(database.adps)
+    orientations = np.asarray(database.orientations)
+    invariom_offsets = np.asarray(database.invariom_offsets)
+    invariom_codes = np.asarray(database.invariom_codes, dtype=np.int64)
+    count = len(database.invariom_table)
+    entry_atoms = np.repeat(np.arange(len(adps)), np.diff(invariom_offsets))
+
+    occurrences = np.bincount(invariom_codes, minlength=count)
+    ueq = adps[entry_atoms, :3].mean(axis=1)
+    ueq_mean, ueq_std = _grouped_statistics(invariom_codes, ueq, count)
+    local = _local_adps(adps[entry_atoms], orientations)
+    spread = np.array([_grouped_statistics(invariom_codes, local[:, i], count)[1] for i in xrange(6)]).T
+
+    names = []
+    rows = []
+    entries = []
+    codes = {name: i for i, name in enumerate(database.invariom_table)}
+    for invariom in sorted(invariom_map.keys()):
+        compound = invariom_map[invariom]
+        if not invariom in codes or not compound in database:
+            continue
+        start, stop = database.index[compound]
+        first, last = invariom_offsets[start], invariom_offsets[stop]
+        hits = np.nonzero(invariom_codes[first:last] == codes[invariom])[0]
+        if not len(hits):
+            continue
+        names.append(invariom)
+        entries.append(first + hits[0])
+        rows.append(entry_atoms[first + hits[0]])
+
+    compounds = sorted(set(invariom_map[name] for name in names))
+    compound_rows = {name: i for i, name in enumerate(compounds)}
+    table_codes = np.array([codes[name] for name in names], dtype=np.int64)
+    molecules = {}
+    sides = [_get_side(database, invariom_map[name], row, name, molecules) for name, row in zip(names, rows)]
+    rows = np.array(rows, dtype=np.int64)
+    arrays = {'invariom_table': np.array(names, dtype='S'),
+              'compounds': np.array([compound_rows[invariom_map[name]] for name in names], dtype=np.int32),
+              'atoms': (rows - np.array([database.index[invariom_map[name]][0] for name in names],
+                                        dtype=np.int64)).astype(np.int32),
+              'elements': np.asarray(database.elements)[rows],
+              'adps': adps[rows].reshape((-1, 6)),
+              'orientations': orientations[np.array(entries, dtype=np.int64)].reshape((-1, 6)),
+              'sides': np.array(sides, dtype=np.int8),
+              'occurrences': occurrences[table_codes].astype(np.int32),
+              'ueq': np.stack([ueq_mean[table_codes], ueq_std[table_codes]], axis=1).reshape((-1, 2)),
+              'spread': spread[table_codes].reshape((-1, 6))}
+    header = {'format': FORMAT,
+              'version': VERSION,
+              'generated': str(datetime.now()),
+              'source': os.path.basename(filename),
+              'compounds': [name.decode('latin-1') for name in compounds]}
+    write_arrays(output, arrays, header)
+    return output
+
+
+def is_table_up_to_date(filename, map_filename):
+    """
+    :param filename: String representing the path of a database text file.
+    :param map_filename: String representing the path of the
+    'APD_MAP.txt' file.
+    :return: Boolean: True if the invariom table exists and is at least
+    as new as the database files and the invariom map.
+    """
+    table = table_filename(filename)
+    if not os.path.isfile(table):
+        return False
+    mtime = os.path.getmtime(table)
+    return all(os.path.getmtime(source) <= mtime for source in (filename, binary_filename(filename), map_filename)
+               if os.path.isfile(source))
+
+
+def open_table(filename, map_filename, rebuild=False):
+    """
+    Opens the invariom table of a database file. The table is built
+    first if it does not exist or is outdated.
+
+    :param filename: String representing the path of a database text file.
+    :param map_filename: String representing the path of the
+    'APD_MAP.txt' file.
+    :param rebuild: Boolean. If True, the table is always rebuilt.
+    :return: InvariomTable instance.
+    """
+    if rebuild or not is_table_up_to_date(filename, map_filename):
+        write_table(filename, map_filename)
+    return InvariomTable(table_filename(filename))
+
+
+class InvariomAtom(ATOM):
+    """
+    ATOM subclass representing the atom of a model compound that is
+    used for transferring the ADP of an invariom. Instances are
+    created by 'InvariomTable.give_atom()'. The prochirality is read
+    from the table.
+
+    In addition to the attributes of the ATOM class, the instances
+    provide the invariom statistics 'occurrences', 'ueq' and 'spread'
+    described in the module documentation.
+    """
+
+    def get_prochirality(self):
+        pass
+
+
+class InvariomTable(object):
+    """
+    Read access to an invariom table written by 'write_table()'.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: String representing the path of the table file.
+        """
+        self.filename = filename
+        self.file = ArrayFile(filename)
+        meta = self.file.meta
+        if not meta.get('format') == FORMAT or meta.get('version') > VERSION:
+            raise IOError('{} is not a supported invariom table.'.format(filename))
+        self.compounds = [name.encode('latin-1') for name in meta['compounds']]
+        self.invariom_table = self.file['invariom_table'].tolist()
+        self.codes = {name: i for i, name in enumerate(self.invariom_table)}
+        self.molecules = {}
+        self.atoms = {}
+
+    def __contains__(self, invariom):
+        return invariom in self.codes
+
+    def __len__(self):
+        return len(self.invariom_table)
+
+    def get_compound_name(self, invariom):
+        """
+        :param invariom: String representing an invariom name.
+        :return: String representing the name of the model compound
+        the invariom is taken from or None.
+        """
+        try:
+            return self.compounds[self.file['compounds'][self.codes[invariom]]]
+        except KeyError:
+            return None
+
+    def give_compound(self, name):
+        """
+        :param name: String representing the name of a model compound.
+        :return: DABA_MOLECULE instance without atoms representing the
+        model compound. The same instance is returned for every call.
+        """
+        from lauescript.types.molecule import DABA_MOLECULE
+
+        if not name in self.molecules:
+            self.molecules[name] = DABA_MOLECULE(name)
+        return self.molecules[name]
+
+    def give_atom(self, invariom):
+        """
+        :param invariom: String representing an invariom name.
+        :return: InvariomAtom instance carrying the invariom. The same
+        instance is returned for every call.
+        """
+        if invariom in self.atoms:
+            return self.atoms[invariom]
+        i = self.codes[invariom]
+        element = str(self.file['elements'][i])
+        orientation = self.file['orientations'][i]
+        atom = InvariomAtom(name='{}({})'.format(element, self.file['atoms'][i]),
+                            element=element,
+                            molecule=self.give_compound(self.get_compound_name(invariom)))
+        atom.give_adp(key='cart_int', value=np.array(self.file['adps'][i], dtype=np.float64))
+        atom.add_invariom(invariom, [np.array(orientation[:3]), np.array(orientation[3:])])
+        atom.set_active_invariom(invariom)
+        side = SIDES[self.file['sides'][i]]
+        atom.prochiral = side is not None
+        if atom.prochiral:
+            atom.side = side
+        atom.occurrences = int(self.file['occurrences'][i])
+        atom.ueq = np.array(self.file['ueq'][i])
+        atom.spread = np.array(self.file['spread'][i])
+        self.atoms[invariom] = atom
+        return atom
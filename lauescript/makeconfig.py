@@ -54,6 +54,7 @@ def run(outputName=None, data_path=None, plugin_path=None):
     conf.set('APD', 'DatabasePath', data_path)
     conf.set('APD', 'PluginPath', plugin_path)
     conf.set('APD', 'newH', True)
+    conf.set('APD', 'NameCache', '')
     conf.set('Errors', 'ReportErrors', report)
     conf.set('Errors', 'IncludeInput', files)
     conf.set('Errors', 'ServerAddress', '134.76.64.183')
@@ -61,6 +62,7 @@ def run(outputName=None, data_path=None, plugin_path=None):
     conf.set('Database', 'Frequency_cutoff', 200)
     conf.set('Database', 'ModelcompountRootdirectory', 'Not used')
     conf.set('Database', 'frequency_scale', '1')
+    conf.set('Database', 'Workers', 0)
     with open(expanduser(outputName), 'w') as fp:
         conf.write(fp)
 
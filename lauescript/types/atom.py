@@ -172,7 +172,7 @@ class ATOM(AtomInterface):
         self.molecule = molecule
         self.model_compound = model_compound
         self.partner = None
-        self.keep = ['cart', 'disps', 'element']
+        self.keep = ['cart', 'frac', 'element', 'invarioms', 'adp', 'molecule']
         self.invarioms = {}
         self.invariom_name = None
         self.orientation = None
@@ -191,6 +191,10 @@ class ATOM(AtomInterface):
             self.invarioms[name] = orientation
 
     def __sub__(self, atom):
+        if self.frac is None:
+            # Atoms of molecules without unit cell, e.g. model compounds
+            # read from a database file.
+            return norm(self.cart - atom.cart)
         x, y, z = self.frac
         try:
             xx, yy, zz = atom.get_frac() + 99.5
@@ -248,17 +252,10 @@ class ATOM(AtomInterface):
         all attributes specified in the 'self.keep' list will
         be preserved.
         """
-        types = [type(self.strip_atom),
-                 type(self.__class__)]
-
-        for attr in dir(self):
-            if not type(getattr(self, attr)) in types:
-                if any(i in attr for i in self.keep) \
-                        or any(i in attr for i in keep) \
-                        or attr[0:2] == '__':
-                    continue
-                else:
-                    pass
+        keep = self.keep + list(keep)
+        for attr in self.__dict__.keys():
+            if not any(i in attr for i in keep):
+                delattr(self, attr)
 
     def __str__(self):
         return self.name
@@ -451,17 +448,14 @@ class ATOM(AtomInterface):
                     all([num < 1 or num > -1 for num in self.adp['cart_int']])]
             self.adp['cart_int'] = sum(adps) / len(adps)
 
-    def add_disps(self, freq, disps):
+    @property
+    def disps(self):
         """
-        Adds the polarisation vectors for every internal vibration
-        frequency to the atom.
+        Read-only view of the polarisation vectors of the atom for every
+        internal vibration frequency of its model compound.
+        Array of shape (F, 3).
         """
-        # print freq, disps
-        # raw_input()
-        try:
-            self.disps[str(freq)] = disps
-        except:
-            self.disps = {str(freq): disps}
+        return self.molecule.get_atom_displacements(self)
 
     def turn(self):
         return
@@ -8,13 +8,14 @@ data structure of the APD-Toolkit. These classes serve as containers
 for molecules and atoms and provide the interface for manipulating
 most of their properties.
 """
-import operator
+import os
 
 from lauescript.types.molecule import MOLECULE, DABA_MOLECULE
 from lauescript.cryst.match import match_point_clouds, get_transform
-from lauescript.cryst.geom import is_bound
+from lauescript.cryst.geom import get_bond_partners
 from lauescript.cryst.sort import SortAtom
 from lauescript.core.core import apd_exit
+from lauescript.laueio.database_index import write_index
 from sys import platform
 
 
@@ -32,6 +33,57 @@ class DATA(dict):
         self.temperature = temperature
         self.argv = None
         self.config = None
+        self.database = None
+        self.invariom_table = None
+
+    def __missing__(self, name):
+        """
+        Loads model compounds from the attached database the first
+        time they are accessed.
+        """
+        database = getattr(self, 'database', None)
+        if database is None or name not in database:
+            raise KeyError(name)
+        molecule = database.load_compound(name)
+        self[name] = molecule
+        return molecule
+
+    def attach_database(self, database):
+        """
+        Attaches a database to the DATA instance. Model compounds
+        stored in the database are only converted to DABA_MOLECULE
+        instances when they are accessed via 'data[name]'.
+        :param database: BinaryDatabase instance.
+        :return: None
+        """
+        self.database = database
+
+    def attach_invariom_table(self, table):
+        """
+        Attaches an invariom table to the DATA instance. Invarioms
+        found in the table are linked to the table's atoms instead of
+        the atoms of the model compounds.
+        :param table: InvariomTable instance.
+        :return: None
+        """
+        self.invariom_table = table
+
+    def iter_database(self, names=None):
+        """
+        Iterates over all model compounds of the attached database.
+        Compounds that are not part of the DATA instance yet are
+        loaded but not stored. The memory usage is therefore
+        independent of the size of the database.
+        :param names: List of compound names. Defaults to all compounds.
+        :return: Generator yielding DABA_MOLECULE instances.
+        """
+        if names is None:
+            names = self.database.keys()
+        for name in names:
+            if name in self:
+                yield self[name]
+            else:
+                yield self.database.load_compound(name)
 
     def set_argv(self, string):
         """
@@ -223,11 +275,15 @@ class DATA(dict):
         """
         Links all atoms in 'exp' to their invarioms.
         """
+        table = getattr(self, 'invariom_table', None)
         for exp_atom in self['exp'].atoms:
             if exp_atom.isTolerated():
                 continue
+            inv = exp_atom.get_active_invariom()
+            if table is not None and table.get_compound_name(inv) == exp_atom.model_compound.name:
+                exp_atom.set_invariom_atom(table.give_atom(inv))
+                continue
             for model_atom in self[exp_atom.model_compound.name].atoms:
-                inv = exp_atom.get_active_invariom()
                 if inv in model_atom.invarioms.keys():
                     exp_atom.set_invariom_atom(model_atom)
                     model_atom.set_invariom_atom(exp_atom)
@@ -285,17 +341,19 @@ class DATA(dict):
         :param bound: Boolean specifying whether all atom pairs are
         returned or only those with chemical bonds between them.
         """
-        blacklist = []
-        for atom1 in self.iter_atoms(sort=sort):
-            for atom2 in self.iter_atoms(sort=sort):
+        blacklist = set()
+        atoms = list(self.iter_atoms(sort=sort))
+        if bound:
+            partners = [[atoms[j] for j in indices] for indices in get_bond_partners(atoms)]
+        for i, atom1 in enumerate(atoms):
+            for atom2 in partners[i] if bound else atoms:
                 if not atom1 == atom2:
-                    if not bound or is_bound(atom1.cart, atom1.element, atom2.cart, atom2.element):
-                        blackstring = '{}{}'.format(*sorted([atom1.name, atom2.name]))
-                        if unique and not blackstring in blacklist:
-                            yield atom1, atom2
-                            blacklist.append(blackstring)
-                        elif not unique:
-                            yield atom1, atom2
+                    blackstring = '{}{}'.format(*sorted([atom1.name, atom2.name]))
+                    if unique and not blackstring in blacklist:
+                        yield atom1, atom2
+                        blacklist.add(blackstring)
+                    elif not unique:
+                        yield atom1, atom2
 
 
 class GENERATOR(DATA):
@@ -324,6 +382,7 @@ class GENERATOR(DATA):
         self.keep = keep
         self.printer = None
         self.errorlog = None
+        self.workers = None
 
     def set_temperature(self, temperature):
         """
@@ -333,7 +392,8 @@ class GENERATOR(DATA):
         """
         self.Temp = temperature
 
-    def update(self, errorlog, printer, path=None, parallel=True, *args, **kwargs):
+    def update(self, errorlog, printer, path=None, parallel=True, batch=False, workers=None, binary=False, *args,
+               **kwargs):
         """
         Calls all the necessary functions and methods
         to create the 'APD_DABA.txt' and 'APD_MAP.txt' files
@@ -347,42 +407,57 @@ class GENERATOR(DATA):
         :param parallel: Boolean specifying whether the multiprocessing
         module will be used to calculate ADPs on multiple CPUs. This boolean
         will be forced to be False on windows platforms.
+        :param batch: Boolean specifying whether the ADPs for all
+        temperatures are calculated in one pass and written to a single
+        multi temperature database file.
+        :param workers: Integer representing the number of processes used
+        for the parallel ADP calculation. Defaults to the number of CPUs.
+        :param binary: Boolean specifying whether the binary database files
+        are written together with the database text files.
         :param args: ...
         :param kwargs: ...
         """
-        if 'win' in platform:
+        if platform.startswith('win'):
             parallel = False
 
         self.printer = printer
         self.errorlog = errorlog
-        self._get_invariom_list()
+        self.workers = workers
         self._get_criteria()
         self._sort_compounds()
         self._map_invarioms()
         self._get_distances()
-        for Temp in self.Temp:
-            if parallel:
-                self._update_adp_calculation_parallel(Temp)
-            else:
-                self._update_adp_calculation(Temp)
-            self._update_database_file(Temp, path)
-        self._update_database_map(path)
+        if batch:
+            # The map is written first. A multi temperature database
+            # file older than the map is considered outdated.
+            self._update_database_map(path)
+            self._update_database_grid(path)
+        else:
+            for Temp in self.Temp:
+                if parallel:
+                    self._update_adp_calculation_parallel(Temp)
+                else:
+                    self._update_adp_calculation(Temp)
+                self._update_database_file(Temp, path, binary)
+            self._update_database_map(path)
+        write_index(path or '.')
         if self.save:
-            self.serialize()
+            self.serialize(path)
 
-    def serialize(self):
+    def serialize(self, path=None):
         """
-        Uses the cPickle module to serialize the GENERATOR
-        instance.
+        Writes the model compounds of the GENERATOR instance to the
+        compound store file 'database.bin'.
+
+        :param path: String representing the directory the store file is
+        written to. Defaults to the working directory.
         """
         self.printer('\n    ...Serializing database content...\n')
         self.release()
 
-        # self.strip()
-        import cPickle
+        from lauescript.laueio.compound_store import write_store, STORE_NAME
 
-        f = open('database.pkl', 'wb')
-        cPickle.dump(self, f)
+        write_store(os.path.join(path or '.', STORE_NAME), self.values())
 
     def strip(self):
         """
@@ -391,50 +466,52 @@ class GENERATOR(DATA):
         all attributes specified in the 'self.keep' list will
         be preserved.
         """
-        types = [type(self.strip),
-                 type(self.values),
-                 type(self.__ne__),
-                 type(self.__class__)]
-
-        for attr in dir(self):
-            if not type(getattr(self, attr)) in types:
-                if any(i in attr for i in self.keep) or attr[0:2] == '__':
-                    continue
-                else:
-                    x = getattr(self, attr)
-                    del x
-        for molecule in self.values():
-            molecule.strip_molecule(self.keep)
-            exit()
-
-    def _get_invariom_list(self):
-        """
-        Generates a unique list of all invariom names in all
-        model compounds.
-        """
-        self.invariom_list = []
+        keep = list(self.keep)
+        for attr in self.__dict__.keys():
+            if not any(i in attr for i in keep):
+                delattr(self, attr)
         for molecule in self.values():
-            for atom in molecule.atoms:
-                for invariom in atom.invarioms:
-                    if not invariom in self.invariom_list:
-                        self.invariom_list.append(invariom)
+            molecule.strip_molecule(keep)
 
     def _map_invarioms(self):
         """
         Maps the invariom names to the 'smallest' model compound
         containing that invariom.
         """
-        self.map = {}
-        for invariom in self.invariom_list:
-            kill = False
-            for molecule in self.sorted_molecules:
-                for atom in molecule.atoms:
-                    if invariom in atom.invarioms:
-                        self.map[invariom] = molecule.name
-                        kill = True
-                        break
-                if kill:
-                    break
+        self.map, self.map_statistics = self._build_invariom_map(
+            (molecule.name, [invariom for atom in molecule.atoms for invariom in atom.invarioms])
+            for molecule in self.sorted_molecules)
+
+    @staticmethod
+    def _build_invariom_map(compounds):
+        """
+        Maps every invariom name to the first compound it occurs in.
+        All compounds are visited only once.
+
+        :param compounds: Iterable of (name, invarioms) tuples sorted by
+        the compounds' criterion. 'invarioms' is a list of the invariom
+        names of all atoms of the compound.
+        :return: Tuple: (invariom_map, statistics). 'invariom_map' keys
+        the invariom names to compound names. 'statistics' keys the
+        invariom names to [occurrences, compounds] lists where
+        'occurrences' is the number of atoms with that invariom and
+        'compounds' is the list of all compounds containing it in the
+        order of 'compounds'.
+        """
+        invariom_map = {}
+        statistics = {}
+        for name, invarioms in compounds:
+            for invariom in invarioms:
+                try:
+                    entry = statistics[invariom]
+                except KeyError:
+                    invariom_map[invariom] = name
+                    statistics[invariom] = [1, [name]]
+                else:
+                    entry[0] += 1
+                    if not entry[1][-1] == name:
+                        entry[1].append(name)
+        return invariom_map, statistics
 
     def release(self):
         """
@@ -451,7 +528,21 @@ class GENERATOR(DATA):
         is the molecule.criterion attribute defining the 'size' of
         an modelcompound.
         """
-        self.sorted_molecules = sorted(self.values(), key=operator.attrgetter('criterion'))
+        self.sorted_molecules = sorted(self.values(),
+                                       key=lambda molecule: self._compound_order(molecule.criterion, molecule.name))
+
+    @staticmethod
+    def _compound_order(criterion, name):
+        """
+        Sorting key of a model compound. Compounds with equal criteria
+        are sorted by name, so the invariom map does not depend on the
+        order the compounds were read in.
+
+        :param criterion: String returned by 'molecule.get_criterion()'.
+        :param name: String representing the name of the compound.
+        :return: Tuple.
+        """
+        return str(criterion), name
 
     def _get_criteria(self):
         """
@@ -496,134 +587,284 @@ class GENERATOR(DATA):
         """
         Multi CPU implementation of the ADP calculation.
 
-        For some mysterious reason this code does not work
-        on Windows machines. Don't ask me why. The traceback
-        looks like ancient chinese to me.
-        """
-        import multiprocessing
+        The frequencies and displacement vectors of the compounds are
+        distributed to a pool of worker processes. The number of workers
+        is defined by 'self.workers' and defaults to the number of CPUs.
 
+        :return: Float representing the number of compounds processed
+        per second.
+        """
         import time
+        from multiprocessing import cpu_count
+        from lauescript.cryst.vibrations import get_displacements, calculate_adps
 
-        start2 = time.time()
-
-        class Worker(multiprocessing.Process):
-            """
-            Worker class used for calculating ADPs.
-            """
-            def __init__(self, data_pointer, Tempe, message_queue, job_queue, ID):
-                super(Worker, self).__init__()
-                self.data_pointer = data_pointer
-                self.Temp = Tempe
-                self.counter = 0
-                self.message_q = message_queue
-                self.job_q = job_queue
-                self.id = ID
-
-            def run(self):
-                """
-                Starting the ADP calculation.
-                """
-                while True:
-                    if self.job_q.empty():
-                        self.message_q.put(False)
-                        return
-                    try:
-                        smolecule = self.job_q.get()
-                        self.data_pointer[smolecule].get_adp(self.Temp)
-                    except IndexError:
-                        self.message_q.put((smolecule, None))
-                    try:
-                        self.message_q.put((smolecule, [j.adp['cart_int'] for j in self.data_pointer[smolecule].atoms]))
-                    except KeyError:
-                        # =======================================================
-                        # self.message_q.put((molecule,[0 for i in self.data_pointer[molecule].atoms]))
-                        #=======================================================
-                        pass
-
-        job_q = multiprocessing.Queue()
-        n = 4
-        # i = 0
-        molecules = self.keys()
-        max_len = len(molecules)
-        for molecule in molecules:
-            job_q.put(molecule)
+        start = time.time()
+        n = self.workers or cpu_count()
         jobs = []
-        message_q = multiprocessing.Queue()
-        for i in xrange(n):
-            p = Worker(self, Temp, message_q, job_q, i)
-            jobs.append(p)
-            p.start()
-
-        counter = 0
-        state = 0
+        for name, molecule in self.items():
+            try:
+                jobs.append((name,) + get_displacements(molecule))
+            except KeyError:
+                self.errorlog.write('Error: No ADP calculated by atom.get_adp() for {}.'.format(name))
 
         self.printer('\n  ...calculating ADPs at {:.1f} K...\n'.format(Temp))
-        while True:
-            message = message_q.get()
-            if message:
-                state += 1
-                pstate = float(state) / max_len
-                pstate = int(58 * pstate)
-                bar = '[' + pstate * '#' + (58 - pstate) * '-' + ']'
-                self.printer.noreturn('  {}'.format(bar))
-                if message[1] is not None:
-                    self[message[0]].give_adp(message[1])
-                else:
-                    self.errorlog.write('Error: No ADP calculated by atom.get_adp() for {}.'.format(message[0]))
-            else:
-                counter += 1
+        max_len = max(len(jobs), 1)
+        for state, (name, adps) in enumerate(calculate_adps(jobs, Temp, workers=n), 1):
+            pstate = int(58 * float(state) / max_len)
+            bar = '[' + pstate * '#' + (58 - pstate) * '-' + ']'
+            self.printer.noreturn('  {}'.format(bar))
+            self[name].give_adp([list(adp) for adp in adps])
+        print
+
+        duration = time.time() - start
+        throughput = len(jobs) / duration if duration else 0.
+        self.printer('\n  Time used for ADP calculation: {:5.3f} sec on {} CPUs '
+                     '({:.1f} compounds/s)'.format(duration, n, throughput))
+        return throughput
+
+    @staticmethod
+    def _database_filename(Temp, path):
+        if path:
+            return path + '/APD_DABA_{:.1f}_.txt'.format(Temp)
+        return 'APD_DABA_{:.1f}_.txt'.format(Temp)
 
-            if counter == n:
-                print
-                break
+    @staticmethod
+    def _map_filename(path):
+        if path:
+            return path + '/APD_MAP.txt'
+        return 'APD_MAP.txt'
 
-        for job in jobs:
-            job.join()
+    @staticmethod
+    def _map_statistics_filename(path):
+        if path:
+            return path + '/APD_MAP_STATS.txt'
+        return 'APD_MAP_STATS.txt'
+
+    @staticmethod
+    def _format_molecule(mname, molecule):
+        """
+        Formats the entry of a single molecule of a database file.
+        """
+        lines = ['N {}\n'.format(mname)]
+        for atom in molecule.atoms:
+            lines.append('E {}\n'.format(atom.element))
+            for invariom_name, orientation in atom.invarioms.items():
+                lines.append('I %s %.3f %.3f %.3f %.3f %.3f %.3f\n' % ((invariom_name,) +
+                                                                     tuple(orientation[0].tolist() +
+                                                                           orientation[1].tolist())))
+            lines.append('C %.3f %.3f %.3f\n' % tuple(atom.cart))
+            try:
+                adp = tuple(atom.adp['cart_int'])
+            except KeyError:
+                adp = (0, 0, 0, 0, 0, 0)
+            lines.append('A %.2e %.2e %.2e %.2e %.2e %.2e\n' % adp)
+        return ''.join(lines)
+
+    @staticmethod
+    def _write_file(filename, content, binary=False):
+        """
+        Writes 'content' to a temporary file that replaces 'filename'
+        when it is complete. An interrupted run therefore never leaves
+        a truncated file behind.
+
+        :param filename: String representing the file name.
+        :param content: Iterable of strings. The strings are written as
+        they are generated, so the whole file is never held in memory.
+        :param binary: Boolean. If True, 'content' is a database file
+        and the corresponding binary database file is written as well.
+        The text is parsed while it is written.
+        :return: None
+        """
+        from lauescript.laueio.arrayfile import replace_file
 
-        end2 = time.time()
-        self.printer('\n  Time used for ADP calculation: {:5.3f} sec on {} CPUs'.format(end2 - start2, n))
-        return
+        with open(filename + '.tmp', 'w') as filepointer:
+            if binary:
+                from lauescript.laueio.binary_database import parse_text_database
 
-    def _update_database_file(self, Temp, path):
+                compounds, arrays = parse_text_database(_write_lines(filepointer, content))
+            else:
+                for text in content:
+                    filepointer.write(text)
+        replace_file(filename + '.tmp', filename)
+        if binary:
+            from lauescript.laueio.binary_database import write_database, binary_filename
+
+            write_database(binary_filename(filename), compounds, arrays, {'source': os.path.basename(filename)})
+
+    def _update_database_file(self, Temp, path, binary=False):
         """
         Writes the 'APD_DABA.txt' file.
         """
-        from datetime import datetime
-
-        if path:
-            filename = path + '/APD_DABA_{:.1f}_.txt'.format(Temp)
-        else:
-            filename = 'APD_DABA_{:.1f}_.txt'.format(Temp)
+        filename = self._database_filename(Temp, path)
         self.printer('\n  ...Writing database file: {}...\n'.format(filename))
-        filepointer = open(filename, 'w')
+        self._write_file(filename, self._iter_database_file(), binary)
 
-        filepointer.write('# Database file for the APD-Toolkit\n# Generated: {}\n'.format(datetime.now()))
+    def _iter_database_file(self, source=None, removed=()):
+        """
+        Generates the content of a database file one molecule at a time.
+
+        :param source: String representing the name of an existing
+        database file. If given, the entries of all molecules that are
+        neither in 'removed' nor in the GENERATOR instance are copied
+        from that file.
+        :param removed: List of the names of molecules that are not
+        copied.
+        :return: Generator yielding strings.
+        """
+        from datetime import datetime
+
+        yield '# Database file for the APD-Toolkit\n# Generated: {}\n'.format(datetime.now())
+        if source:
+            copy = False
+            with open(source) as filepointer:
+                for line in filepointer:
+                    if line.startswith('N '):
+                        mname = line[2:].rstrip('\n')
+                        copy = mname not in removed and mname not in self
+                    if copy:
+                        yield line
         for mname, molecule in self.items():
             if len(mname) > 1:
-                filepointer.write('N {}\n'.format(mname))
-                for atom in molecule.atoms:
-                    filepointer.write('E {}\n'.format(atom.element))
-
-                    for invariom_name, orientation in atom.invarioms.items():
-                        filepointer.write('I {} '.format(invariom_name))
-                        filepointer.write('{:.3f} {:.3f} {:.3f} {:.3f} {:.3f} {:.3f}\n'.format(
-                            *(orientation[0].tolist() + orientation[1].tolist())))
-                    filepointer.write('C {:.3f} {:.3f} {:.3f}\n'.format(*atom.cart))
-                    try:
-                        filepointer.write('A {:.2e} {:.2e} {:.2e} {:.2e} {:.2e} {:.2e}\n'.format(*atom.adp['cart_int']))
-                    except KeyError:
-                        filepointer.write('A {:.2e} {:.2e} {:.2e} {:.2e} {:.2e} {:.2e}\n'.format(0, 0, 0, 0, 0, 0))
-        filepointer.close()
+                yield self._format_molecule(mname, molecule)
+
+    def _patch_database_file(self, Temp, path, removed, binary=False):
+        """
+        Updates an existing 'APD_DABA.txt' file. The entries of all
+        molecules in 'removed' and in the GENERATOR instance are removed
+        and the entries of the molecules in the GENERATOR instance are
+        appended. All other entries are copied unchanged.
+        """
+        filename = self._database_filename(Temp, path)
+        self.printer('\n  ...Updating database file: {}...\n'.format(filename))
+        self._write_file(filename, self._iter_database_file(filename, set(removed)), binary)
+
+    def _patch_invariom_map(self, compounds):
+        """
+        Maps the invarioms of all compounds of the updated database
+        without loading the compounds.
+        """
+        self.map, self.map_statistics = self._build_invariom_map(
+            (mname, invarioms) for mname, (criterion, invarioms)
+            in sorted(compounds.items(), key=lambda item: self._compound_order(item[1][0], item[0])))
+
+    def patch(self, errorlog, printer, removed, compounds, path=None, parallel=True, workers=None, binary=False):
+        """
+        Updates existing 'APD_DABA.txt' and 'APD_MAP.txt' files with the
+        molecules of the GENERATOR instance. ADPs are only calculated
+        for these molecules.
+
+        :param errorlog: Filepointer of a file opened in 'w' mode that
+        is used for logging error messages.
+        :param printer: Instance of the APD_Printer class used for printing
+        output.
+        :param removed: List of the names of molecules that are removed
+        from the database files.
+        :param compounds: Dictionary keying the names of all molecules
+        of the updated database to (criterion, invarioms) tuples where
+        'invarioms' is a list of the invariom names of the molecule.
+        :param path: String representing the path to the database directory.
+        :param parallel: Boolean specifying whether the multiprocessing
+        module will be used to calculate ADPs on multiple CPUs.
+        :param workers: Integer representing the number of processes used
+        for the parallel ADP calculation. Defaults to the number of CPUs.
+        :param binary: Boolean specifying whether the binary database files
+        are written together with the database text files.
+        :return: False if the database files do not exist and cannot be
+        updated. True otherwise.
+        """
+        filenames = [self._database_filename(Temp, path) for Temp in self.Temp] + [self._map_filename(path)]
+        if not all(os.path.isfile(filename) for filename in filenames):
+            return False
+        if platform.startswith('win'):
+            parallel = False
+
+        self.printer = printer
+        self.errorlog = errorlog
+        self.workers = workers
+        self._get_criteria()
+        for Temp in self.Temp:
+            if parallel:
+                self._update_adp_calculation_parallel(Temp)
+            else:
+                self._update_adp_calculation(Temp)
+            self._patch_database_file(Temp, path, removed, binary)
+        self._patch_invariom_map(compounds)
+        self._update_database_map(path)
+        write_index(path or '.')
+        return True
+
+    def _update_database_grid(self, path):
+        """
+        Calculates the ADPs for all temperatures in 'self.Temp' and
+        writes them to a single multi temperature database file.
+        The displacement vectors of every compound are collected once
+        and all temperatures are evaluated in one tensor contraction.
+        The contributions of the individual normal modes are stored
+        as well, so ADPs can be evaluated for any temperature.
+        """
+        import time
+        import numpy as np
+        from lauescript.cryst.vibrations import get_displacements, get_deltas, get_mode_products, \
+            get_adps_from_products
+        from lauescript.laueio.binary_database import parse_molecules, write_database, multi_temperature_filename
+
+        temperatures = np.array(sorted(self.Temp), dtype=np.float64)
+        self.printer('\n  ...calculating ADPs for {} temperatures...\n'.format(len(temperatures)))
+        start = time.time()
+        molecules = [molecule for mname, molecule in self.items() if len(mname) > 1]
+        grids = []
+        frequencies = [np.zeros(0)]
+        masses = [np.zeros(0)]
+        products = [np.zeros(0, dtype=np.float32)]
+        for molecule in molecules:
+            try:
+                freqs, mred, displacements = get_displacements(molecule)
+            except KeyError:
+                self.errorlog.write('Error: No ADP calculated by atom.get_adp() for {}.'.format(molecule.name))
+                freqs, mred, displacements = np.zeros(0), np.zeros(0), np.zeros((0, len(molecule.atoms), 3))
+            mode_products = get_mode_products(displacements)
+            grids.append(get_adps_from_products(mode_products, get_deltas(freqs, mred, temperatures)).astype(np.float32))
+            frequencies.append(freqs)
+            masses.append(mred)
+            products.append(mode_products.astype(np.float32).ravel())
+        self.printer('  Time used for ADP calculation: {:5.3f} sec'.format(time.time() - start))
+
+        compounds, arrays = parse_molecules(molecules)
+        arrays['adps'] = np.concatenate(grids, axis=1) if grids else np.zeros((len(temperatures), 0, 6), np.float32)
+        arrays['temperatures'] = temperatures
+        arrays['mode_frequencies'] = np.concatenate(frequencies)
+        arrays['mode_masses'] = np.concatenate(masses)
+        arrays['mode_offsets'] = np.cumsum([len(i) for i in frequencies]).astype(np.int64)
+        arrays['mode_products'] = np.concatenate(products)
+        arrays['product_offsets'] = np.cumsum([len(i) for i in products]).astype(np.int64)
+        filename = multi_temperature_filename(path or '.')
+        self.printer('\n  ...Writing database file: {}...\n'.format(filename))
+        write_database(filename, compounds, arrays)
 
     def _update_database_map(self, path):
         """
-        Writes the 'APD_MAP.txt' file.
+        Writes the 'APD_MAP.txt' file and the 'APD_MAP_STATS.txt' file
+        listing the number of atoms with every invariom and all compounds
+        containing it. The first compound is the one used in the map.
         """
-        if path:
-            filename = path + '/APD_MAP.txt'
-        else:
-            filename = 'APD_MAP.txt'
-        filepointer = open(filename, 'w')
-        for invariom, molecule in self.map.items():
-            filepointer.write(invariom + ':' + molecule + '\n')
-        filepointer.close()
\ No newline at end of file
+        self._write_file(self._map_filename(path),
+                         (invariom + ':' + molecule + '\n' for invariom, molecule in self.map.items()))
+        content = ['# invariom:occurrences:compounds\n']
+        for invariom in sorted(self.map_statistics):
+            occurrences, molecules = self.map_statistics[invariom]
+            content.append('{}:{}:{}\n'.format(invariom, occurrences, '\t'.join(molecules)))
+        self._write_file(self._map_statistics_filename(path), content)
+
+
+def _write_lines(filepointer, content):
+    """
+    Writes strings to a file and yields their lines.
+
+    :param filepointer: Filepointer of a file opened in 'w' mode.
+    :param content: Iterable of strings.
+    :return: Generator yielding the lines of all strings.
+    """
+    for text in content:
+        filepointer.write(text)
+        for line in text.splitlines(True):
+            yield line
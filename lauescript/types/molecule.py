@@ -5,14 +5,15 @@ Created on Nov 1, 2013
 
 Module containing definitions for datatypes representing molecules.
 """
-from numpy import array, pi, matrix, sqrt, sin, cos, zeros, tanh
-from sklearn.neighbors import NearestNeighbors
+from numpy import array, pi, matrix, sqrt, sin, cos, zeros
 from lauescript.cryst.iterators import iter_atoms, iter_atom_pairs
 from lauescript.types.atom import ATOM
 # from lauescript.invstring2 import get_invariom_names
 from lauescript.cryst.symmetry import SymmetryElement
 from lauescript.cryst.crystgeom import proton_number
-from lauescript.cryst.geom import is_bound, framework_crawler, get_framework_neighbors
+from lauescript.cryst.geom import is_bound, get_bond_partners, framework_crawler, get_framework_neighbors
+from lauescript.cryst.neighbors import get_partner_lists
+from lauescript.cryst.vibrations import get_displacements, get_deltas, get_adps
 from lauescript.cryst.sort import SortAtom
 
 
@@ -40,20 +41,17 @@ class MoleculeInterface(object):
             return self.cell
 
     def _get_bonds(self, unique=True, hydrogen=True):
-        for atom1 in self.atom_dict.values():
-            for atom2 in self.atom_dict.values():
+        atoms = self.atom_dict.values()
+        for atom1, partners in zip(atoms, get_bond_partners(atoms)):
+            for atom2 in [atoms[j] for j in partners]:
                 if not atom1 == atom2:
                     if hydrogen == False and (atom1.get_element() == 'H' or atom2.get_element() == 'H'):
                         continue
-                    if is_bound(atom1.get_cart(),
-                                atom1.get_element(),
-                                atom2.get_cart(),
-                                atom2.get_element()):
-                        bondatoms = [atom1.get_id(), atom2.get_id()]
-                        if unique:
-                            bondatoms = sorted(bondatoms)
-                        bondatoms = ':'.join(bondatoms)
-                        self.bonds[bondatoms] = [atom1, atom2]
+                    bondatoms = [atom1.get_id(), atom2.get_id()]
+                    if unique:
+                        bondatoms = sorted(bondatoms)
+                    bondatoms = ':'.join(bondatoms)
+                    self.bonds[bondatoms] = [atom1, atom2]
 
     def get_bonds(self, unique=True, hydrogen=True):
         if len(self.bonds) == 0 or not unique == self.unique_bonds:
@@ -308,18 +306,15 @@ class MOLECULE(MoleculeInterface):
 
     def get_distances(self, force_update=False):
         """
-        Computes the distance matrix.
+        Determines the neighbors of every atom. Only the closest
+        atoms are determined initially. The 'partner' lists are
+        extended on demand if more distant atoms are accessed.
         :arg force_update: Boolean used to force an update of the
         """
         if self.dist_done and not force_update:
             return
-        samples = self.coords()
-        neigh = NearestNeighbors(5, 0.4)
-        neigh.fit(samples)
-        result = neigh.kneighbors(samples, len(samples), return_distance=False)
-        self.distance_matrix = result
-        for atom_dist in result:
-            self.atoms[atom_dist[0]].partner = [self.atoms[i] for i in atom_dist[1:]]
+        for atom, partner in zip(self.atoms, get_partner_lists(self.atoms, self.coords())):
+            atom.partner = partner
         self.dist_done = True
 
     def iter_atoms(self, sort=False):
@@ -421,9 +416,11 @@ class DABA_MOLECULE(MOLECULE):
         """
         super(DABA_MOLECULE, self).__init__(name, cell)
         self.daba = True
-        self.freq = []
+        self.frequencies = zeros(0)
+        self.masses = zeros(0)
+        self.displacements = None
         self.properties = properties
-        self.keep += ['properties', 'freq']
+        self.keep += ['properties', 'frequencies', 'masses', 'displacements']
 
     def give_atom(self,
                   name=None,
@@ -442,12 +439,47 @@ class DABA_MOLECULE(MOLECULE):
         if not molecule:
             molecule = self
         if not name in [i.name for i in self.atoms]:
-            self.atoms.append(ATOM(name,
-                                   element=element,
-                                   cart=cart,
-                                   frac=frac,
-                                   molecule=molecule,
-                                   model_compound=model_compound))
+            atom = ATOM(name,
+                        element=element,
+                        cart=cart,
+                        frac=frac,
+                        molecule=molecule,
+                        model_compound=model_compound)
+            # Index of the atom's displacement vectors in self.displacements.
+            atom.row = len(self.atoms)
+            self.atoms.append(atom)
+
+    def set_modes(self, frequencies, masses, displacements):
+        """
+        Sets the normal modes of the model compound.
+
+        :param frequencies: List of the F frequencies in cm^-1.
+        :param masses: List of the F reduced masses.
+        :param displacements: Array of shape (F, N, 3) containing the
+        displacement vectors of the N atoms of the molecule in all
+        normal modes. The atoms must be in the same order as in
+        self.atoms.
+        """
+        self.frequencies = array(frequencies, dtype=float)
+        self.masses = array(masses, dtype=float)
+        self.displacements = array(displacements, dtype=float).reshape((len(self.frequencies), -1, 3))
+        for row, atom in enumerate(self.atoms):
+            atom.row = row
+
+    def get_atom_displacements(self, atom):
+        """
+        :param atom: ATOM instance of the molecule.
+        :return: Read-only view of shape (F, 3) of the displacement
+        vectors of 'atom' in all normal modes.
+        """
+        if self.displacements is None:
+            return zeros((0, 3))
+        row = getattr(atom, 'row', None)
+        if row is None or row >= len(self.atoms) or not self.atoms[row] is atom:
+            raise ValueError('{} is not an atom of {}.'.format(atom.name, self.name))
+        view = self.displacements[:, row]
+        view.flags.writeable = False
+        return view
 
     def give_adp(self, adp_list, use='cart_int'):
         """
@@ -467,82 +499,22 @@ class DABA_MOLECULE(MOLECULE):
         all attributes specified in the 'self.keep' list will
         be preserved.
         """
-        types = [type(self.strip_molecule),
-                 type(self.__class__)]
-
-        for attr in dir(self):
-            # ===================================================================
-            # print attr,type(getattr(self,attr))
-            #===================================================================
-            if not type(getattr(self, attr)) in types:
-                if any(i in attr for i in self.keep) \
-                        or any(i in attr for i in keep) \
-                        or attr[0:2] == '__':
-                    #===========================================================
-                    # print attr,type(getattr(self,attr))
-                    #===========================================================
-                    continue
-                else:
-                    #===========================================================
-                    # print attr,type(getattr(self,attr))
-                    #===========================================================
-                    x = getattr(self, attr)
-                    del x
+        keep = self.keep + list(keep)
+        for attr in self.__dict__.keys():
+            if not any(i in attr for i in keep):
+                delattr(self, attr)
         for atom in self.atoms:
-            atom.strip_atom(self.keep)
-            exit()
+            atom.strip_atom(keep)
 
     def get_adp(self, Temp):
         """
-        Calculates the vibrational energies for every frequency depending
-        of the global variable Temp.
+        Calculates the ADPs of all atoms from the vibrational frequencies
+        and displacements at the temperature 'Temp'.
         """
-        # #        c=29979245800 #cm/s
-        ##        h=float(6.62606957E-34) #Js
-        ##        kb=float(1.3806488E-23) #J/K
-        #=======================================================================
-        # if not hasattr(self.atoms[0],'cart_adp') and ver:
-        #     print '\nCalculating ADPs for '+self.name+' (XD format)'
-        # if not hasattr(self.atoms[0],'cart_adp'):
-        #     log.write('\n\nCalculating ADPs for '+self.name+' (XD format)')
-        #=======================================================================
-        hk = 0.719385E0
-        hc = 16.85773329E0
-        deltalist = []
-        freqmat = zeros((len(self.freq), len(self.atoms) * 3))
-        freqmat2 = zeros((len(self.freq), len(self.atoms) * 3))
-        for k in xrange(len(self.freq)):
-            freq0 = self.freq[k]
-            m_red = freq0[1]
-            delta = (1 / (tanh(hk * freq0[0] / Temp))) * hc / freq0[0] / m_red
-            deltalist.append(delta)
-            atomcount = 0
-            for atom in self.atoms:
-                for i in xrange(3):
-                    freqmat[k][atomcount + i] = atom.disps[str(freq0[0])][i]
-                    freqmat2[k][atomcount + i] = atom.disps[str(freq0[0])][i] * deltalist[k]
-                atomcount += 3
-
-        Umat = zeros((len(self.atoms) * 3, len(self.atoms) * 3))
-        for i in xrange(len(self.atoms) * 3):
-            for j in xrange(len(self.atoms) * 3):
-                for k in xrange(len(self.freq)):
-                    Umat[i, j] += freqmat[k, i] * freqmat2[k, j]
-        for i in xrange(len(self.atoms)):
-            j = 3 * i
-            atom = self.atoms[i]
-            adp = []
-            adp.append(Umat[j, j])
-            adp.append(Umat[j + 1, j + 1])
-            adp.append(Umat[j + 2, j + 2])
-            adp.append(Umat[j, j + 1])
-            adp.append(Umat[j, j + 2])
-            adp.append(Umat[j + 1, j + 2])
-            #===================================================================
-            # if ver: print atom.name+' {:+5f} {:+5f} {:+5f} {:+5f} {:+5f} {:+5f}'\
-            #             .format(adp[0],adp[1],adp[2],adp[3],adp[4],adp[5])
-            #===================================================================
-            atom.adp['cart_int'] = adp
+        freqs, masses, displacements = get_displacements(self)
+        adps = get_adps(displacements, get_deltas(freqs, masses, Temp))
+        for atom, adp in zip(self.atoms, adps):
+            atom.adp['cart_int'] = list(adp)
 
     def get_criterion(self):
         """